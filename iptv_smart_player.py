@@ -10,13 +10,30 @@ import sys
 import signal
 import logging
 import json
+import gc
 from datetime import datetime
 import platform
 
+# Shared stream tooling lives in tools/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools'))
+from hls_playlist import (HLSTypeCache, LinkCapacityEstimator, choose_lower_variant, choose_variant_url,
+                          variant_mpv_options, variant_play_url)
+from iptv_protocol_optimizer import IPTVProtocolOptimizer, clear_classifier_cache
+from memory_budget import MemoryBudgetPlanner, read_status_kb
+from memory_watchdog import LEVEL_CRITICAL, LEVEL_ELEVATED, LEVEL_HIGH, LEVEL_NAMES, MemoryWatchdog
+from mpv_ipc import DEFAULT_SOCKET, MPVIPCClient, MPVIPCError, remove_stale_socket
+from playback_telemetry import PlaybackTelemetryStore, SessionTelemetry
+from player_metrics import DEFAULT_PORT, MetricsServer, PlayerMetrics
+from proc_sampler import DEFAULT_PIDFILE, MPVProcessSampler, remove_pidfile, write_pidfile
+from stream_tuning import StreamTuningStore
+from sysfs_collectors import CpuStatCollector, ThermalCollector
+from thermal_guard import STATE_OK, STATE_THROTTLED, ThermalGuard
+
 # Load config from main player
 def load_config():
     """Load configuration based on environment"""
-    config_file = os.path.join(os.path.dirname(__file__), 'config.json')
+    # IPTV_CONFIG points at another config.json (benchmarks, test rigs)
+    config_file = os.getenv('IPTV_CONFIG') or os.path.join(os.path.dirname(__file__), 'config.json')
     
     try:
         with open(config_file, 'r') as f:
@@ -73,6 +90,19 @@ logging.basicConfig(
     handlers=log_handlers
 )
 
+# Playback read rates feed the link estimate at most once per window
+LINK_SAMPLE_WINDOW = 60
+
+# Cheaper scaling and decoding while the SoC is near its thermal limit
+CHEAP_DECODE_OPTIONS = {
+    'scale': 'bilinear',
+    'dscale': 'bilinear',
+    'cscale': 'bilinear',
+    'sws-scaler': 'fast-bilinear',
+    'vd-lavc-fast': 'yes',
+    'vd-lavc-skiploopfilter': 'all',
+}
+
 class MPVIPTVPlayer:
     def __init__(self):
         self.config = CONFIG
@@ -82,6 +112,54 @@ class MPVIPTVPlayer:
         self.current_stream = None
         self.running = True
         
+        # Per-protocol mpv option profiles (live/VOD read from the playlist, cached)
+        self.hls_type_cache = HLSTypeCache(os.path.join(self.config['base_path'], 'hls_type_cache.json'))
+        self.protocol_optimizer = IPTVProtocolOptimizer(hls_type_cache=self.hls_type_cache)
+        
+        # Link capacity estimate shared with the stream analyzer
+        self.link_estimator = LinkCapacityEstimator(
+            os.path.join(self.config['base_path'], 'link_capacity.json'))
+        self.link_peak_rate = 0
+        self.link_sample_started = time.time()
+        
+        # mpv JSON IPC - playback state without polling the process
+        self.ipc_socket = self.config.get('mpv_ipc_socket', DEFAULT_SOCKET)
+        self.ipc = None
+        self.pidfile = self.config.get('mpv_pidfile', DEFAULT_PIDFILE)
+        
+        # Per-stream buffer profiles learned from observed stalls
+        self.tuning_store = StreamTuningStore(os.path.join(self.config['base_path'], 'stream_tuning.json'))
+        self.session = None
+        
+        # Frame drops / A/V sync per stream, fed back into channel ranking
+        self.telemetry_store = PlaybackTelemetryStore(
+            os.path.join(self.config['base_path'], 'stream_telemetry.json'))
+        self.telemetry = None
+        
+        # Buffers sized to fit the service's cgroup memory limit
+        self.memory_planner = MemoryBudgetPlanner()
+        self.current_variant = None
+        
+        # Prometheus metrics endpoint, served from in-memory state
+        self.metrics = PlayerMetrics()
+        self.metrics_server = None
+        self.cpu_collector = CpuStatCollector()
+        self.thermal_collector = ThermalCollector()
+        self.mpv_sampler = None
+        
+        # React to memory pressure before the OOM killer does
+        self.memory_watchdog = MemoryWatchdog(self._on_memory_pressure)
+        self.memory_restart_requested = False
+        self.memory_pressure_level = 0
+        
+        # Back off decode cost before thermal throttling makes video stutter
+        # (0 = none, 1 = cheap scaling/decoding, 2 = lower HLS variant)
+        self.thermal_guard = ThermalGuard()
+        self.thermal_backoff = 0
+        self.current_stream_name = None
+        self.launch_started = None
+        self._ttff_observer = None
+        
         # Playback health monitoring
         self.last_health_check = time.time()
         self.consecutive_stall_checks = 0
@@ -145,6 +223,10 @@ class MPVIPTVPlayer:
         matching_streams = []
         
         for url, data in self.working_streams.items():
+            # Skip streams the analyzer flagged as unable to decode in real time
+            if data.get('test_results', {}).get('decode') is False:
+                continue
+
             stream_text = f"{data['name']} {data['group']}".lower()
             
             if any(keyword in stream_text for keyword in category_keywords):
@@ -152,7 +234,8 @@ class MPVIPTVPlayer:
                 hours_ago = (datetime.now() - last_working).total_seconds() / 3600
                 freshness_score = max(0, 100 - hours_ago)
                 
-                data['score'] = freshness_score
+                # Streams (or codec/resolution classes) the Pi drops frames on sink
+                data['score'] = freshness_score - self.telemetry_store.penalty(url, data.get('decode_info'))
                 matching_streams.append(data)
         
         matching_streams.sort(key=lambda x: x['score'], reverse=True)
@@ -230,6 +313,39 @@ class MPVIPTVPlayer:
         time.sleep(1)
         return True  # Signal to restart
 
+    def select_stream_variant(self, stream_url):
+        """Resolve an HLS master playlist to the best sustainable variant"""
+        self.current_variant = None
+        if self.protocol_optimizer.detect_protocol(stream_url) != 'hls':
+            return stream_url
+        if not self.config.get('video', {}).get('variant_selection', True):
+            return stream_url
+        
+        play_url, variant = choose_variant_url(stream_url, self.link_estimator)
+        if variant and self.thermal_backoff >= 2:
+            lower = choose_lower_variant(stream_url, variant)
+            if lower:
+                logging.info("[THERMAL] Still hot - starting one variant lower")
+                play_url, variant = variant_play_url(stream_url, lower), lower
+        self.current_variant = variant
+        if variant:
+            logging.info(f"[VARIANT] {variant['bandwidth_kbps']} kbps "
+                         f"{variant['width']}x{variant['height']} "
+                         f"(link: {self.link_estimator.estimate_kbps()} kbps)")
+        return play_url
+
+    def apply_memory_budget(self, options):
+        """Shrink buffers that would not fit next to mpv under the cgroup limit"""
+        bitrate_kbps = self.current_variant['bandwidth_kbps'] if self.current_variant else None
+        budgeted, plan = self.memory_planner.apply(options, bitrate_kbps)
+        if plan:
+            clamped = [key for key in budgeted if budgeted[key] != options.get(key)]
+            logging.info(f"[MEMORY] Buffer budget {plan['budget_mb']:.0f}MB "
+                         f"(limit {plan['limit_mb']:.0f}MB, in use {plan['in_use_mb']:.0f}MB, "
+                         f"supervisor {plan['supervisor_rss_mb']:.0f}MB)"
+                         + (f" - clamped {', '.join(clamped)}" if clamped else ""))
+        return budgeted
+
     def launch_mpv(self, stream_url, env):
         """Launch MPV with optimal settings for Raspberry Pi 3"""
         try:
@@ -241,83 +357,42 @@ class MPVIPTVPlayer:
                 subprocess.run(['pkill', '-9', '^mpv$'], check=False)
             time.sleep(0.5)
             
-            # Detect Pi hardware
-            is_raspberry_pi = False
-            try:
-                with open('/proc/cpuinfo', 'r') as f:
-                    cpuinfo = f.read()
-                    if 'BCM' in cpuinfo or 'Raspberry Pi' in cpuinfo:
-                        is_raspberry_pi = True
-                        logging.info("   Detected Raspberry Pi - using optimized settings")
-            except:
-                pass
+            # Hand mpv one variant the link and decoder can sustain
+            play_url = self.select_stream_variant(stream_url)
             
-            # MPV configurations optimized for Pi 3
-            # MPV is MUCH more efficient than VLC on Pi hardware
-            mpv_configs = []
+            # Per-protocol option profile (Variant 14 for live HLS), then
+            # the buffer sizes learned for this stream or host
+            base_options = self.protocol_optimizer.get_mpv_options(stream_url)
+            options = dict(base_options)
+            options.update(variant_mpv_options(self.current_variant))
+            options.update(self.tuning_store.get_overrides(stream_url))
+            if self.thermal_backoff >= 1:
+                options.update(CHEAP_DECODE_OPTIONS)
+            if self.config.get('video', {}).get('memory_budget', True):
+                options = self.apply_memory_budget(options)
+            options.update(self.config.get('mpv_options', {}))  # e.g. vo/ao=null on a headless rig
+            if platform.system() != 'Windows':
+                remove_stale_socket(self.ipc_socket)
+                options['input-ipc-server'] = self.ipc_socket
+            logging.info(f"[MPV] Profile: {self.protocol_optimizer.get_profile_name(stream_url)} "
+                         f"(cache {options.get('cache-secs')}s, "
+                         f"demuxer {options.get('demuxer-max-bytes')}, "
+                         f"readahead {options.get('demuxer-readahead-secs')}s)")
             
-            if is_raspberry_pi:
-                # Pi 3 optimized - Variant 14 (Balanced optimization) - best performance in testing
-                # Added network timeout and reconnection options to prevent long pauses
-                mpv_configs = [
-                    # Variant 14: Balanced optimization (3s cache, 25M buffer, 3s readahead) - BEST PERFORMANCE
-                    [
-                        'mpv',
-                        '--hwdec=no',
-                        '--vo=gpu',
-                        '--cache=yes',
-                        '--cache-secs=3',
-                        '--demuxer-max-bytes=25M',
-                        '--demuxer-readahead-secs=3',
-                        '--framedrop=vo',
-                        '--no-osc',
-                        '--no-input-default-bindings',
-                        '--really-quiet',
-                        '--fullscreen',
-                        '--loop-playlist=inf',
-                        '--user-agent=Mozilla/5.0 (Smart-IPTV-Player)',
-                        '--network-timeout=15',  # Timeout after 15s of no data
-                        '--demuxer-lavf-o=timeout=10000000',  # 10 second timeout for initial connection
-                        '--stream-lavf-o=reconnect=1',  # Enable reconnection
-                        '--stream-lavf-o=reconnect_streamed=1',  # Reconnect for streamed content
-                        '--stream-lavf-o=reconnect_delay_max=5',  # Max 5s delay between reconnects
-                        stream_url
-                    ]
-                ]
-            else:
-                # Desktop/Windows - also use Variant 14 for consistency
-                mpv_configs = [
-                    [
-                        'mpv',
-                        '--hwdec=no',
-                        '--vo=gpu',
-                        '--cache=yes',
-                        '--cache-secs=3',
-                        '--demuxer-max-bytes=25M',
-                        '--demuxer-readahead-secs=3',
-                        '--framedrop=vo',
-                        '--no-osc',
-                        '--no-input-default-bindings',
-                        '--really-quiet',
-                        '--fullscreen',
-                        '--loop-playlist=inf',
-                        '--user-agent=Mozilla/5.0 (Smart-IPTV-Player)',
-                        '--network-timeout=15',  # Timeout after 15s of no data
-                        '--demuxer-lavf-o=timeout=10000000',  # 10 second timeout for initial connection
-                        '--stream-lavf-o=reconnect=1',  # Enable reconnection
-                        '--stream-lavf-o=reconnect_streamed=1',  # Reconnect for streamed content
-                        '--stream-lavf-o=reconnect_delay_max=5',  # Max 5s delay between reconnects
-                        stream_url
-                    ]
-                ]
+            mpv_configs = [
+                self.protocol_optimizer.build_mpv_command(play_url, options)
+            ]
             
             # Try each configuration
             for i, cmd in enumerate(mpv_configs, 1):
                 logging.info(f"[MPV] Trying config {i}/{len(mpv_configs)}")
                 logging.info(f"   Command: {' '.join(cmd[:6])}...")
                 
-                if self._start_mpv_process(cmd, env, f"Config {i}"):
+                self.metrics.inc('mpv_launches_total')
+                if self._start_mpv_process(cmd, env, f"Config {i}", stream_url):
+                    self._start_session(stream_url, base_options)
                     return True
+                self.metrics.inc('mpv_launch_failures_total')
                 
                 if i < len(mpv_configs):
                     logging.info("   Waiting 1 second before next config...")
@@ -330,7 +405,7 @@ class MPVIPTVPlayer:
             logging.error(f"MPV launch failed: {e}")
             return False
 
-    def _start_mpv_process(self, cmd, env, config_name):
+    def _start_mpv_process(self, cmd, env, config_name, stream_url=None):
         """Start MPV process and monitor"""
         try:
             # Platform-specific environment
@@ -349,8 +424,9 @@ class MPVIPTVPlayer:
                     os.setsid()
                 popen_kwargs['preexec_fn'] = setup_process
             
+            self.launch_started = time.time()
             self.current_process = subprocess.Popen(cmd, **popen_kwargs)
-            self.current_stream = cmd[-1]
+            self.current_stream = stream_url or cmd[-1]
             
             logging.info(f"[LOADING] Quick startup check for MPV {config_name}...")
             
@@ -389,11 +465,285 @@ class MPVIPTVPlayer:
             logging.error(f"MPV process start failed: {e}")
             return False
 
+    def _start_session(self, stream_url, base_options):
+        """Begin tracking a playback session and attach to mpv's IPC socket"""
+        self.session = {
+            'url': stream_url,
+            'base_options': base_options,
+            'started': time.time(),
+            'stalls': 0,
+            'stall_started': None,
+            'stall_seconds': 0.0,
+            'peak_rss_mb': None,
+        }
+        # Lets performance-monitor.py find mpv without scanning processes
+        write_pidfile(self.current_process.pid, self.pidfile)
+        
+        self.thermal_guard.reset_playback()
+        self.metrics.set_stream(stream_url, self.current_stream_name,
+                                self.protocol_optimizer.get_profile_name(stream_url))
+        try:
+            self.mpv_sampler = MPVProcessSampler(self.current_process.pid)
+        except (ProcessLookupError, OSError):
+            self.mpv_sampler = None
+        
+        self.ipc = MPVIPCClient(self.ipc_socket)
+        if self.ipc.connect(wait=3):
+            self.ipc.observe_property('paused-for-cache', self._on_paused_for_cache)
+            self._ttff_observer = None
+            observer_id = self.ipc.observe_property('playback-time', self._on_first_frame)
+            if self.launch_started is None:
+                self.ipc.unobserve_property(observer_id)  # First frame arrived with the initial value
+            else:
+                self._ttff_observer = observer_id
+            self.telemetry = SessionTelemetry(self.ipc)
+            self.telemetry.start()
+        else:
+            logging.warning("[IPC] Could not connect to MPV IPC socket - stall tracking disabled")
+            self.ipc = None
+
+    def _on_first_frame(self, name, playback_time):
+        """IPC callback: record time-to-first-frame once, then stop observing"""
+        if playback_time is None or not self.launch_started or not self.ipc:
+            return
+        # We attach after the startup check, so back out how long it has been playing
+        ttff = max(0.0, time.time() - self.launch_started - playback_time)
+        self.launch_started = None
+        self.metrics.observe_ttff(ttff)
+        logging.info(f"[MPV] First frame after {ttff:.1f}s")
+        if self._ttff_observer:
+            self.ipc.unobserve_property(self._ttff_observer)
+
+    def _on_paused_for_cache(self, name, paused):
+        """IPC callback: mpv ran out of buffered data (or recovered)"""
+        session = self.session
+        if not session:
+            return
+        if paused and session['stall_started'] is None:
+            session['stall_started'] = time.time()
+            session['stalls'] += 1
+            self.metrics.inc('stalls_total')
+            self.metrics.set('buffering', 1)
+            logging.warning(f"[CACHE] Buffering started (stall #{session['stalls']})")
+        elif not paused and session['stall_started'] is not None:
+            duration = time.time() - session['stall_started']
+            session['stall_seconds'] += duration
+            session['stall_started'] = None
+            self.metrics.set('buffering', 0)
+            self.metrics.inc('stall_seconds_total', duration)
+            logging.info(f"[CACHE] Buffering ended after {duration:.1f}s")
+
+    def _sample_session_memory(self):
+        """Track mpv's peak RSS (VmHWM) for the tuning profile"""
+        if not self.session or not self.current_process or platform.system() == 'Windows':
+            return
+        peak_kb = read_status_kb('VmHWM', self.current_process.pid)
+        if peak_kb:
+            self.session['peak_rss_mb'] = peak_kb / 1024
+
+    def _end_session(self, reason):
+        """Close the session and let the tuning profile learn from it"""
+        session, self.session = self.session, None
+        remove_pidfile(self.pidfile)
+        telemetry, self.telemetry = self.telemetry, None
+        if self.ipc:
+            self.ipc.close()
+            self.ipc = None
+        if self.mpv_sampler:
+            self.mpv_sampler.close()
+            self.mpv_sampler = None
+        self.metrics.set_stream(None)
+        self.memory_watchdog.reset()
+        self.memory_pressure_level = 0
+        for gauge in ('buffering', 'cache_seconds', 'mpv_cpu_percent', 'mpv_rss_bytes'):
+            self.metrics.set(gauge, None)
+        if not session:
+            return
+        
+        self.metrics.inc('sessions_ended_total', reason=reason)
+        if reason in ('crashed', 'stalled', 'memory'):
+            self.metrics.inc('restarts_total')
+        
+        now = time.time()
+        if session['stall_started'] is not None:
+            session['stall_seconds'] += now - session['stall_started']
+        play_seconds = max(0, now - session['started'] - session['stall_seconds'])
+        reconnects = 1 if reason in ('crashed', 'stalled') else 0
+        
+        action = self.tuning_store.record_session(
+            session['url'], session['base_options'], play_seconds,
+            stalls=session['stalls'], reconnects=reconnects,
+            peak_rss_mb=session['peak_rss_mb'])
+        if telemetry:
+            self._record_telemetry(session['url'], telemetry.stop())
+        
+        profile = self.tuning_store.get_profile(session['url']) or {}
+        logging.info(f"[TUNING] Session {reason}: {play_seconds / 60:.1f} min, "
+                     f"{session['stalls']} stalls -> {action} "
+                     f"(cache {profile.get('cache_secs', 0):.1f}s, "
+                     f"demuxer {profile.get('demuxer_max_mb', 0):.0f}M)")
+
+    def _record_telemetry(self, url, aggregate):
+        """Store a session's frame-drop/avsync aggregate with its stream"""
+        drops = aggregate['vo_drops'] + aggregate['decoder_drops']
+        if drops:
+            self.metrics.inc('dropped_frames_total', drops)
+        penalty = self.telemetry_store.record_session(url, aggregate)
+        avsync = aggregate['avsync_mean']
+        logging.info(f"[TELEMETRY] {aggregate['codec'] or '?'} {aggregate['width'] or '?'}x{aggregate['height'] or '?'}: "
+                     f"{aggregate['vo_drops']} vo + {aggregate['decoder_drops']} decoder drops "
+                     f"({aggregate['drops_per_minute']:.1f}/min), "
+                     f"avsync {avsync * 1000 if avsync is not None else 0:.0f}ms, "
+                     f"fps {aggregate['fps_mean'] or 0:.1f}/{aggregate['container_fps'] or 0:.0f}"
+                     + (f" -> ranking penalty {penalty:.0f}" if penalty else ''))
+
+    def start_metrics_server(self):
+        """Serve /metrics on localhost (or a Unix socket) from a daemon thread"""
+        metrics_config = self.config.get('metrics', {})
+        if not metrics_config.get('enabled', True):
+            return
+        self.metrics_server = MetricsServer(
+            self.metrics,
+            host=metrics_config.get('host', '127.0.0.1'),
+            port=metrics_config.get('port', DEFAULT_PORT),
+            socket_path=metrics_config.get('socket'))
+        if self.metrics_server.start():
+            logging.info(f"[METRICS] Serving {self.metrics_server.address}")
+        else:
+            logging.warning("[METRICS] Could not start metrics endpoint")
+            self.metrics_server = None
+
+    def update_metrics(self):
+        """Refresh system/mpv gauges from cheap held-file reads"""
+        self.metrics.set('cpu_percent', self.cpu_collector.sample()['cpu_percent'])
+        self.metrics.set('temperature_celsius', self.thermal_collector.sample()['temp_c'])
+        
+        sample = self.mpv_sampler.sample() if self.mpv_sampler else None
+        if sample:
+            self.metrics.set('mpv_cpu_percent', sample['cpu_percent'])
+            self.metrics.set('mpv_rss_bytes', sample['rss_mb'] * 1024 * 1024)
+        if self.ipc and self.ipc.connected:
+            self.metrics.set('cache_seconds', self.ipc.get_property('demuxer-cache-duration'))
+
+    def sample_link_capacity(self):
+        """Feed mpv's network read rate into the link estimate during playback
+
+        Only reads taken while the demuxer is filling its cache count (an
+        idle demuxer reads nothing), and each window contributes its peak.
+        """
+        ipc = self.ipc
+        if ipc and ipc.connected:
+            state = ipc.get_property('demuxer-cache-state')
+            speed = ipc.get_property('cache-speed')
+            if isinstance(state, dict) and not state.get('idle', True) and isinstance(speed, (int, float)):
+                self.link_peak_rate = max(self.link_peak_rate, speed)
+        
+        if time.time() - self.link_sample_started >= LINK_SAMPLE_WINDOW:
+            if self.link_peak_rate > 0:
+                self.link_estimator.add_sample(int(self.link_peak_rate), 1.0, source='playback')
+            self.link_peak_rate = 0
+            self.link_sample_started = time.time()
+
+    def _on_memory_pressure(self, level, reason):
+        """Watchdog callback: escalate from cheap to drastic memory relief"""
+        previous, self.memory_pressure_level = self.memory_pressure_level, level
+        self.metrics.set('memory_pressure_level', level)
+        if level < previous:
+            logging.info(f"[MEMORY] Pressure eased to {LEVEL_NAMES[level]} ({reason})")
+            return
+        logging.warning(f"[MEMORY] Pressure {LEVEL_NAMES[level]}: {reason}")
+        self.metrics.inc('memory_pressure_events_total', level=LEVEL_NAMES[level])
+        
+        if level >= LEVEL_ELEVATED:
+            self.shrink_mpv_buffers()
+        if level >= LEVEL_HIGH:
+            self.release_memory()
+        if level >= LEVEL_CRITICAL:
+            # The monitoring loop owns mpv's lifecycle - ask it to restart
+            self.memory_restart_requested = True
+
+    def shrink_mpv_buffers(self):
+        """Halve mpv's demuxer cache at runtime (mpv frees the excess)"""
+        ipc = self.ipc
+        if not ipc or not ipc.connected:
+            return
+        max_bytes = ipc.get_property('demuxer-max-bytes')
+        if isinstance(max_bytes, (int, float)) and max_bytes > 4 * 1024 * 1024:
+            ipc.set_property('demuxer-max-bytes', int(max(4 * 1024 * 1024, max_bytes // 2)))
+        ipc.set_property('demuxer-max-back-bytes', 1024 * 1024)
+        for name in ('cache-secs', 'demuxer-readahead-secs'):
+            value = ipc.get_property(name)
+            if isinstance(value, (int, float)) and value > 2:
+                ipc.set_property(name, max(2, value / 2))
+        logging.info(f"[MEMORY] Shrunk MPV demuxer cache to "
+                     f"{(ipc.get_property('demuxer-max-bytes') or 0) / 1024 / 1024:.0f}MB")
+
+    def release_memory(self):
+        """Drop in-process caches and trim the catalog to what we'd actually play"""
+        clear_classifier_cache()
+        self.hls_type_cache.clear()
+        
+        keep = self.config.get('memory_watchdog', {}).get('keep_streams', 200)
+        if len(self.working_streams) > keep:
+            ranked = sorted(self.working_streams.items(),
+                            key=lambda item: item[1].get('last_working', ''), reverse=True)
+            trimmed = dict(ranked[:keep])
+            if self.current_stream in self.working_streams:
+                trimmed[self.current_stream] = self.working_streams[self.current_stream]
+            logging.info(f"[MEMORY] Trimmed catalog {len(self.working_streams)} -> {len(trimmed)} streams")
+            self.working_streams = trimmed
+        gc.collect()
+
+    def check_thermal(self):
+        """Correlate throttling with dropped frames and back off before it stutters"""
+        ipc = self.ipc if self.ipc and self.ipc.connected else None
+        result = self.thermal_guard.check(
+            ipc.get_property('frame-drop-count') if ipc else None,
+            ipc.get_property('avsync') if ipc else None)
+        self.metrics.set('throttled', 1 if result['state'] == STATE_THROTTLED else 0)
+        self.metrics.set('thermal_backoff', self.thermal_backoff)
+        
+        if result['state'] == STATE_OK:
+            if self.thermal_backoff and self.thermal_guard.cooled_down():
+                logging.info("[THERMAL] Cooled down - next stream starts at full quality")
+                self.thermal_backoff = 0
+            return
+        
+        if not ipc:
+            return
+        if self.thermal_backoff < 1:
+            # Scalers switch immediately; decoder flags apply on the next load
+            for name, value in CHEAP_DECODE_OPTIONS.items():
+                ipc.set_property(name, value)
+            self.thermal_backoff = 1
+            logging.warning(f"[THERMAL] Throttling {result['state']} at {result['temp_c']}°C "
+                            f"({result['slope_c_per_min'] or 0:+.1f}°C/min) - cheaper scaling/decoding")
+        elif self.thermal_backoff < 2 and result['stuttering'] and self.current_variant:
+            lower = choose_lower_variant(self.current_stream, self.current_variant)
+            if lower:
+                try:
+                    for name, value in variant_mpv_options(lower).items():
+                        ipc.set_property(name, value)
+                    ipc.command('loadfile', variant_play_url(self.current_stream, lower), 'replace')
+                except MPVIPCError:
+                    return
+                self.thermal_backoff = 2
+                self.thermal_guard.reset_playback()
+                logging.warning(f"[THERMAL] {result['drops_per_second'] or 0:.1f} dropped frames/s while "
+                                f"{result['state']} - switched to {lower['bandwidth_kbps']} kbps "
+                                f"{lower['width']}x{lower['height']}")
+                self.current_variant = lower
+                correlation = self.thermal_guard.correlation()
+                logging.info("[THERMAL] Drops/s by state: " + ", ".join(
+                    f"{state} {data['drops_per_second']:.2f}" for state, data in correlation.items()
+                    if data['drops_per_second'] is not None))
+
     def launch_video_player(self, stream_data, env):
         """Launch video player with stream"""
         try:
             stream_url = stream_data['url']
             stream_name = stream_data['name']
+            self.current_stream_name = stream_name
             
             logging.info(f"PLAYING: {stream_name}")
             logging.info(f"URL: {stream_url[:100]}...")
@@ -470,6 +820,9 @@ class MPVIPTVPlayer:
         signal.signal(signal.SIGTERM, signal_handler)
         
         env = self.setup_environment()
+        self.start_metrics_server()
+        if self.config.get('memory_watchdog', {}).get('enabled', True) and self.memory_watchdog.start():
+            logging.info("[MEMORY] Pressure watchdog running")
         
         if not self.working_streams:
             logging.error("[FAIL] No working streams! Run scanner first")
@@ -529,6 +882,8 @@ class MPVIPTVPlayer:
                     except:
                         pass
                     
+                    self._end_session('ended' if exit_code == 0 else 'crashed')
+                    
                     # If stream just finished normally, try next stream
                     if exit_code == 0:
                         logging.info("[INFO] Stream ended normally - trying next stream...")
@@ -538,12 +893,24 @@ class MPVIPTVPlayer:
                         logging.error(f"[ERROR] Stream crashed with exit code {exit_code}")
                         break
                 
+                self.update_metrics()
+                self.sample_link_capacity()
+                self.check_thermal()
+                
+                if self.memory_restart_requested:
+                    self.memory_restart_requested = False
+                    logging.error("[MEMORY] Critical memory pressure - restarting playback")
+                    self._end_session('memory')
+                    self.restart_playback("Memory pressure")
+                    break  # Exit loop to restart
+                
                 # Health check at intervals
                 current_time = time.time()
                 if current_time - self.last_health_check >= self.health_check_interval:
                     self.last_health_check = current_time
                     
                     if self.current_process:
+                        self._sample_session_memory()
                         is_healthy = self.check_playback_health()
                         
                         if not is_healthy:
@@ -552,6 +919,7 @@ class MPVIPTVPlayer:
                             
                             if self.consecutive_stall_checks >= self.max_stall_checks:
                                 logging.error("[HEALTH] Multiple consecutive health check failures - restarting playback")
+                                self._end_session('stalled')
                                 self.restart_playback("Playback stalled")
                                 self.consecutive_stall_checks = 0
                                 break  # Exit loop to restart
@@ -573,6 +941,10 @@ class MPVIPTVPlayer:
         """Clean shutdown"""
         logging.info("[STOP] Shutting down...")
         self.running = False
+        self._end_session('shutdown')
+        self.memory_watchdog.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
         
         if self.current_process:
             try:
@@ -583,7 +955,7 @@ class MPVIPTVPlayer:
         
         # Kill any remaining MPV processes
         if platform.system() != 'Windows':
-            subprocess.run(['pkill', '-9', '-f', 'mpv'], check=False)
+            subprocess.run(['pkill', '-9', '^mpv$'], check=False)
         logging.info("Shutdown complete")
 
 def main():
@@ -24,7 +24,7 @@ fi
 
 echo "🔧 Installing required packages..."
 sudo apt update
-sudo apt install -y hostapd dnsmasq python3-flask python3-pip git
+sudo apt install -y hostapd dnsmasq python3-flask python3-waitress python3-brotli python3-pip git
 
 # Stop conflicting services and unmask hostapd
 echo "🛑 Stopping conflicting services..."
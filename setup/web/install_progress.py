@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+GrannyTV Installation Progress
+Live progress for the installation that runs after the setup reboot
+
+The generated grannytv-install.sh appends one JSON event per line to
+PROGRESS_FILE (stage, percent, message, status). The setup server is
+disabled by then, so this module also serves as a tiny standalone status
+server: a page, the events as JSON, and a server-sent event stream that
+pushes each new line as it is written. The phone keeps one connection open
+instead of reloading a page while the Pi is busy installing.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROGRESS_FILE = '/var/lib/grannytv/install-progress.jsonl'
+POLL_INTERVAL = 0.5       # seconds between stat() calls on the progress file
+KEEPALIVE_SECONDS = 15
+MAX_STREAM_SECONDS = 1800
+EXIT_AFTER_DONE = 600     # keep serving the final state this long
+FINAL_STATUSES = ('done', 'error')
+
+# Sourced into the generated install script (and its user sub-shell).
+# Messages are fixed strings from the script, so printf needs no JSON escaping.
+SHELL_FUNCTION = """progress() {{
+    printf '{{"time": %s, "stage": "%s", "progress": %s, "message": "%s", "status": "%s"}}\\n' \\
+        "$(date +%s)" "$1" "$2" "$3" "${{4:-running}}" >> "{path}" 2>/dev/null || true
+}}"""
+
+
+def shell_function(path=PROGRESS_FILE):
+    """Bash `progress <stage> <percent> <message> [status]` appending to path"""
+    return SHELL_FUNCTION.format(path=path)
+
+
+class ProgressLog:
+    """Follows the append-only progress file; waiters are woken on new events"""
+
+    def __init__(self, path=PROGRESS_FILE, interval=POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.events = []
+        self.offset = 0
+        self.inode = None
+        self.partial = ''
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='progress-follow', daemon=True)
+            self.thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self.poll()
+            time.sleep(self.interval)
+
+    def poll(self):
+        """Read whatever was appended since the last call"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        with self.condition:
+            if st.st_ino != self.inode or st.st_size < self.offset:
+                # New or truncated file - a re-run of the installer starts over
+                self.inode = st.st_ino
+                self.offset = 0
+                self.partial = ''
+                self.events = []
+            if st.st_size == self.offset:
+                return
+            try:
+                with open(self.path, 'r') as f:
+                    f.seek(self.offset)
+                    data = f.read()
+                    self.offset = f.tell()
+            except OSError:
+                return
+            lines = (self.partial + data).split('\n')
+            self.partial = lines.pop()  # an unfinished line waits for its newline
+            for line in lines:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                event['id'] = len(self.events)
+                self.events.append(event)
+            self.condition.notify_all()
+
+    def since(self, after=-1):
+        with self.condition:
+            return self.events[after + 1:]
+
+    def wait_for(self, after, timeout):
+        """Events with id > after, waiting up to timeout for the first one"""
+        with self.condition:
+            if len(self.events) <= after + 1:
+                self.condition.wait(timeout)
+            return self.events[after + 1:]
+
+    def finished(self):
+        with self.condition:
+            return bool(self.events) and self.events[-1].get('status') in FINAL_STATUSES
+
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>GrannyTV Installation</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }
+        .container { max-width: 500px; margin: 0 auto; background: white; padding: 20px; border-radius: 10px; }
+        h1 { color: #333; text-align: center; }
+        .bar { background: #e9ecef; border-radius: 8px; height: 18px; overflow: hidden; }
+        .fill { background: #4caf50; height: 100%; width: 0; transition: width 0.5s; }
+        .fill.error { background: #dc3545; }
+        #stage { margin: 12px 0; font-size: 18px; text-align: center; }
+        ul { padding-left: 20px; color: #555; font-size: 14px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>📺 Installing GrannyTV</h1>
+        <div class="bar"><div class="fill" id="fill"></div></div>
+        <div id="stage">Waiting for the installer to start...</div>
+        <ul id="log"></ul>
+    </div>
+    <script>
+        const fill = document.getElementById('fill');
+        const stage = document.getElementById('stage');
+        const log = document.getElementById('log');
+        function show(event) {
+            fill.style.width = event.progress + '%';
+            fill.className = event.status === 'error' ? 'fill error' : 'fill';
+            const icon = event.status === 'error' ? '❌' : event.status === 'done' ? '🎉' : '🔄';
+            stage.textContent = icon + ' ' + event.message;
+            const item = document.createElement('li');
+            item.textContent = new Date(event.time * 1000).toLocaleTimeString() + ' ' + event.message;
+            log.appendChild(item);
+        }
+        const events = new EventSource('/events');
+        events.onmessage = message => {
+            const event = JSON.parse(message.data);
+            show(event);
+            if (event.status === 'done' || event.status === 'error') events.close();
+        };
+    </script>
+</body>
+</html>
+"""
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    progress = None  # ProgressLog, set by serve()
+
+    def log_message(self, format, *args):
+        pass  # the journal only needs the installer's own output
+
+    def _send(self, status, body, content_type):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/':
+            self._send(200, PAGE, 'text/html; charset=utf-8')
+        elif path == '/progress':
+            self._send(200, json.dumps({'events': self.progress.since(),
+                                        'finished': self.progress.finished()}),
+                       'application/json')
+        elif path == '/events':
+            self._stream()
+        else:
+            self._send(404, 'Not found', 'text/plain')
+
+    def _stream(self):
+        """Server-sent events; Last-Event-ID resumes after a reconnect"""
+        try:
+            last_id = int(self.headers.get('Last-Event-ID', -1))
+        except ValueError:
+            last_id = -1
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        deadline = time.time() + MAX_STREAM_SECONDS
+        try:
+            self.wfile.write(b'retry: 3000\n\n')
+            while time.time() < deadline:
+                events = self.progress.wait_for(last_id, KEEPALIVE_SECONDS)
+                if not events:
+                    self.wfile.write(b': keepalive\n\n')
+                for event in events:
+                    self.wfile.write(f"id: {event['id']}\ndata: {json.dumps(event)}\n\n".encode('utf-8'))
+                    last_id = event['id']
+                self.wfile.flush()
+                if events and events[-1].get('status') in FINAL_STATUSES:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # phone went away
+
+
+def serve(port=8080, path=PROGRESS_FILE, exit_after_done=EXIT_AFTER_DONE):
+    """Serve progress until the installation finished and exit_after_done passed"""
+    progress = ProgressLog(path).start()
+    handler = type('Handler', (StatusHandler,), {'progress': progress})
+    server = ThreadingHTTPServer(('0.0.0.0', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='progress-http', daemon=True).start()
+    print(f"📡 Installation progress on http://{socket.gethostname()}.local:{port}/")
+    sys.stdout.flush()
+
+    finished_at = None
+    while finished_at is None or time.time() - finished_at < exit_after_done:
+        time.sleep(1)
+        if finished_at is None and progress.finished():
+            finished_at = time.time()
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GrannyTV installation progress')
+    parser.add_argument('--file', default=PROGRESS_FILE, help=f'Progress file (default: {PROGRESS_FILE})')
+    sub = parser.add_subparsers(dest='command')
+    serve_parser = sub.add_parser('serve', help='Run the status server')
+    serve_parser.add_argument('--port', type=int, default=8080)
+    serve_parser.add_argument('--exit-after-done', type=float, default=EXIT_AFTER_DONE,
+                              help='Seconds to keep serving after the installation finished')
+    sub.add_parser('shell', help='Print the bash progress() function')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.port, args.file, args.exit_after_done)
+    elif args.command == 'shell':
+        print(shell_function(args.file))
+    else:
+        progress = ProgressLog(args.file)
+        progress.poll()
+        for event in progress.since():
+            print(f"{time.strftime('%H:%M:%S', time.localtime(event['time']))} "
+                  f"{event['progress']:>3}% {event['stage']}: {event['message']} ({event['status']})")
+
+
+if __name__ == '__main__':
+    main()
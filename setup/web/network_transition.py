@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+GrannyTV Network Transition Helper
+Switches the Pi from the setup hotspot to home WiFi in one privileged run
+
+/finalize writes a declarative plan (files to install, units to stop,
+disable and enable, the network switch) and starts this helper once with
+sudo. The helper turns the plan into steps with dependencies. Independent
+steps run concurrently, e.g. tearing down the hotspot while files are
+installed. It records how long each step took, writes the timing report
+and reboots.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+HOTSPOT_UNITS = ['hostapd', 'dnsmasq']
+SETUP_UNITS = ['grannytv-setup', 'grannytv-prepare']
+SETUP_MODE_FLAG = '/var/lib/grannytv-setup-mode'
+DHCPCD_CONF = '/etc/dhcpcd.conf'
+DHCPCD_HOTSPOT_SED = '/# GrannyTV Setup Hotspot Configuration/,+3d'
+HOTSPOT_CONNECTION = 'GrannyTV-Hotspot'
+STEP_TIMEOUT = 60  # seconds
+MAX_WORKERS = 4
+
+
+class Step:
+    def __init__(self, name, command, after=()):
+        self.name = name
+        self.command = command
+        self.after = [dep for dep in after if dep]
+
+
+def detect_network_manager():
+    """'NetworkManager' on Bookworm-style images, 'dhcpcd' on classic Raspberry Pi OS"""
+    try:
+        result = subprocess.run(['systemctl', 'is-active', '--quiet', 'NetworkManager'], timeout=10)
+        return 'NetworkManager' if result.returncode == 0 else 'dhcpcd'
+    except Exception:
+        return 'dhcpcd'
+
+
+def build_steps(plan):
+    """Turn a plan into steps; `after` lists the steps each one must wait for"""
+    steps = []
+
+    def add(name, command, after=()):
+        steps.append(Step(name, command, after))
+        return name
+
+    installs = [add(f"install {f['dst']}", ['install', '-m', f.get('mode', '0644'), f['src'], f['dst']])
+                for f in plan.get('files', [])]
+    edits = [add(f"edit {e['path']}", ['sed', '-i', e['sed'], e['path']])
+             for e in plan.get('edits', [])]
+    if plan.get('remove'):
+        add('remove setup files', ['rm', '-f'] + plan['remove'])
+
+    # systemctl takes many units per call - one call per verb instead of one per unit
+    stop = add('stop ' + ' '.join(plan['stop']), ['systemctl', 'stop'] + plan['stop']) if plan.get('stop') else None
+    if plan.get('disable'):
+        add('disable ' + ' '.join(plan['disable']), ['systemctl', 'disable'] + plan['disable'])
+    reload = add('daemon-reload', ['systemctl', 'daemon-reload'], after=installs) if installs else None
+    if plan.get('enable'):
+        add('enable ' + ' '.join(plan['enable']), ['systemctl', 'enable'] + plan['enable'], after=[reload])
+
+    network = plan.get('network')
+    if network:
+        interface = network.get('interface', 'wlan0')
+        flush = add(f'flush {interface}', ['ip', 'addr', 'flush', 'dev', interface], after=[stop])
+        add('flush NAT rules', ['iptables', '-t', 'nat', '-F', 'PREROUTING'])
+        # The client side needs the hotspot gone and its config files in place
+        ready = [flush] + installs + edits
+
+        manager = network.get('manager') or detect_network_manager()
+        if manager == 'NetworkManager':
+            delete = add('delete hotspot connection',
+                         ['nmcli', 'con', 'delete', network.get('hotspot_connection', HOTSPOT_CONNECTION)])
+            dhcpcd = add('disable dhcpcd', ['systemctl', 'disable', '--now', 'dhcpcd'])
+            enable = add('enable NetworkManager', ['systemctl', 'enable', 'NetworkManager'])
+            restart = add('restart NetworkManager', ['systemctl', 'restart', 'NetworkManager'],
+                          after=ready + [delete, dhcpcd, enable])
+            add(f'manage {interface}', ['nmcli', 'device', 'set', interface, 'managed', 'yes'], after=[restart])
+        else:
+            enable = add('enable wpa_supplicant dhcpcd', ['systemctl', 'enable', 'wpa_supplicant', 'dhcpcd'])
+            add('restart wpa_supplicant dhcpcd', ['systemctl', 'restart', 'wpa_supplicant', 'dhcpcd'],
+                after=ready + [enable])
+    return steps
+
+
+def run_step(step, sudo, started):
+    """Run one step; failures are recorded, not raised - every step is best effort"""
+    command = (['sudo', '-n'] + step.command) if sudo else step.command
+    result = {'command': ' '.join(step.command), 'start': round(time.monotonic() - started, 3)}
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=STEP_TIMEOUT)
+        result['returncode'] = completed.returncode
+        if completed.returncode != 0:
+            result['output'] = (completed.stderr or completed.stdout).strip()[-200:]
+    except subprocess.TimeoutExpired:
+        result['returncode'] = None
+        result['output'] = f'timed out after {STEP_TIMEOUT}s'
+    except OSError as e:
+        result['returncode'] = None
+        result['output'] = str(e)
+    result['seconds'] = round(time.monotonic() - started - result['start'], 3)
+    return result
+
+
+def run_plan(plan, sudo=None, max_workers=MAX_WORKERS):
+    """Run the plan's steps, each as soon as its dependencies finished"""
+    if sudo is None:
+        sudo = hasattr(os, 'geteuid') and os.geteuid() != 0
+    steps = build_steps(plan)
+    pending = {step.name: step for step in steps}
+    running = {}
+    results = {}
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name, step in list(pending.items()):
+                if all(dep in results for dep in step.after):
+                    running[pool.submit(run_step, step, sudo, started)] = name
+                    del pending[name]
+            if not running:
+                break  # Dependencies that can never finish - report what ran
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    return {
+        'started': time.time() - (time.monotonic() - started),
+        'total_seconds': round(time.monotonic() - started, 3),
+        'serial_seconds': round(sum(r['seconds'] for r in results.values()), 3),
+        'failed': [name for name, r in results.items() if r['returncode'] != 0],
+        'skipped': list(pending),
+        'steps': results,
+    }
+
+
+def finalize_plan(install_service, wifi_config=None, network_manager=None):
+    """The hotspot -> home WiFi switch that /finalize performs"""
+    files = [{'src': install_service, 'dst': '/etc/systemd/system/grannytv-install.service'}]
+    if wifi_config:
+        files.append({'src': wifi_config, 'dst': '/etc/wpa_supplicant/wpa_supplicant.conf', 'mode': '0600'})
+    return {
+        'files': files,
+        'edits': [{'path': DHCPCD_CONF, 'sed': DHCPCD_HOTSPOT_SED}],
+        # Without the flag the setup services stay off after the reboot
+        'remove': [SETUP_MODE_FLAG],
+        'stop': HOTSPOT_UNITS,
+        'disable': HOTSPOT_UNITS + SETUP_UNITS,
+        'enable': ['grannytv-install'],
+        'network': {'interface': 'wlan0', 'manager': network_manager},
+    }
+
+
+def print_report(report):
+    print(f"Network transition: {report['total_seconds']:.1f}s "
+          f"({report['serial_seconds']:.1f}s if run one at a time)")
+    for name, result in sorted(report['steps'].items(), key=lambda item: item[1]['start']):
+        status = 'ok' if result['returncode'] == 0 else f"failed ({result.get('output', '')})"
+        print(f"  {result['start']:6.2f}s +{result['seconds']:5.2f}s  {name}: {status}")
+    for name in report['skipped']:
+        print(f"  skipped: {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GrannyTV hotspot -> WiFi transition')
+    parser.add_argument('--plan', required=True, help='Plan JSON file')
+    parser.add_argument('--report', help='Write the timing report here (JSON)')
+    parser.add_argument('--start-delay', type=float, default=0,
+                        help='Seconds to wait first (lets the web response reach the phone)')
+    parser.add_argument('--reboot-delay', type=float, default=None,
+                        help='Reboot this many seconds after the transition')
+    parser.add_argument('--dry-run', action='store_true', help='Print the steps without running them')
+    args = parser.parse_args()
+
+    with open(args.plan, 'r') as f:
+        plan = json.load(f)
+
+    if args.dry_run:
+        for step in build_steps(plan):
+            after = f"  (after: {', '.join(step.after)})" if step.after else ''
+            print(f"{step.name}: {' '.join(step.command)}{after}")
+        return
+
+    time.sleep(args.start_delay)
+    report = run_plan(plan)
+    print_report(report)
+    if args.report:
+        try:
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+        except OSError as e:
+            print(f"Could not write report: {e}")
+    sys.stdout.flush()
+
+    if args.reboot_delay is not None:
+        time.sleep(args.reboot_delay)
+        print("Rebooting system to complete setup...")
+        sys.stdout.flush()
+        subprocess.run(['reboot'] if os.geteuid() == 0 else ['sudo', 'reboot'], check=False)
+
+
+if __name__ == '__main__':
+    main()
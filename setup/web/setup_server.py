@@ -4,20 +4,59 @@ GrannyTV Smartphone Setup Server
 Web interface for configuring Raspberry Pi via smartphone
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 import json
 import subprocess
 import os
 import re
+import sys
 import time
 import threading
+import uuid
+import gzip
+import hashlib
+import mimetypes
+import platform
+import socket
+from concurrent.futures import ThreadPoolExecutor
 
-app = Flask(__name__)
+import install_progress
+import network_transition
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # python3-brotli is optional - every phone browser takes gzip
+
+app = Flask(__name__, static_folder=None)
 
 # Configuration
 SETUP_CONFIG_FILE = '/tmp/grannytv_setup_config.json'
 WIFI_SCAN_CACHE = '/tmp/wifi_networks.json'
-WIFI_SCAN_TIMEOUT = 30  # seconds
+WIFI_SCAN_INTERVAL = 30  # seconds between scans while someone is on the setup page
+WIFI_SCAN_IDLE_INTERVAL = 300  # seconds between scans when nobody is looking
+WIFI_SCAN_ACTIVE_WINDOW = 120  # a request keeps the fast schedule for this long
+WIFI_SCAN_COMMAND_TIMEOUT = 15
+WIFI_EVENTS_KEEPALIVE = 15
+WIFI_EVENTS_MAX_SECONDS = 600  # the page reconnects by itself after this
+STREAM_TEST_URL = os.environ.get(
+    'GRANNYTV_TEST_STREAM_URL',  # e.g. a local fixture stream, so tests don't need the internet
+    'http://commondatastorage.googleapis.com/gtv-videos-bucket/sample/BigBuckBunny.mp4')
+STREAM_TEST_TIMEOUT = 10  # seconds mpv gets to produce a frame
+STREAM_TEST_CACHE_SECONDS = 300  # identical URLs reuse a successful result this fresh
+STREAM_TEST_FAILURE_CACHE_SECONDS = 3  # failures only absorb double taps - a retry runs again
+STREAM_TEST_WORKERS = 2
+STREAM_TEST_JOBS_KEPT = 50
+HARDWARE_CACHE_SECONDS = 600  # the phone revalidates with the ETag after this
+TRANSITION_PLAN_FILE = '/tmp/grannytv-transition-plan.json'
+TRANSITION_REPORT_FILE = '/tmp/grannytv-transition.json'
+TRANSITION_LOG_FILE = '/tmp/grannytv-transition.log'
+TRANSITION_START_DELAY = 2  # seconds for the /finalize response to reach the phone
+TRANSITION_REBOOT_DELAY = 3
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'  # URLs carry a content hash
+PAGE_CACHE_CONTROL = 'no-cache'  # always revalidate - the ETag makes that a tiny 304
+SERVER_THREADS = 16  # a few phones, each holding a WiFi event stream open
 
 class SetupConfig:
     def __init__(self):
@@ -67,101 +106,266 @@ class SetupConfig:
                 print(f"Error saving config to alternative location: {e2}")
                 return False
 
-setup_config = SetupConfig()
-
-@app.route('/')
-def index():
-    """Main setup page - mobile optimized"""
-    return render_template('setup.html')
-
-@app.route('/status')
-def status():
-    """Show current setup status"""
-    return render_template('status.html', config=setup_config.config)
+def parse_iwlist(output):
+    """Networks from `iwlist scan` output, strongest first, one per SSID"""
+    networks = []
+    current_network = {}
+    
+    for line in output.split('\n'):
+        line = line.strip()
+        
+        if 'Cell ' in line and 'Address:' in line:
+            if current_network.get('ssid'):
+                networks.append(current_network)
+            current_network = {}
+        elif 'ESSID:' in line:
+            ssid = line.split('ESSID:')[1].strip('"')
+            if ssid and ssid != '<hidden>':
+                current_network['ssid'] = ssid
+        elif 'Quality=' in line:
+            # Extract signal quality
+            quality_match = re.search(r'Quality=(\d+)/(\d+)', line)
+            if quality_match:
+                quality = int(quality_match.group(1))
+                max_quality = int(quality_match.group(2))
+                current_network['quality'] = int((quality / max_quality) * 100)
+        elif 'Encryption key:' in line:
+            current_network['encrypted'] = line.lower().endswith(':on')
+    
+    # Add the last network
+    if current_network.get('ssid'):
+        networks.append(current_network)
+    
+    # Sort by quality (best first)
+    networks.sort(key=lambda x: x.get('quality', 0), reverse=True)
+    
+    # Remove duplicates while preserving order
+    seen = set()
+    unique_networks = []
+    for network in networks:
+        if network['ssid'] not in seen:
+            seen.add(network['ssid'])
+            unique_networks.append(network)
+    
+    return unique_networks[:20]  # Limit to top 20
 
-@app.route('/scan_wifi')
-def scan_wifi():
-    """Scan for available WiFi networks"""
-    try:
-        # Check if we have a recent scan cached
-        if os.path.exists(WIFI_SCAN_CACHE):
-            cache_age = time.time() - os.path.getmtime(WIFI_SCAN_CACHE)
-            if cache_age < WIFI_SCAN_TIMEOUT:
+class WifiScanner:
+    """Scans WiFi in a background thread so requests never wait on iwlist"""
+    
+    def __init__(self, interface='wlan0'):
+        self.interface = interface
+        self.condition = threading.Condition()
+        self.networks = []
+        self.scanned_at = None
+        self.error = None
+        self.scanning = False
+        self.version = 0
+        self.last_request = 0
+        self.wake = threading.Event()
+        self.thread = None
+        self.load_cache()
+    
+    def load_cache(self):
+        """Start from the last scan on disk so a restarted server isn't empty"""
+        try:
+            if os.path.exists(WIFI_SCAN_CACHE):
                 with open(WIFI_SCAN_CACHE, 'r') as f:
-                    return json.load(f)
-        
-        # Perform new scan
-        print("Scanning for WiFi networks...")
-        result = subprocess.run(['sudo', 'iwlist', 'wlan0', 'scan'], 
-                              capture_output=True, text=True, timeout=15)
-        
-        networks = []
-        current_network = {}
-        
-        for line in result.stdout.split('\n'):
-            line = line.strip()
+                    self.networks = json.load(f).get('networks', [])
+                self.scanned_at = os.path.getmtime(WIFI_SCAN_CACHE)
+        except Exception as e:
+            print(f"Could not load WiFi scan cache: {e}")
+    
+    def start(self):
+        """Start the scanner thread (safe to call on every request)"""
+        with self.condition:
+            self.last_request = time.time()
+            if self.thread:
+                return
+            self.thread = threading.Thread(target=self._run, name='wifi-scanner', daemon=True)
+        self.thread.start()
+    
+    def refresh(self):
+        """Scan now instead of waiting for the schedule"""
+        self.wake.set()
+    
+    def _run(self):
+        while True:
+            self.scan()
+            # Scanning briefly takes the radio off the hotspot channel, so only
+            # keep the fast schedule while the setup page is actually open
+            active = time.time() - self.last_request < WIFI_SCAN_ACTIVE_WINDOW
+            self.wake.wait(WIFI_SCAN_INTERVAL if active else WIFI_SCAN_IDLE_INTERVAL)
+            self.wake.clear()
+    
+    def scan(self):
+        """Run one scan and publish the result"""
+        with self.condition:
+            self.scanning = True
+            self.version += 1
+            self.condition.notify_all()
+        
+        networks, error = None, None
+        try:
+            print("Scanning for WiFi networks...")
+            result = subprocess.run(['sudo', 'iwlist', self.interface, 'scan'],
+                                    capture_output=True, text=True, timeout=WIFI_SCAN_COMMAND_TIMEOUT)
+            networks = parse_iwlist(result.stdout)
+        except subprocess.TimeoutExpired:
+            error = 'WiFi scan timeout'
+        except Exception as e:
+            print(f"WiFi scan error: {e}")
+            error = str(e)
+        
+        with self.condition:
+            self.scanning = False
+            self.error = error
+            if networks is not None:
+                # Keep showing the previous networks if a scan fails
+                self.networks = networks
+                self.scanned_at = time.time()
+            self.version += 1
+            self.condition.notify_all()
+        
+        if networks is not None:
+            try:
+                with open(WIFI_SCAN_CACHE, 'w') as f:
+                    json.dump({'networks': networks}, f)
+            except OSError:
+                pass
+    
+    def snapshot(self):
+        """Current networks plus how old they are"""
+        with self.condition:
+            snapshot = {
+                'networks': self.networks,
+                'age': round(time.time() - self.scanned_at) if self.scanned_at else None,
+                'scanning': self.scanning,
+                'version': self.version,
+            }
+            if self.error:
+                snapshot['error'] = self.error
+            return snapshot
+    
+    def wait_for_update(self, version, timeout):
+        """Block until a newer snapshot than `version` exists (or timeout)"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+        return self.snapshot()
+
+class StreamTestJobs:
+    """Runs stream tests in worker threads; requests only start and poll them"""
+    
+    def __init__(self, workers=STREAM_TEST_WORKERS):
+        self.lock = threading.Lock()
+        self.jobs = {}  # job id -> job
+        self.by_url = {}  # url -> latest job id
+        self.mpv_version = None
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='stream-test')
+    
+    def submit(self, url):
+        """Return a running or recent job for this URL, or start a new one"""
+        with self.lock:
+            job = self.jobs.get(self.by_url.get(url))
+            if job and job['status'] == 'done':
+                ttl = (STREAM_TEST_CACHE_SECONDS if job['result'].get('success')
+                       else STREAM_TEST_FAILURE_CACHE_SECONDS)
+                if time.time() - job['finished'] >= ttl:
+                    job = None
+            if job:
+                return dict(job, cached=job['status'] == 'done')
             
-            if 'Cell ' in line and 'Address:' in line:
-                if current_network.get('ssid'):
-                    networks.append(current_network)
-                current_network = {}
-            elif 'ESSID:' in line:
-                ssid = line.split('ESSID:')[1].strip('"')
-                if ssid and ssid != '<hidden>':
-                    current_network['ssid'] = ssid
-            elif 'Quality=' in line:
-                # Extract signal quality
-                quality_match = re.search(r'Quality=(\d+)/(\d+)', line)
-                if quality_match:
-                    quality = int(quality_match.group(1))
-                    max_quality = int(quality_match.group(2))
-                    current_network['quality'] = int((quality / max_quality) * 100)
-            elif 'Encryption key:' in line:
-                current_network['encrypted'] = 'on' in line.lower()
-        
-        # Add the last network
-        if current_network.get('ssid'):
-            networks.append(current_network)
-        
-        # Sort by quality (best first)
-        networks.sort(key=lambda x: x.get('quality', 0), reverse=True)
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_networks = []
-        for network in networks:
-            if network['ssid'] not in seen:
-                seen.add(network['ssid'])
-                unique_networks.append(network)
-        
-        response = {'networks': unique_networks[:20]}  # Limit to top 20
-        
-        # Cache the results
-        with open(WIFI_SCAN_CACHE, 'w') as f:
-            json.dump(response, f)
-        
-        return jsonify(response)
-        
-    except subprocess.TimeoutExpired:
-        return jsonify({'networks': [], 'error': 'WiFi scan timeout'})
-    except Exception as e:
-        print(f"WiFi scan error: {e}")
-        return jsonify({'networks': [], 'error': str(e)})
+            job = {
+                'id': uuid.uuid4().hex[:12],
+                'url': url,
+                'status': 'queued',
+                'stage': 'Waiting for a free worker',
+                'progress': 0,
+                'created': time.time(),
+                'finished': None,
+                'result': None,
+            }
+            self.jobs[job['id']] = job
+            self.by_url[url] = job['id']
+            # Forget the oldest jobs so a busy wizard can't grow this forever
+            for old_id in list(self.jobs)[:-STREAM_TEST_JOBS_KEPT]:
+                old = self.jobs.pop(old_id)
+                if self.by_url.get(old['url']) == old_id:
+                    del self.by_url[old['url']]
+            snapshot = dict(job, cached=False)
+        self.executor.submit(self._run, job)
+        return snapshot
+    
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+    
+    def _update(self, job, **fields):
+        with self.lock:
+            job.update(fields)
+    
+    def _finish(self, job, result):
+        self._update(job, status='done', stage='Finished', progress=100,
+                     finished=time.time(), result=result)
+    
+    def _run(self, job):
+        started = time.time()
+        try:
+            # mpv doesn't change while the wizard runs - check it once
+            if self.mpv_version is None:
+                self._update(job, status='running', stage='Checking MPV', progress=5)
+                result = subprocess.run(['mpv', '--version'],
+                                        capture_output=True, text=True, timeout=5)
+                if result.returncode != 0:
+                    self._finish(job, {'success': False, 'error': 'MPV not installed'})
+                    return
+                self.mpv_version = result.stdout.split('\n')[0]
+            
+            self._update(job, status='running', stage='Opening stream', progress=10)
+            process = subprocess.Popen(['mpv', '--no-video', '--ao=null', '--frames=1', job['url']],
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            deadline = time.time() + STREAM_TEST_TIMEOUT
+            while process.poll() is None and time.time() < deadline:
+                elapsed = STREAM_TEST_TIMEOUT - (deadline - time.time())
+                self._update(job, progress=10 + int(85 * elapsed / STREAM_TEST_TIMEOUT))
+                time.sleep(0.25)
+            
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+                self._finish(job, {'success': False, 'error': 'Stream test timed out'})
+            elif process.returncode == 0:
+                self._finish(job, {'success': True, 'message': 'Stream test successful',
+                                   'seconds': round(time.time() - started, 1)})
+            else:
+                self._finish(job, {'success': False, 'error': 'Stream test failed'})
+        except FileNotFoundError:
+            self._finish(job, {'success': False, 'error': 'MPV not installed'})
+        except Exception as e:
+            print(f"Stream test error: {e}")
+            self._finish(job, {'success': False, 'error': str(e)})
 
-@app.route('/detect_pi')
-def detect_pi():
-    """Detect Raspberry Pi model and hardware info"""
-    try:
+class HardwareProfile:
+    """Hardware facts read once at startup - they can't change while we run"""
+    
+    def __init__(self):
+        self.info = self.gather()
+        body = json.dumps(self.info, sort_keys=True).encode('utf-8')
+        self.etag = hashlib.sha1(body).hexdigest()[:16]
+    
+    @staticmethod
+    def gather():
         pi_info = {}
         
         # Pi model
         try:
             with open('/proc/device-tree/model', 'r') as f:
-                pi_info['model'] = f.read().strip()
+                pi_info['model'] = f.read().strip().rstrip('\x00')
         except Exception:
             pi_info['model'] = 'Unknown Pi Model'
         
         # Memory info
+        pi_info['memory'] = 'Unknown'
         try:
             with open('/proc/meminfo', 'r') as f:
                 for line in f:
@@ -170,50 +374,163 @@ def detect_pi():
                         pi_info['memory'] = f"{mem_kb // 1024}MB"
                         break
         except Exception:
-            pi_info['memory'] = 'Unknown'
+            pass
         
         # GPU memory
+        pi_info['gpu_memory'] = 'Unknown'
         try:
-            result = subprocess.run(['vcgencmd', 'get_mem', 'gpu'], 
-                                  capture_output=True, text=True)
+            result = subprocess.run(['vcgencmd', 'get_mem', 'gpu'],
+                                  capture_output=True, text=True, timeout=5)
             if result.returncode == 0:
                 pi_info['gpu_memory'] = result.stdout.strip().split('=')[1]
         except Exception:
-            pi_info['gpu_memory'] = 'Unknown'
+            pass
+        
+        pi_info['cpu_count'] = os.cpu_count()
+        pi_info['hostname'] = platform.node()
+        pi_info['platform'] = f"{platform.system()} {platform.machine()}"
         
         # Current user
         pi_info['current_user'] = os.getenv('USER', 'unknown')
         pi_info['home_dir'] = os.path.expanduser('~')
-        
-        return jsonify(pi_info)
-        
-    except Exception as e:
-        return jsonify({'error': str(e)})
+        return pi_info
 
-@app.route('/test_stream')
+class CompressedAsset:
+    """A response body compressed once, served in whatever encoding the phone accepts"""
+    
+    def __init__(self, body, content_type):
+        self.content_type = content_type
+        self.etag = hashlib.sha1(body).hexdigest()[:16]
+        self.bodies = {}
+        if brotli:
+            self.bodies['br'] = brotli.compress(body, quality=11)
+        self.bodies['gzip'] = gzip.compress(body, compresslevel=9)
+        self.bodies['identity'] = body
+    
+    def response(self, cache_control):
+        encoding = request.accept_encodings.best_match(list(self.bodies), default='identity')
+        response = Response(self.bodies[encoding], content_type=self.content_type)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = cache_control
+        response.set_etag(f"{self.etag}-{encoding}")
+        return response.make_conditional(request)
+
+class AssetStore:
+    """Static files loaded and compressed at startup, addressed by content hash"""
+    
+    def __init__(self, directory):
+        self.assets = {}  # served name -> (asset, cache control)
+        self.urls = {}
+        if not os.path.isdir(directory):
+            return
+        for name in sorted(os.listdir(directory)):
+            with open(os.path.join(directory, name), 'rb') as f:
+                body = f.read()
+            content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            if content_type.startswith('text/') or content_type.endswith('javascript'):
+                content_type += '; charset=utf-8'
+            asset = CompressedAsset(body, content_type)
+            stem, ext = os.path.splitext(name)
+            hashed = f"{stem}.{asset.etag[:10]}{ext}"
+            self.assets[hashed] = (asset, ASSET_CACHE_CONTROL)
+            self.assets[name] = (asset, PAGE_CACHE_CONTROL)  # unhashed name still works, just not cached
+            self.urls[name] = f"/assets/{hashed}"
+    
+    def url(self, name):
+        return self.urls.get(name, f"/assets/{name}")
+
+setup_config = SetupConfig()
+hardware_profile = HardwareProfile()
+asset_store = AssetStore(STATIC_DIR)
+app.jinja_env.globals['asset_url'] = asset_store.url
+page_cache = {}
+
+def cached_page(template):
+    """Render a context-free template once and serve it precompressed"""
+    page = page_cache.get(template)
+    if page is None:
+        page = page_cache[template] = CompressedAsset(
+            render_template(template).encode('utf-8'), 'text/html; charset=utf-8')
+    return page.response(PAGE_CACHE_CONTROL)
+wifi_scanner = WifiScanner()
+stream_tests = StreamTestJobs()
+
+@app.route('/')
+def index():
+    """Main setup page - mobile optimized"""
+    return cached_page('setup.html')
+
+@app.route('/assets/<name>')
+def assets(name):
+    """CSS/JS for the setup pages, precompressed and cached by content hash"""
+    entry = asset_store.assets.get(name)
+    if entry is None:
+        return '', 404
+    asset, cache_control = entry
+    return asset.response(cache_control)
+
+@app.route('/status')
+def status():
+    """Show current setup status"""
+    return render_template('status.html', config=setup_config.config, hardware=hardware_profile.info)
+
+@app.route('/scan_wifi')
+def scan_wifi():
+    """Latest WiFi scan, answered instantly from the scanner's snapshot"""
+    wifi_scanner.start()
+    if request.args.get('refresh'):
+        wifi_scanner.refresh()
+    return jsonify(wifi_scanner.snapshot())
+
+@app.route('/scan_wifi/events')
+def scan_wifi_events():
+    """Server-sent events: the current snapshot, then every new scan"""
+    wifi_scanner.start()
+    
+    def stream():
+        snapshot = wifi_scanner.snapshot()
+        yield f"data: {json.dumps(snapshot)}\n\n"
+        deadline = time.time() + WIFI_EVENTS_MAX_SECONDS
+        while time.time() < deadline:
+            update = wifi_scanner.wait_for_update(snapshot['version'], WIFI_EVENTS_KEEPALIVE)
+            if update['version'] == snapshot['version']:
+                yield ": keepalive\n\n"  # Stops proxies and phones dropping an idle stream
+                continue
+            snapshot = update
+            yield f"data: {json.dumps(snapshot)}\n\n"
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/detect_pi')
+def detect_pi():
+    """Raspberry Pi model and hardware info, from the profile gathered at startup"""
+    response = jsonify(hardware_profile.info)
+    response.set_etag(hardware_profile.etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = HARDWARE_CACHE_SECONDS
+    return response.make_conditional(request)
+
+@app.route('/test_stream', methods=['GET', 'POST'])
 def test_stream():
-    """Test if MPV and a sample stream work"""
-    try:
-        # Test MPV installation
-        result = subprocess.run(['mpv', '--version'], 
-                              capture_output=True, text=True, timeout=5)
-        if result.returncode != 0:
-            return jsonify({'success': False, 'error': 'MPV not installed'})
-        
-        # Test with a sample stream (short timeout)
-        test_url = "http://commondatastorage.googleapis.com/gtv-videos-bucket/sample/BigBuckBunny.mp4"
-        result = subprocess.run([
-            'timeout', '10',
-            'mpv', '--no-video', '--ao=null', '--frames=1', test_url
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            return jsonify({'success': True, 'message': 'Stream test successful'})
-        else:
-            return jsonify({'success': False, 'error': 'Stream test failed'})
-            
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    """Start a stream test in the background (or reuse a recent one for the same URL)"""
+    data = request.get_json(silent=True) or {}
+    url = data.get('url') or request.args.get('url') or STREAM_TEST_URL
+    if not re.match(r'^https?://', url):
+        return jsonify({'error': 'Stream URL must be http:// or https://'}), 400
+    
+    job = stream_tests.submit(url)
+    return jsonify(job), 200 if job['status'] == 'done' else 202
+
+@app.route('/test_stream/<job_id>')
+def test_stream_status(job_id):
+    """Poll a stream test's progress and result"""
+    job = stream_tests.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown test'}), 404
+    return jsonify(job)
 
 @app.route('/configure', methods=['POST'])
 def configure():
@@ -381,88 +698,8 @@ def finalize():
         if config is None:
             return jsonify({'error': 'No configuration found'}), 400
         
-        # Apply WiFi configuration
-        try:
-            # Try primary location first
-            if os.path.exists('/tmp/wpa_supplicant.conf'):
-                subprocess.run(['sudo', 'cp', '/tmp/wpa_supplicant.conf', 
-                               '/etc/wpa_supplicant/wpa_supplicant.conf'], check=True)
-                print("WiFi configuration applied successfully from /tmp")
-            else:
-                # Try alternative location
-                alt_wifi_config = os.path.expanduser('~/wpa_supplicant.conf')
-                if os.path.exists(alt_wifi_config):
-                    subprocess.run(['sudo', 'cp', alt_wifi_config, 
-                                   '/etc/wpa_supplicant/wpa_supplicant.conf'], check=True)
-                    print(f"WiFi configuration applied successfully from {alt_wifi_config}")
-                else:
-                    print("Warning: No WiFi configuration file found")
-        except subprocess.CalledProcessError as e:
-            print(f"Warning: Could not apply WiFi configuration: {e}")
-            # Continue with cleanup anyway - this might be a test environment
-        
-        # IMMEDIATELY disable hotspot and switch to client mode
-        print("Disabling hotspot and switching to client mode...")
-        try:
-            # Stop hotspot services
-            subprocess.run(['sudo', 'systemctl', 'stop', 'hostapd'], check=False)
-            subprocess.run(['sudo', 'systemctl', 'stop', 'dnsmasq'], check=False)
-            subprocess.run(['sudo', 'systemctl', 'disable', 'hostapd'], check=False)
-            subprocess.run(['sudo', 'systemctl', 'disable', 'dnsmasq'], check=False)
-            
-            # Clear wlan0 interface
-            subprocess.run(['sudo', 'ip', 'addr', 'flush', 'dev', 'wlan0'], check=False)
-            
-            # Remove iptables NAT rules
-            subprocess.run(['sudo', 'iptables', '-t', 'nat', '-F', 'PREROUTING'], check=False)
-            
-            # CRITICAL: Remove hotspot configuration from dhcpcd.conf
-            # This prevents the static IP 192.168.4.1 from being set on reboot
-            try:
-                # Use sed to remove the hotspot configuration section
-                # This is more reliable than reading/writing as it handles permissions correctly
-                subprocess.run([
-                    'sudo', 'sed', '-i',
-                    '/# GrannyTV Setup Hotspot Configuration/,+3d',
-                    '/etc/dhcpcd.conf'
-                ], check=True)
-                print("✅ Removed hotspot configuration from dhcpcd.conf")
-            except Exception as e:
-                print(f"Warning: Could not clean dhcpcd.conf: {e}")
-                # Try backup restore as fallback
-                try:
-                    if os.path.exists('/etc/dhcpcd.conf.backup'):
-                        subprocess.run(['sudo', 'cp', '/etc/dhcpcd.conf.backup', '/etc/dhcpcd.conf'], check=True)
-                        print("✅ Restored dhcpcd.conf from backup")
-                except Exception as e2:
-                    print(f"Warning: Backup restore also failed: {e2}")
-            
-            # Check if system uses NetworkManager or dhcpcd
-            nm_active = subprocess.run(['systemctl', 'is-active', 'NetworkManager'], 
-                                      capture_output=True, text=True).returncode == 0
-            
-            if nm_active:
-                # Use NetworkManager
-                print("Using NetworkManager for network management")
-                subprocess.run(['sudo', 'systemctl', 'enable', 'NetworkManager'], check=False)
-                subprocess.run(['sudo', 'systemctl', 'restart', 'NetworkManager'], check=False)
-                # Stop dhcpcd to avoid conflicts
-                subprocess.run(['sudo', 'systemctl', 'stop', 'dhcpcd'], check=False)
-                subprocess.run(['sudo', 'systemctl', 'disable', 'dhcpcd'], check=False)
-            else:
-                # Use dhcpcd (traditional Raspberry Pi)
-                print("Using dhcpcd for network management")
-                subprocess.run(['sudo', 'systemctl', 'enable', 'wpa_supplicant'], check=False)
-                subprocess.run(['sudo', 'systemctl', 'restart', 'wpa_supplicant'], check=False)
-                subprocess.run(['sudo', 'systemctl', 'enable', 'dhcpcd'], check=False)
-                subprocess.run(['sudo', 'systemctl', 'restart', 'dhcpcd'], check=False)
-            
-            print("Hotspot disabled, switching to client mode")
-        except Exception as e:
-            print(f"Warning: Error during hotspot cleanup: {e}")
-            # Continue anyway - the installation script will also try to clean up
-        
         # Create installation script that will run after reboot
+        progress_file = install_progress.PROGRESS_FILE
         install_script = f"""#!/bin/bash
 # Auto-generated installation script
 set -e
@@ -473,8 +710,21 @@ USER_NAME="{config['username']}"
 INSTALL_PATH="{config['install_path']}"
 STREAM_SOURCE="{config.get('stream_source', '')}"
 
-# Switch to target user
-sudo -u "$USER_NAME" bash << 'EOF'
+# Progress events for the phone (see install_progress.py)
+mkdir -p "$(dirname "{progress_file}")"
+: > "{progress_file}"
+chown "$USER_NAME" "{progress_file}" || true
+{install_progress.shell_function(progress_file)}
+python3 "{os.path.abspath(install_progress.__file__)}" --file "{progress_file}" serve --port 8080 &
+trap 'progress failed 100 "Installation failed - see journalctl -u grannytv-install" error' ERR
+progress start 5 "Installation started"
+
+# Switch to target user. A failing step exits the sub-shell non-zero,
+# which fires the ERR trap above instead of reporting success.
+sudo -u "$USER_NAME" bash -s "$INSTALL_PATH" << 'EOF'
+set -e
+INSTALL_PATH="$1"
+{install_progress.shell_function(progress_file)}
 cd ~
 
 # Create installation directory
@@ -482,6 +732,7 @@ mkdir -p "$INSTALL_PATH"
 cd "$INSTALL_PATH"
 
 # Clone repository
+progress download 15 "Downloading GrannyTV"
 if [ ! -d ".git" ]; then
     git clone https://github.com/gljeremy/grannytv-client.git .
 else
@@ -490,11 +741,13 @@ fi
 
 # DRM mode - no graphical.target needed (minimal resources)
 # MPV uses Direct Rendering Manager for direct framebuffer output
+progress console 35 "Configuring console mode"
 echo "🖥️ Configuring console mode (multi-user target)..."
 sudo systemctl set-default multi-user.target
 echo "✅ Console mode configured - minimal resources, direct video output"
 
 # Run the main setup script
+progress player 45 "Installing the TV player (this takes a few minutes)"
 chmod +x platforms/linux/pi-setup.sh
 ./platforms/linux/pi-setup.sh
 
@@ -502,10 +755,12 @@ echo "✅ GrannyTV installation complete!"
 EOF
 
 # Clean up any remaining setup mode artifacts
+progress cleanup 95 "Finishing up"
 if [ -f /opt/grannytv-setup/restore-normal-wifi.sh ]; then
     echo "Running final cleanup..."
     /opt/grannytv-setup/restore-normal-wifi.sh
 fi
+progress done 100 "Installation complete - the TV is starting" done
 """
         
         # Write and schedule installation script
@@ -534,105 +789,35 @@ WantedBy=multi-user.target
         with open('/tmp/grannytv-install.service', 'w') as f:
             f.write(install_service)
         
-        subprocess.run(['sudo', 'cp', '/tmp/grannytv-install.service', 
-                       '/etc/systemd/system/'], check=True)
-        subprocess.run(['sudo', 'systemctl', 'daemon-reload'], check=True)
-        subprocess.run(['sudo', 'systemctl', 'enable', 'grannytv-install'], check=True)
+        # WiFi config written by /configure (home directory if /tmp wasn't writable)
+        wifi_config = '/tmp/wpa_supplicant.conf'
+        if not os.path.exists(wifi_config):
+            wifi_config = os.path.expanduser('~/wpa_supplicant.conf')
         
-        print("Finalization complete - scheduling reboot")
+        if not os.path.exists(wifi_config):
+            print("Warning: No WiFi configuration file found")
+            wifi_config = None
         
-        # Create immediate cleanup script and run it in background
-        immediate_cleanup = """#!/bin/bash
-# Immediate cleanup to switch from hotspot to client mode
-echo "Starting immediate WiFi switch..."
-
-# Remove setup mode flag FIRST - this prevents services from restarting
-sudo rm -f /var/lib/grannytv-setup-mode
-
-# Stop hotspot services immediately
-sudo systemctl stop hostapd 2>/dev/null || true
-sudo systemctl stop dnsmasq 2>/dev/null || true
-sudo systemctl disable hostapd 2>/dev/null || true
-sudo systemctl disable dnsmasq 2>/dev/null || true
-
-# Clear the static IP from wlan0
-sudo ip addr flush dev wlan0 2>/dev/null || true
-sudo ip link set wlan0 down 2>/dev/null || true
-
-# Remove iptables rules
-sudo iptables -t nat -F PREROUTING 2>/dev/null || true
-
-# CRITICAL: Clean up dhcpcd.conf to remove static IP configuration
-# This prevents 192.168.4.1 from being set on reboot
-if [ -f /etc/dhcpcd.conf ]; then
-    echo "Cleaning dhcpcd.conf..."
-    
-    # Remove GrannyTV hotspot configuration section (comment line + 3 config lines)
-    sudo sed -i '/# GrannyTV Setup Hotspot Configuration/,+3d' /etc/dhcpcd.conf
-    echo "Removed hotspot configuration from dhcpcd.conf"
-fi
-
-# Decide which network manager to use
-if systemctl is-active --quiet NetworkManager; then
-    echo "Using NetworkManager..."
-    # Remove hotspot NetworkManager connection profile
-    sudo nmcli con delete GrannyTV-Hotspot 2>/dev/null || true
-    
-    # Stop and disable dhcpcd to avoid conflicts
-    sudo systemctl stop dhcpcd 2>/dev/null || true
-    sudo systemctl disable dhcpcd 2>/dev/null || true
-    
-    # Enable NetworkManager
-    sudo systemctl enable NetworkManager 2>/dev/null || true
-    sudo systemctl restart NetworkManager 2>/dev/null || true
-    
-    # Bring interface back up and let NetworkManager manage it
-    sudo ip link set wlan0 up 2>/dev/null || true
-    sudo nmcli device set wlan0 managed yes 2>/dev/null || true
-else
-    echo "Using dhcpcd and wpa_supplicant..."
-    # Traditional Raspberry Pi network setup
-    sudo systemctl enable wpa_supplicant 2>/dev/null || true
-    sudo systemctl restart wpa_supplicant 2>/dev/null || true
-    sudo systemctl enable dhcpcd 2>/dev/null || true
-    sudo systemctl restart dhcpcd 2>/dev/null || true
-fi
-
-# Give it a moment to connect
-sleep 5
-
-# Stop and disable setup services  
-sudo systemctl disable grannytv-setup 2>/dev/null || true
-sudo systemctl stop grannytv-setup 2>/dev/null || true
-sudo systemctl disable grannytv-prepare 2>/dev/null || true
-sudo systemctl stop grannytv-prepare 2>/dev/null || true
-
-# Wait before rebooting to allow web response and WiFi switch
-sleep 15
-
-# Reboot the system
-echo "Rebooting system to complete setup..."
-sudo reboot
-
-echo "Immediate cleanup complete - Pi should now be on home WiFi"
-"""
-        
-        with open('/tmp/immediate-cleanup.sh', 'w') as f:
-            f.write(immediate_cleanup)
+        # One privileged helper does the whole hotspot -> client switch. It waits a
+        # moment so this response reaches the phone before the hotspot goes away.
+        plan = network_transition.finalize_plan('/tmp/grannytv-install.service', wifi_config)
+        with open(TRANSITION_PLAN_FILE, 'w') as f:
+            json.dump(plan, f, indent=2)
         
-        os.chmod('/tmp/immediate-cleanup.sh', 0o755)
+        with open(TRANSITION_LOG_FILE, 'w') as log_file:
+            subprocess.Popen(['sudo', sys.executable, network_transition.__file__,
+                              '--plan', TRANSITION_PLAN_FILE,
+                              '--report', TRANSITION_REPORT_FILE,
+                              '--start-delay', str(TRANSITION_START_DELAY),
+                              '--reboot-delay', str(TRANSITION_REBOOT_DELAY)],
+                             stdout=log_file,
+                             stderr=subprocess.STDOUT,
+                             start_new_session=True)
         
-        # Execute the cleanup script in background
-        # This will clean up services, remove flags, and reboot after 15 seconds
-        with open('/tmp/immediate-cleanup.log', 'w') as log_file:
-            subprocess.Popen(['bash', '/tmp/immediate-cleanup.sh'], 
-                            stdout=log_file, 
-                            stderr=subprocess.STDOUT,
-                            start_new_session=True)
+        print(f"Network transition and reboot scheduled (timings in {TRANSITION_REPORT_FILE})")
         
-        print("Immediate cleanup and reboot scheduled in background")
-        
-        return jsonify({'success': True, 'message': 'Setup complete! System will reboot in 15 seconds.', 'rebooting': True})
+        return jsonify({'success': True, 'message': 'Setup complete! System will reboot in a few seconds.', 'rebooting': True,
+                        'progress_url': f"http://{socket.gethostname()}.local:8080/"})
         
     except Exception as e:
         print(f"Finalization error: {e}")
@@ -653,6 +838,21 @@ def reboot():
 def favicon():
     return '', 204
 
+def serve(host='0.0.0.0', port=8080):
+    """Production serving: waitress if installed, else werkzeug's threaded WSGI server"""
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        waitress_serve = None
+    
+    if waitress_serve:
+        print(f"🚀 Serving with waitress ({SERVER_THREADS} threads)")
+        waitress_serve(app, host=host, port=port, threads=SERVER_THREADS)
+    else:
+        from werkzeug.serving import make_server
+        print("🚀 Serving with werkzeug's threaded server (install python3-waitress for a faster one)")
+        make_server(host, port, app, threaded=True).serve_forever()
+
 if __name__ == '__main__':
     print("🌐 Starting GrannyTV Setup Server")
     print(f"📁 Working directory: {os.getcwd()}")
@@ -663,4 +863,7 @@ if __name__ == '__main__':
     # Ensure log directory exists
     os.makedirs('/tmp/grannytv-logs', exist_ok=True)
     
-    app.run(host='0.0.0.0', port=8080, debug=False)
\ No newline at end of file
+    if '--dev' in sys.argv:
+        app.run(host='0.0.0.0', port=8080, debug=False)
+    else:
+        serve(host='0.0.0.0', port=8080)
\ No newline at end of file
@@ -0,0 +1,316 @@
+let currentStep = 0;
+let deviceInfo = {};
+let selectedWifi = '';
+
+// Initialize setup
+window.onload = function() {
+    detectDevice();
+    scanWifi();
+};
+
+function detectDevice() {
+    fetch('/detect_pi')
+        .then(response => response.json())
+        .then(data => {
+            deviceInfo = data;
+
+            const infoCard = document.getElementById('device-info');
+            if (data.error) {
+                infoCard.innerHTML = `
+                    <h4>❌ Detection Error</h4>
+                    <p>${data.error}</p>
+                `;
+            } else {
+                infoCard.innerHTML = `
+                    <h4>✅ Device Detected</h4>
+                    <p><strong>Model:</strong> ${data.model}</p>
+                    <p><strong>Memory:</strong> ${data.memory}</p>
+                    <p><strong>GPU:</strong> ${data.gpu_memory}</p>
+                    <p><strong>User:</strong> ${data.current_user}</p>
+                `;
+
+                // Auto-fill user info
+                document.getElementById('username').value = data.current_user;
+                document.getElementById('install-path').value = `${data.home_dir}/gtv`;
+            }
+
+            document.getElementById('continue-btn').disabled = false;
+        })
+        .catch(error => {
+            document.getElementById('device-info').innerHTML = `
+                <h4>❌ Detection Failed</h4>
+                <p>${error}</p>
+            `;
+        });
+}
+
+let wifiEvents = null;
+
+function scanWifi() {
+    // The server scans in the background: show its last result right away,
+    // then let it push each new scan (or poll if EventSource is missing)
+    if (window.EventSource) {
+        if (wifiEvents) wifiEvents.close();
+        wifiEvents = new EventSource('/scan_wifi/events');
+        wifiEvents.onmessage = event => renderWifi(JSON.parse(event.data));
+        wifiEvents.onerror = () => {
+            // The browser reconnects by itself; only show an error if we have nothing
+            if (!document.querySelector('.wifi-item')) {
+                renderWifi({networks: [], error: 'Scan failed'});
+            }
+        };
+    } else {
+        fetch('/scan_wifi')
+            .then(response => response.json())
+            .then(data => {
+                renderWifi(data);
+                setTimeout(scanWifi, data.scanning || data.age === null ? 3000 : 30000);
+            })
+            .catch(error => renderWifi({networks: [], error: 'Scan failed'}));
+    }
+}
+
+function rescanWifi() {
+    fetch('/scan_wifi?refresh=1')
+        .then(response => response.json())
+        .then(data => {
+            renderWifi(data);
+            if (!window.EventSource) setTimeout(scanWifi, 3000);
+        });
+}
+
+function renderWifi(data) {
+    const wifiList = document.getElementById('wifi-list');
+    const wifiAge = document.getElementById('wifi-age');
+
+    if (data.age === null || data.age === undefined) {
+        wifiAge.textContent = data.scanning ? 'Scanning...' : '';
+    } else {
+        const age = data.age < 60 ? `${data.age}s` : `${Math.round(data.age / 60)} min`;
+        wifiAge.textContent = (data.scanning ? 'Scanning... ' : '') + `Updated ${age} ago`;
+    }
+
+    if (data.networks && data.networks.length > 0) {
+        wifiList.innerHTML = '';
+        data.networks.forEach(network => {
+            const item = document.createElement('div');
+            item.className = 'wifi-item' + (network.ssid === selectedWifi ? ' selected' : '');
+            item.onclick = () => selectWifi(network.ssid, item);
+
+            let strengthClass = 'poor';
+            let strengthText = 'Poor';
+            if (network.quality > 80) { strengthClass = 'excellent'; strengthText = 'Excellent'; }
+            else if (network.quality > 60) { strengthClass = 'good'; strengthText = 'Good'; }
+            else if (network.quality > 40) { strengthClass = 'fair'; strengthText = 'Fair'; }
+
+            item.innerHTML = `
+                <span>${network.ssid} ${network.encrypted ? '🔒' : '🔓'}</span>
+                <span class="wifi-strength ${strengthClass}">${strengthText}</span>
+            `;
+            wifiList.appendChild(item);
+        });
+    } else if (data.scanning || (data.age === null && !data.error)) {
+        wifiList.innerHTML = '<div style="padding: 20px; text-align: center;"><div class="loading-spinner"></div>Scanning networks...</div>';
+    } else if (data.error) {
+        wifiList.innerHTML = '<div style="padding: 20px; text-align: center; color: #f44336;">Scan failed. Enter network manually.</div>';
+    } else {
+        wifiList.innerHTML = '<div style="padding: 20px; text-align: center; color: #666;">No networks found. Enter manually below.</div>';
+    }
+}
+
+function selectWifi(ssid, element) {
+    selectedWifi = ssid;
+    document.getElementById('manual-ssid').value = ssid;
+
+    // Update UI
+    document.querySelectorAll('.wifi-item').forEach(item => item.classList.remove('selected'));
+    element.classList.add('selected');
+}
+
+function nextStep() {
+    if (currentStep === 1) {
+        // Validate WiFi step
+        const ssid = document.getElementById('manual-ssid').value || selectedWifi;
+        const password = document.getElementById('wifi-password').value;
+
+        if (!ssid) {
+            showStatus('error', 'Please select or enter a WiFi network');
+            return;
+        }
+        if (!password) {
+            showStatus('error', 'Please enter the WiFi password');
+            return;
+        }
+    }
+
+    if (currentStep === 2) {
+        // Validate user step
+        const username = document.getElementById('username').value;
+        const installPath = document.getElementById('install-path').value;
+
+        if (!username) {
+            showStatus('error', 'Please enter a username');
+            return;
+        }
+        if (!installPath) {
+            showStatus('error', 'Please enter an installation path');
+            return;
+        }
+
+        // Update summary
+        updateSummary();
+    }
+
+    currentStep++;
+    showStep(currentStep);
+}
+
+function prevStep() {
+    currentStep--;
+    showStep(currentStep);
+}
+
+function showStep(step) {
+    // Hide all steps
+    document.querySelectorAll('.step').forEach(s => s.classList.remove('active'));
+    document.querySelectorAll('.step-dot').forEach(dot => dot.classList.remove('active'));
+
+    // Show current step
+    document.getElementById(`step-${step}`).classList.add('active');
+    document.getElementById(`dot-${step}`).classList.add('active');
+
+    // Mark completed steps
+    for (let i = 0; i < step; i++) {
+        document.getElementById(`dot-${i}`).classList.add('completed');
+    }
+
+    // Update progress bar
+    const progress = ((step + 1) / 4) * 100;
+    document.getElementById('progress').style.width = `${progress}%`;
+}
+
+function updateSummary() {
+    const ssid = document.getElementById('manual-ssid').value || selectedWifi;
+    const username = document.getElementById('username').value;
+    const installPath = document.getElementById('install-path').value;
+
+    document.getElementById('summary-wifi').textContent = ssid;
+    document.getElementById('summary-user').textContent = username;
+    document.getElementById('summary-path').textContent = installPath;
+}
+
+function finalizeSetup() {
+    const config = {
+        wifi_ssid: document.getElementById('manual-ssid').value || selectedWifi,
+        wifi_password: document.getElementById('wifi-password').value,
+        wifi_country: document.getElementById('wifi-country').value,
+        username: document.getElementById('username').value,
+        install_path: document.getElementById('install-path').value,
+        stream_source: document.getElementById('stream-source').value
+    };
+
+    const finalBtn = document.getElementById('finalize-btn');
+    const statusDiv = document.getElementById('final-status');
+
+    finalBtn.disabled = true;
+    finalBtn.innerHTML = '<div class="loading-spinner"></div>Configuring...';
+
+    statusDiv.innerHTML = '<div class="status loading">💾 Saving configuration...</div>';
+
+    fetch('/configure', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(config)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            statusDiv.innerHTML = '<div class="status success">✅ Configuration saved!</div>';
+
+            setTimeout(() => {
+                statusDiv.innerHTML = '<div class="status loading">🔄 Applying settings and rebooting...</div>';
+
+                fetch('/finalize', {method: 'POST'})
+                    .then(response => response.json())
+                    .then(data => {
+                        if (data.success) {
+                            statusDiv.innerHTML = '<div class="status success">🎉 Setup complete! System rebooting...</div>';
+
+                            // Show final success message
+                            setTimeout(() => {
+                                statusDiv.innerHTML = `
+                                    <div class="status success">
+                                        <h4>🎬 Setup Complete!</h4>
+                                        <p>Your Raspberry Pi is rebooting and will automatically:</p>
+                                        <ul style="text-align: left; margin: 10px 0;">
+                                            <li>✅ Connect to your WiFi network</li>
+                                            <li>✅ Install the TV player</li>
+                                            <li>✅ Start playing live TV</li>
+                                        </ul>
+                                        <p><strong>🎉 You can now disconnect your phone and enjoy your TV!</strong></p>
+                                        <div style="margin-top: 15px; padding: 10px; background: #e8f5e8; border-radius: 8px; border-left: 4px solid #4caf50;">
+                                            <p style="font-size: 14px; color: #2e7d32;">
+                                                <strong>Setup Status:</strong> Complete! 🎯<br>
+                                                <strong>Next Steps:</strong> Automatic installation in progress...<br>
+                                                <strong>Expected Time:</strong> 2-3 minutes
+                                            </p>
+                                        </div>
+                                        ${data.progress_url ? `<p style="margin-top: 10px;">📡 Once your phone is back on your home WiFi, watch the installation at <a href="${data.progress_url}">${data.progress_url}</a></p>` : ''}
+                                    </div>
+                                `;
+                            }, 2000);
+                        } else {
+                            statusDiv.innerHTML = `<div class="status error">❌ Finalization error: ${data.error}</div>`;
+                            finalBtn.disabled = false;
+                            finalBtn.innerHTML = '🎬 Start My TV!';
+                        }
+                    })
+                    .catch(error => {
+                        // If the fetch fails, it might be because the server is shutting down (which is expected)
+                        console.log('Finalize request completed, server may be shutting down:', error);
+                        statusDiv.innerHTML = `
+                            <div class="status success">
+                                <h4>🎬 Setup Complete!</h4>
+                                <p>Your Raspberry Pi is rebooting and will automatically:</p>
+                                <ul style="text-align: left; margin: 10px 0;">
+                                    <li>✅ Connect to your WiFi network</li>
+                                    <li>✅ Install the TV player</li>
+                                    <li>✅ Start playing live TV</li>
+                                </ul>
+                                <p><strong>🎉 You can now disconnect your phone and enjoy your TV!</strong></p>
+                                <div style="margin-top: 15px; padding: 10px; background: #e8f5e8; border-radius: 8px; border-left: 4px solid #4caf50;">
+                                    <p style="font-size: 14px; color: #2e7d32;">
+                                        <strong>Setup Status:</strong> Complete! 🎯<br>
+                                        <strong>System Status:</strong> Rebooting...<br>
+                                        <strong>Expected Time:</strong> 2-3 minutes
+                                    </p>
+                                </div>
+                            </div>
+                        `;
+                    });
+            }, 2000);
+        } else {
+            statusDiv.innerHTML = `<div class="status error">❌ Configuration error: ${data.error}</div>`;
+            finalBtn.disabled = false;
+            finalBtn.innerHTML = '🎬 Start My TV!';
+        }
+    })
+    .catch(error => {
+        statusDiv.innerHTML = `<div class="status error">❌ Setup failed: ${error}</div>`;
+        finalBtn.disabled = false;
+        finalBtn.innerHTML = '🎬 Start My TV!';
+    });
+}
+
+function showStatus(type, message) {
+    // Implementation for inline status messages
+    const status = document.createElement('div');
+    status.className = `status ${type}`;
+    status.textContent = message;
+
+    // Find current step and show status
+    const currentStepElement = document.querySelector('.step.active');
+    currentStepElement.appendChild(status);
+
+    setTimeout(() => status.remove(), 3000);
+}
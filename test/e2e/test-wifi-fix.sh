@@ -106,10 +106,10 @@ curl -s -X POST -H "Content-Type: application/json" \
   -d '{"command": "ip addr show wlan0", "user": "root"}' \
   http://localhost:9080/execute | jq -r '.stdout'
 
-# Check if cleanup script was created
-echo "Cleanup script exists:"
+# Show the network transition's per-step timings
+echo "Network transition log:"
 curl -s -X POST -H "Content-Type: application/json" \
-  -d '{"command": "ls -la /tmp/immediate-cleanup.sh", "user": "root"}' \
+  -d '{"command": "cat /tmp/grannytv-transition.log", "user": "root"}' \
   http://localhost:9080/execute | jq -r '.stdout'
 
 echo ""
@@ -0,0 +1,778 @@
+"""
+End-to-end tests for the player's stream tooling (tools/)
+"""
+import json
+import shlex
+
+
+def run_python(execute_on_pi_root, code, timeout=30):
+    """Run a Python snippet inside tools/ on the Pi simulator"""
+    return execute_on_pi_root(f'cd /home/jeremy/gtv/tools && python3 -c {shlex.quote(code)}',
+                              timeout=timeout)
+
+
+class TestProtocolOptimizer:
+    """Test per-protocol mpv option profiles"""
+
+    def test_profiles_differ_per_protocol(self, execute_on_pi_root, cleanup_pi):
+        """Live HLS, progressive VOD, RTSP and UDP get different buffering"""
+        code = """
+import json
+from iptv_protocol_optimizer import IPTVProtocolOptimizer
+o = IPTVProtocolOptimizer()
+urls = {
+    'hls': 'http://example.com/live/master.m3u8',
+    'progressive': 'http://example.com/video.mp4',
+    'rtsp': 'rtsp://example.com:554/stream',
+    'udp': 'udp://239.255.255.250:1234',
+}
+print(json.dumps({k: o.get_mpv_options(u) for k, u in urls.items()}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Optimizer failed: {result.get('stderr')}"
+
+        profiles = json.loads(result['stdout'])
+        assert profiles['hls']['cache-secs'] == '3', "Live HLS must keep Variant 14 buffering"
+        assert int(profiles['progressive']['cache-secs']) > int(profiles['hls']['cache-secs'])
+        assert profiles['rtsp']['rtsp-transport'] == 'tcp'
+        assert 'overrun_nonfatal=1' in profiles['udp']['stream-lavf-o']
+        assert 'reconnect' not in profiles['rtsp'].get('stream-lavf-o', '')
+
+    def test_command_line_ends_with_url(self, execute_on_pi_root, cleanup_pi):
+        """The rendered mpv command passes the URL last and one stream-lavf-o list"""
+        code = """
+import json
+from iptv_protocol_optimizer import IPTVProtocolOptimizer
+print(json.dumps(IPTVProtocolOptimizer().build_mpv_command('http://example.com/live/master.m3u8')))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Optimizer failed: {result.get('stderr')}"
+
+        cmd = json.loads(result['stdout'])
+        assert cmd[0] == 'mpv'
+        assert cmd[-1] == 'http://example.com/live/master.m3u8'
+        assert len([arg for arg in cmd if arg.startswith('--stream-lavf-o=')]) == 1
+
+
+class TestHLSVariantSelection:
+    """Test bandwidth-aware HLS variant selection"""
+
+    def test_pi3_never_gets_1080p(self, execute_on_pi_root, cleanup_pi):
+        """Software decode on a Pi 3 is capped at 720p even on a fast link"""
+        code = """
+from hls_playlist import parse_master_playlist, select_variant, DECODE_CAPABILITIES
+master = '''#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360
+low.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=2500000,RESOLUTION=1280x720
+mid.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=6000000,RESOLUTION=1920x1080
+high.m3u8
+'''
+variants = parse_master_playlist(master, 'http://example.com/master.m3u8')
+print(select_variant(variants, 100000, DECODE_CAPABILITIES['pi3'])['url'])
+print(select_variant(variants, 1200, DECODE_CAPABILITIES['pi3'])['url'])
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Variant selection failed: {result.get('stderr')}"
+
+        fast_link, weak_link = result['stdout'].split()
+        assert fast_link == 'http://example.com/mid.m3u8'
+        assert weak_link == 'http://example.com/low.m3u8'
+
+    def test_demuxed_audio_keeps_master(self, execute_on_pi_root, cleanup_pi):
+        """A variant with an AUDIO group is steered by bitrate, not pinned without sound"""
+        code = """
+import json
+from hls_playlist import parse_master_playlist, variant_mpv_options, variant_play_url
+master = '''#EXTM3U
+#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aac",NAME="en",URI="audio/en.m3u8"
+#EXT-X-STREAM-INF:BANDWIDTH=1400000,AVERAGE-BANDWIDTH=1200000,RESOLUTION=1280x720,AUDIO="aac"
+video/720.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=900000,RESOLUTION=640x360
+muxed/360.m3u8
+'''
+demuxed, muxed = parse_master_playlist(master, 'http://example.com/master.m3u8')
+print(json.dumps({'demuxed': [variant_play_url('http://example.com/master.m3u8', demuxed),
+                              variant_mpv_options(demuxed)],
+                  'muxed': [variant_play_url('http://example.com/master.m3u8', muxed),
+                            variant_mpv_options(muxed)]}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Variant selection failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert report['demuxed'] == ['http://example.com/master.m3u8', {'hls-bitrate': '1400000'}]
+        assert report['muxed'] == ['http://example.com/muxed/360.m3u8', {}]
+
+    def test_malformed_variant_is_skipped(self, execute_on_pi_root, cleanup_pi):
+        """A bad RESOLUTION, BANDWIDTH or FRAME-RATE drops that variant, not the whole master"""
+        code = """
+import json
+from hls_playlist import parse_master_playlist
+master = '''#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=2500000,RESOLUTION=1280x720p
+bad-resolution.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=1.5e6,RESOLUTION=960x540
+bad-bandwidth.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=1200000,RESOLUTION=854x480,FRAME-RATE=thirty
+bad-fps.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360,FRAME-RATE=29.970
+low.m3u8
+'''
+print(json.dumps([v['url'] for v in parse_master_playlist(master, 'http://example.com/master.m3u8')]))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Variant parsing failed: {result.get('stderr')}"
+
+        assert json.loads(result['stdout']) == ['http://example.com/low.m3u8']
+
+
+class TestHLSTypeCache:
+    """Test live/VOD classification caching"""
+
+    def test_clear_keeps_file_and_untagged_playlist_is_confirmed(self, execute_on_pi_root, cleanup_pi):
+        """A miss never fetches at launch; clearing loses nothing on disk; a frozen untagged playlist becomes VOD"""
+        code = """
+import json, os, tempfile, time
+from hls_fixture_server import FixtureServer
+from hls_playlist import HLSTypeCache
+server = FixtureServer(port=0).start()
+live = server.url('/live/master.m3u8')
+cache_file = os.path.join(tempfile.mkdtemp(), 'hls_type_cache.json')
+with open(cache_file, 'w') as f:
+    json.dump({'http://other/master.m3u8': {'type': 'vod', 'playlist_type': 'VOD',
+                                            'checked_at': time.time()}}, f)
+cache = HLSTypeCache(cache_file)
+cache.clear()
+server.set_faults(freeze={}, latency={'ms': 1500, 'count': 1})
+started = time.time()
+first = cache.get_type(live)
+lookup_secs = time.time() - started
+deadline = time.time() + 20
+while cache.inspecting and time.time() < deadline:
+    time.sleep(0.2)
+server.stop()
+with open(cache_file) as f:
+    stored = json.load(f)
+print(json.dumps({'first': first, 'lookup_secs': lookup_secs, 'confirmed': cache.get_type(live),
+                  'stored': sorted(stored), 'moved': stored[live].get('sequence_moved')}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"HLS type cache failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert report['first'] is None and report['lookup_secs'] < 0.5, \
+            "A miss falls back to the URL guess instead of delaying the launch"
+        assert report['confirmed'] == 'vod' and report['moved'] is False
+        assert 'http://other/master.m3u8' in report['stored'], "clear() must not wipe the persisted cache"
+
+
+class TestStreamTuning:
+    """Test per-stream buffer profiles learned from stalls"""
+
+    def test_jittery_stream_grows_and_stable_one_shrinks(self, execute_on_pi_root, cleanup_pi):
+        """Stalls and reconnects deepen the buffer (unless mpv is near MemoryHigh), calm sessions shrink it"""
+        code = """
+import json, os, tempfile
+from stream_tuning import StreamTuningStore
+path = os.path.join(tempfile.mkdtemp(), 'stream_tuning.json')
+base = {'cache-secs': '3', 'demuxer-max-bytes': '25M'}
+store = StreamTuningStore(path)
+actions = [store.record_session('http://cdn.example.com/a.m3u8', base, 600, stalls=3),
+           store.record_session('http://other.example.com/b.m3u8', base, 600, stalls=3, peak_rss_mb=170),
+           store.record_session('http://stable.example.com/c.m3u8', base, 3600),
+           store.record_session('http://flaky.example.com/e.m3u8', base, 600, reconnects=1)]
+reloaded = StreamTuningStore(path)
+print(json.dumps({'actions': actions,
+                  'grown': reloaded.get_overrides('http://cdn.example.com/a.m3u8'),
+                  'same_host': reloaded.get_overrides('http://cdn.example.com/new.m3u8'),
+                  'same_host_vod': reloaded.get_overrides('http://cdn.example.com/movie.mp4'),
+                  'shrunk': reloaded.get_overrides('http://stable.example.com/c.m3u8'),
+                  'unknown': reloaded.get_overrides('http://unseen.example.com/d.m3u8')}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Stream tuning failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert report['actions'] == ['grow', 'keep', 'shrink', 'grow'], "No growth when mpv is near MemoryHigh"
+        assert report['grown'] == {'cache-secs': '4.5', 'demuxer-max-bytes': '37M'}, \
+            "The profile's own readahead is left alone"
+        assert report['same_host'] == report['grown'], "New streams start from their host's profile"
+        assert report['same_host_vod'] == {}, "Host profiles are kept per protocol"
+        assert report['shrunk']['cache-secs'] == '2.4' and report['shrunk']['demuxer-max-bytes'] == '20M'
+        assert report['unknown'] == {}
+
+
+class TestMemoryBudget:
+    """Test cgroup-aware buffer sizing"""
+
+    def test_buffers_clamped_to_cgroup_limit(self, execute_on_pi_root, cleanup_pi):
+        """With MemoryHigh=200M and 40M supervisor RSS, a 60M demuxer buffer cannot fit"""
+        code = """
+import json, os, tempfile
+from memory_budget import MemoryBudgetPlanner
+root = tempfile.mkdtemp()
+group = os.path.join(root, 'cg', 'system.slice', 'iptv-player.service')
+os.makedirs(os.path.join(root, 'proc', 'self'))
+os.makedirs(group)
+files = {
+    os.path.join(root, 'proc', 'self', 'cgroup'): '0::/system.slice/iptv-player.service',
+    os.path.join(root, 'proc', 'self', 'status'): 'VmRSS:   40960 kB',
+    os.path.join(group, 'memory.high'): str(200 << 20),
+    os.path.join(group, 'memory.max'): str(250 << 20),
+    os.path.join(group, 'memory.current'): str(40 << 20),
+    os.path.join(group, 'memory.stat'): 'inactive_file 0',
+}
+for path, content in files.items():
+    with open(path, 'w') as f:
+        f.write(content)
+planner = MemoryBudgetPlanner(os.path.join(root, 'proc'), os.path.join(root, 'cg'))
+options, plan = planner.apply({'demuxer-max-bytes': '60M', 'cache-secs': '3'})
+print(json.dumps({'options': options, 'plan': plan}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Memory budget failed: {result.get('stderr')}"
+
+        data = json.loads(result['stdout'])
+        assert data['plan']['limit_mb'] == 200, "MemoryHigh is the tighter limit"
+        assert data['options']['demuxer-max-bytes'] == '37M'
+        assert data['options']['demuxer-max-back-bytes'] == '12M', "mpv's 50M default back buffer is budgeted too"
+        assert data['options']['cache-secs'] == '3', "Small profiles are left alone"
+
+
+class TestProcessSampler:
+    """Test the /proc sampler for the player's mpv"""
+
+    def test_samples_until_exit_and_ignores_stale_pidfile(self, execute_on_pi_root, cleanup_pi):
+        """CPU comes from tick deltas, an exited process samples as None, non-mpv PIDs are rejected"""
+        code = """
+import json, os, subprocess, sys, tempfile, time
+from proc_sampler import MPVProcessSampler, find_mpv_pid, write_pidfile
+busy = subprocess.Popen([sys.executable, '-c', 'while True: pass'])
+sampler = MPVProcessSampler(busy.pid)
+first = sampler.sample()
+time.sleep(0.5)
+second = sampler.sample()
+pidfile = os.path.join(tempfile.mkdtemp(), 'mpv.pid')
+write_pidfile(busy.pid, pidfile)
+found = find_mpv_pid(pidfile)
+busy.kill()
+busy.wait()
+print(json.dumps({'first_cpu': first['cpu_percent'], 'cpu': second['cpu_percent'],
+                  'rss_mb': second['rss_mb'], 'found': found,
+                  'after_exit': sampler.sample(), 'alive': sampler.alive}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Process sampler failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert report['first_cpu'] is None, "CPU needs two samples"
+        assert report['cpu'] > 50, "A busy loop uses most of a core"
+        assert report['rss_mb'] > 0
+        assert report['found'] is None, "A pidfile pointing at something other than mpv is stale"
+        assert report['after_exit'] is None and not report['alive']
+
+
+class TestSysfsCollectors:
+    """Test fork-free system metric collection"""
+
+    def test_sample_is_fast_and_non_blocking(self, execute_on_pi_root, cleanup_pi):
+        """A full sample reads held /proc and /sys handles without sleeping or forking"""
+        code = """
+import json, time
+from sysfs_collectors import SystemCollector
+collector = SystemCollector()
+collector.sample()
+started = time.perf_counter()
+metrics = collector.sample()
+metrics['elapsed_ms'] = (time.perf_counter() - started) * 1000
+print(json.dumps(metrics))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Collectors failed: {result.get('stderr')}"
+
+        metrics = json.loads(result['stdout'])
+        assert metrics['elapsed_ms'] < 50, "Sampling must not block like cpu_percent(interval=1)"
+        assert metrics['memory_percent'] is not None
+        assert metrics['network_bytes_recv'] is not None
+
+
+class TestMetricsStore:
+    """Test the fixed-memory metrics history"""
+
+    def test_open_bucket_resumes_after_restart(self, execute_on_pi_root, cleanup_pi):
+        """Samples before and after a restart land in the same 1-minute bucket"""
+        code = """
+import json, os, tempfile
+from metrics_store import MetricsStore
+path = os.path.join(tempfile.mkdtemp(), 'metrics_history.bin')
+base = 1_700_000_040.0                      # Start of a minute
+store = MetricsStore(path)
+size = store.memory_bytes()
+for i in range(30):
+    store.add({'cpu_percent': 20.0, 'dropped_frames': 1}, base + i)
+store.close()
+store = MetricsStore(path)
+for i in range(30, 60):
+    store.add({'cpu_percent': 40.0, 'dropped_frames': 1}, base + i)
+store.add({'cpu_percent': 0.0}, base + 60)  # Closes the minute
+print(json.dumps({'cpu': store.query('cpu_percent', base, base + 60, tier='1m'),
+                  'drops': store.query('dropped_frames', base, base + 60, tier='1m'),
+                  'fixed': store.memory_bytes() == size}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Metrics store failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert report['cpu'] == [[1700000040.0, 30.0]], "Mean over both halves of the minute"
+        assert report['drops'] == [[1700000040.0, 60.0]]
+        assert report['fixed']
+
+
+class TestPlayerMetrics:
+    """Test the player's Prometheus endpoint"""
+
+    def test_scrape_renders_counters_gauges_and_histogram(self, execute_on_pi_root, cleanup_pi):
+        """A scrape over localhost returns cumulative TTFF buckets, labelled counters and no cleared gauges"""
+        code = """
+import json, urllib.request
+from player_metrics import MetricsServer, PlayerMetrics
+metrics = PlayerMetrics()
+metrics.inc('stalls_total')
+metrics.inc('stalls_total')
+metrics.inc('sessions_ended_total', reason='crashed')
+metrics.set('cache_seconds', 2.5)
+metrics.set('buffering', 1)
+metrics.set('buffering', None)
+metrics.observe_ttff(1.5)
+metrics.observe_ttff(40)
+metrics.set_stream('http://example.com/live.m3u8', 'News "24"', 'hls_live')
+server = MetricsServer(metrics, port=0)
+assert server.start()
+port = server.server.server_address[1]
+with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+    content_type = response.headers['Content-Type']
+    lines = response.read().decode('utf-8').splitlines()
+server.stop()
+print(json.dumps({'content_type': content_type, 'lines': lines}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Player metrics failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        lines = report['lines']
+        assert report['content_type'].startswith('text/plain; version=0.0.4')
+        assert 'grannytv_stalls_total 2' in lines
+        assert 'grannytv_sessions_ended_total{reason="crashed"} 1' in lines
+        assert 'grannytv_cache_seconds 2.5' in lines
+        assert not any(line.startswith('grannytv_buffering') for line in lines), "None removes a gauge"
+        assert 'grannytv_ttff_seconds_bucket{le="1"} 0' in lines
+        assert 'grannytv_ttff_seconds_bucket{le="2"} 1' in lines
+        assert 'grannytv_ttff_seconds_bucket{le="+Inf"} 2' in lines
+        assert 'grannytv_stream_info{name="News \\"24\\"",profile="hls_live",url="http://example.com/live.m3u8"} 1' in lines
+
+
+class TestMemoryWatchdog:
+    """Test memory pressure grading"""
+
+    def test_page_cache_and_memory_high_do_not_restart(self, execute_on_pi_root, cleanup_pi):
+        """A cgroup full of page cache that keeps hitting memory.high never escalates past ELEVATED"""
+        code = """
+import json, os, tempfile
+from memory_watchdog import MemoryWatchdog, LEVEL_NAMES
+root = tempfile.mkdtemp()
+group = os.path.join(root, 'cg', 'system.slice', 'iptv-player.service')
+os.makedirs(os.path.join(root, 'proc', 'self'))
+os.makedirs(os.path.join(root, 'proc', 'pressure'))
+os.makedirs(group)
+def write(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+write(os.path.join(root, 'proc', 'self', 'cgroup'), '0::/system.slice/iptv-player.service')
+write(os.path.join(root, 'proc', 'pressure', 'memory'),
+      'some avg10=0.00 avg60=0.00 avg300=0.00 total=0\\nfull avg10=0.00 avg60=0.00 avg300=0.00 total=0')
+write(os.path.join(group, 'memory.high'), str(200 << 20))
+write(os.path.join(group, 'memory.max'), str(250 << 20))
+write(os.path.join(group, 'memory.current'), str(198 << 20))
+write(os.path.join(group, 'memory.stat'), 'anon 100000000\\ninactive_file %d\\n' % (90 << 20))
+write(os.path.join(group, 'memory.events'), 'low 0\\nhigh 0\\nmax 0\\noom 0\\noom_kill 0')
+levels = []
+watchdog = MemoryWatchdog(lambda level, reason: levels.append(LEVEL_NAMES[level]),
+                          os.path.join(root, 'proc'), os.path.join(root, 'cg'))
+for high in range(1, 9):
+    write(os.path.join(group, 'memory.events'), 'low 0\\nhigh %d\\nmax 0\\noom 0\\noom_kill 0' % (high * 10))
+    watchdog.check()
+usage = watchdog.sample()['usage']
+reclaim_only = list(levels)
+write(os.path.join(root, 'proc', 'pressure', 'memory'),
+      'some avg10=40.00 avg60=0.00 avg300=0.00 total=0\\nfull avg10=8.00 avg60=0.00 avg300=0.00 total=0')
+stalled = [LEVEL_NAMES[watchdog.check()] for _ in range(5)]
+print(json.dumps({'reclaim_only': reclaim_only, 'usage': usage, 'stalled': stalled}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Memory watchdog failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert abs(report['usage'] - 0.54) < 0.01, "Inactive page cache is not counted as usage"
+        assert report['reclaim_only'] == ['elevated'], "memory.high reclaim alone only shrinks buffers"
+        assert report['stalled'] == ['high'] * 4 + ['critical'], "Only sustained PSI stalls restart playback"
+
+
+class TestThermalGuard:
+    """Test throttle detection and per-state playback quality"""
+
+    def test_drops_and_avsync_charged_to_same_state(self, execute_on_pi_root, cleanup_pi):
+        """Firmware throttle flags flip the state; each interval's quality goes to the state it ran in"""
+        code = """
+import json, os, tempfile
+from thermal_guard import ThermalGuard
+root = tempfile.mkdtemp()
+zone = os.path.join(root, 'thermal', 'thermal_zone0')
+os.makedirs(zone)
+os.makedirs(os.path.join(root, 'cpu'))
+def write(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+write(os.path.join(zone, 'type'), 'cpu-thermal')
+write(os.path.join(zone, 'temp'), '60000')
+write(os.path.join(root, 'get_throttled'), '0x0')
+guard = ThermalGuard(os.path.join(root, 'thermal'), os.path.join(root, 'cpu'),
+                     os.path.join(root, 'get_throttled'))
+states = [guard.check(0, 0.01)['state']]
+write(os.path.join(zone, 'temp'), '82000')
+write(os.path.join(root, 'get_throttled'), '0x4')
+states.append(guard.check(100, 0.02)['state'])     # The interval that just ended ran cool
+result = guard.check(300, 0.3)                     # This one ran throttled
+states.append(result['state'])
+quality = guard.quality
+print(json.dumps({'states': states, 'stuttering': result['stuttering'],
+                  'drops': {s: q['drops'] for s, q in quality.items()},
+                  'avsync': {s: round(q['avsync_sum'], 3) for s, q in quality.items()}}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Thermal guard failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert report['states'] == ['ok', 'throttled', 'throttled']
+        assert report['stuttering']
+        assert report['drops'] == {'ok': 100, 'imminent': 0, 'throttled': 200}
+        assert report['avsync'] == {'ok': 0.02, 'imminent': 0.0, 'throttled': 0.3}
+
+
+class TestPlaybackTelemetry:
+    """Test per-session frame-drop accounting"""
+
+    def test_counter_reset_after_variant_switch(self, execute_on_pi_root, cleanup_pi):
+        """Drops keep adding up across a loadfile that resets mpv's counters"""
+        code = """
+import json
+from playback_telemetry import SessionTelemetry
+class FakeIPC:
+    connected = True
+    def __init__(self):
+        self.props = {'video-format': 'h264', 'width': 1920, 'height': 1080,
+                      'frame-drop-count': 40, 'decoder-frame-drop-count': 5}
+        self.handlers = {}
+    def get_property(self, name, default=None):
+        return self.props.get(name, default)
+    def on_event(self, event, callback):
+        self.handlers.setdefault(event, []).append(callback)
+ipc = FakeIPC()
+telemetry = SessionTelemetry(ipc)
+telemetry.sample()                                   # Baseline - drops before we attached
+ipc.props.update({'frame-drop-count': 100, 'decoder-frame-drop-count': 5})
+telemetry.sample()                                   # +60 vo
+ipc.props.update({'frame-drop-count': 3, 'decoder-frame-drop-count': 0})
+telemetry.sample()                                   # Reset seen as a drop: +3 vo
+for handler in ipc.handlers['file-loaded']:
+    handler({'event': 'file-loaded'})
+ipc.props.update({'height': 720, 'frame-drop-count': 20, 'decoder-frame-drop-count': 2})
+telemetry.sample()                                   # Reset flagged by file-loaded: +20 vo, +2 decoder
+aggregate = telemetry.stop()
+print(json.dumps({k: aggregate[k] for k in ('vo_drops', 'decoder_drops', 'height')}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Telemetry failed: {result.get('stderr')}"
+
+        aggregate = json.loads(result['stdout'])
+        assert aggregate == {'vo_drops': 83, 'decoder_drops': 2, 'height': 720}
+
+
+class TestLogAnalytics:
+    """Test offline session reconstruction from player logs"""
+
+    def test_sessions_and_mtbf_across_rotated_logs(self, execute_on_pi_root, cleanup_pi):
+        """A crash in a gzipped rotation and a kill in the live log both count as failures"""
+        code = """
+import gzip, json, os, tempfile
+from log_analytics import analyze
+root = tempfile.mkdtemp()
+rotated = '''2026-03-02 20:00:00,000 - INFO - [START] === MPV IPTV PLAYER STARTING ===
+2026-03-02 20:00:01,000 - INFO - PLAYING: TCM Classic
+2026-03-02 20:00:04,000 - INFO - [OK] SUCCESS! MPV config stable (PID: 100)
+2026-03-02 21:59:30,000 - WARNING - [CACHE] Buffering started (stall #1)
+2026-03-02 22:00:04,000 - WARNING - [WARNING] Player ended (exit code: 1)
+'''
+live = '''2026-03-02 22:00:30,000 - INFO - [START] === MPV IPTV PLAYER STARTING ===
+2026-03-02 22:00:31,000 - INFO - PLAYING: TCM Classic
+2026-03-02 22:00:34,000 - INFO - [OK] SUCCESS! MPV config stable (PID: 101)
+2026-03-03 00:00:34,000 - INFO - [TV] Status: Playing (PID: 101) - Health: OK
+2026-03-03 00:05:00,000 - INFO - [START] === MPV IPTV PLAYER STARTING ===
+'''
+with gzip.open(os.path.join(root, 'iptv_player_mpv.log.1.gz'), 'wt') as f:
+    f.write(rotated)
+os.utime(os.path.join(root, 'iptv_player_mpv.log.1.gz'), (1, 1))
+with open(os.path.join(root, 'iptv_player_mpv.log'), 'w') as f:
+    f.write(live)
+print(json.dumps(analyze([root]).report()))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Log analytics failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert report['endings'] == {'crashed': 1, 'killed': 1}
+        assert report['unclean_exits'] == 1
+        assert report['mtbf_seconds'] == 2 * 3600, "Four hours of play over two failures"
+        assert report['mttr_seconds'] == 30, "Crash at 22:00:04, playing again at 22:00:34"
+        assert sum(report['heatmap'][0]) == 1, "The stall happened on a Monday"
+
+
+class TestNetworkTransition:
+    """Test the hotspot -> home WiFi transition helper"""
+
+    def test_steps_wait_for_dependencies(self, execute_on_pi_root, cleanup_pi):
+        """The WiFi restart waits for the hotspot teardown and config files; a plan runs best effort"""
+        code = """
+import json, os, sys, tempfile
+sys.path.insert(0, '../setup/web')
+import network_transition
+plan = network_transition.finalize_plan('/tmp/grannytv-install.service', '/tmp/wpa_supplicant.conf',
+                                        network_manager='dhcpcd')
+steps = {step.name: step.after for step in network_transition.build_steps(plan)}
+
+work = tempfile.mkdtemp()
+conf = os.path.join(work, 'dhcpcd.conf')
+flag = os.path.join(work, 'setup-mode')
+with open(conf, 'w') as f:
+    f.write('interface eth0\\n# GrannyTV Setup Hotspot Configuration\\ninterface wlan0\\n'
+            '    static ip_address=192.168.4.1/24\\n    nohook wpa_supplicant\\nhostname\\n')
+open(flag, 'w').close()
+report = network_transition.run_plan({
+    'edits': [{'path': conf, 'sed': network_transition.DHCPCD_HOTSPOT_SED},
+              {'path': os.path.join(work, 'missing.conf'), 'sed': 's/a/b/'}],
+    'remove': [flag],
+}, sudo=False)
+with open(conf) as f:
+    edited = f.read().splitlines()
+print(json.dumps({'steps': steps, 'edited': edited, 'flag_exists': os.path.exists(flag),
+                  'ran': sorted(report['steps']), 'failed': report['failed'],
+                  'skipped': report['skipped']}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Network transition failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        steps = report['steps']
+        restart = steps['restart wpa_supplicant dhcpcd']
+        assert 'flush wlan0' in restart and 'enable wpa_supplicant dhcpcd' in restart
+        assert 'install /etc/wpa_supplicant/wpa_supplicant.conf' in restart
+        assert 'edit /etc/dhcpcd.conf' in restart
+        assert steps['flush wlan0'] == ['stop hostapd dnsmasq']
+        assert steps['enable grannytv-install'] == ['daemon-reload']
+        assert steps['flush NAT rules'] == [], "Independent steps must not wait"
+
+        assert report['edited'] == ['interface eth0', 'hostname']
+        assert not report['flag_exists']
+        assert len(report['ran']) == 3 and not report['skipped']
+        assert report['failed'] == [name for name in report['ran'] if 'missing.conf' in name]
+
+
+class TestInstallProgress:
+    """Test the post-reboot installation progress log"""
+
+    def test_failed_step_in_user_shell_ends_in_error(self, execute_on_pi_root, cleanup_pi):
+        """A step failing inside the sudo sub-shell is reported as an error, not 'done'"""
+        code = """
+import json, os, subprocess, sys, tempfile
+sys.path.insert(0, '../setup/web')
+import install_progress
+path = os.path.join(tempfile.mkdtemp(), 'install-progress.jsonl')
+function = install_progress.shell_function(path)
+script = '\\n'.join([
+    'set -e', function,
+    'trap \\'progress failed 100 "Installation failed" error\\' ERR',
+    'progress start 5 "Installation started"',
+    "bash -s /tmp << 'EOF'", 'set -e', function,
+    'progress download 15 "Downloading GrannyTV"', 'false', 'echo unreachable', 'EOF',
+    'progress done 100 "Installation complete" done', ''])
+exit_code = subprocess.run(['bash', '-c', script]).returncode
+log = install_progress.ProgressLog(path)
+log.poll()
+with open(path, 'a') as f:
+    f.write('{"stage": "partial"')    # An unfinished line waits for its newline
+log.poll()
+events = log.since()
+print(json.dumps({'exit_code': exit_code, 'stages': [e['stage'] for e in events],
+                  'ids': [e['id'] for e in events], 'status': events[-1]['status'],
+                  'finished': log.finished()}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Install progress failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert report['exit_code'] != 0
+        assert report['stages'] == ['start', 'download', 'failed']
+        assert report['ids'] == [0, 1, 2]
+        assert report['status'] == 'error' and report['finished']
+
+
+class TestMpvBenchmark:
+    """Test the benchmark statistics behind config choices"""
+
+    def test_overlapping_intervals_are_not_a_win(self, execute_on_pi_root, cleanup_pi):
+        """A config is only better when its 95% interval clears the best one"""
+        code = """
+import json
+from mpv_benchmark import mean_ci, summarize
+runs = ([{'config': 'a', 'status': 'ok', 'cpu_percent': v} for v in (40, 41, 39, 40)]
+        + [{'config': 'b', 'status': 'ok', 'cpu_percent': v} for v in (42, 38, 44, 36)]
+        + [{'config': 'c', 'status': 'ok', 'cpu_percent': v} for v in (60, 61, 59, 60)]
+        + [{'config': 'c', 'status': 'crashed'}])
+ranked = summarize(runs, 'cpu_percent')
+print(json.dumps({'order': [e['config'] for e in ranked],
+                  'tied': {e['config']: e['tied'] for e in ranked},
+                  'failures': {e['config']: e['failures'] for e in ranked},
+                  'ci': mean_ci([40, 41, 39, 40])}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Benchmark statistics failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert report['order'] == ['a', 'b', 'c']
+        assert report['tied'] == {'a': True, 'b': True, 'c': False}
+        assert report['failures']['c'] == 1
+        assert abs(report['ci']['ci95'] - 3.182 * report['ci']['stdev'] / 2) < 1e-9
+
+
+class TestDecodeValidation:
+    """Test the analyzer's decode check"""
+
+    def test_slow_link_never_marks_a_stream_undecodable(self, execute_on_pi_root, cleanup_pi):
+        """The sample is downloaded before the decoder is timed, so a throttled origin stays inconclusive"""
+        code = """
+import json, os, tempfile
+from hls_fixture_server import FixtureServer
+from stream_performance_analyzer import decode_validation_worker, fetch_decode_sample
+server = FixtureServer(port=0).start()
+server.set_faults(bandwidth={'kbps': 4000})
+path = os.path.join(tempfile.mkdtemp(), 'sample.ts')
+sample = fetch_decode_sample(server.url('/live/master.m3u8'), path, seconds=4)
+with open(path, 'rb') as f:
+    sync = f.read(1)[0]
+decode = decode_validation_worker(server.url('/live/master.m3u8'), timeout=20)
+server.stop()
+print(json.dumps({'sample': sample, 'size': os.path.getsize(path), 'sync': sync, 'decode': decode}))
+"""
+        result = run_python(execute_on_pi_root, code, timeout=60)
+        assert result['success'], f"Decode validation failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        sample = report['sample']
+        assert sample['bytes'] == report['size'] and report['sync'] == 0x47
+        assert sample['bytes'] >= 2 * 2800000 / 8 * 2 * 0.9, "Two 2s segments of the 720p variant"
+        assert sample['download_secs'] >= 2, "The throttled download is timed on its own"
+        # Synthetic segments hold no picture - or mpv is missing - so the check is inconclusive
+        decode = report['decode']
+        assert decode['decodes'] is not False and decode.get('realtime') is not False
+
+
+class TestHLSFixtureServer:
+    """Test the offline fixture origin and its fault injection"""
+
+    def test_faults_are_deterministic(self, execute_on_pi_root, cleanup_pi):
+        """Error bursts hit exactly N requests and a frozen manifest stops advancing"""
+        code = """
+import json, time, urllib.request, urllib.error
+from hls_fixture_server import FixtureServer
+server = FixtureServer(port=0).start()
+def status(path):
+    try:
+        return urllib.request.urlopen(server.url(path), timeout=5).status
+    except urllib.error.HTTPError as e:
+        return e.code
+server.set_faults(errors={'status': 404, 'count': 2, 'match': '.m3u8'})
+statuses = [status('/live/720p/index.m3u8') for _ in range(3)]
+server.set_faults(freeze={})
+first = urllib.request.urlopen(server.url('/live/720p/index.m3u8'), timeout=5).read()
+time.sleep(server.media.segment_seconds + 0.5)
+frozen = urllib.request.urlopen(server.url('/live/720p/index.m3u8'), timeout=5).read() == first
+server.set_faults(freeze=None)
+moved = urllib.request.urlopen(server.url('/live/720p/index.m3u8'), timeout=5).read() != first
+segment = urllib.request.urlopen(server.url('/vod/360p/seg0.ts'), timeout=5).read()
+server.stop()
+print(json.dumps({'statuses': statuses, 'frozen': frozen, 'moved': moved,
+                  'sync': segment[0], 'packets': len(segment) % 188}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Fixture server failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert report['statuses'] == [404, 404, 200]
+        assert report['frozen'] and report['moved']
+        assert report['sync'] == 0x47 and report['packets'] == 0, "Segments are whole MPEG-TS packets"
+
+
+class TestCatalogBenchmarks:
+    """Test the synthetic-catalog micro-benchmarks"""
+
+    def test_small_run_and_quadratic_skip(self, execute_on_pi_root, cleanup_pi):
+        """Every path runs on a small catalog and a quadratic path is projected, not run"""
+        code = """
+import json
+from catalog_benchmarks import BENCHMARKS, generate_catalog, projected_seconds, run_benchmarks
+catalog = generate_catalog(500)
+rows = run_benchmarks([200, 400], list(BENCHMARKS), repeats=1, report=lambda line: None)
+projected = projected_seconds([{'size': 1000, 'min_s': 1.0}, {'size': 2000, 'min_s': 4.0}], 4000)
+print(json.dumps({'entries': len(catalog), 'fields': sorted(next(iter(catalog.values()))),
+                  'ran': sorted({r['bench'] for r in rows if not r.get('skipped')}),
+                  'benches': sorted(BENCHMARKS), 'projected': projected}))
+"""
+        result = run_python(execute_on_pi_root, code, timeout=120)
+        assert result['success'], f"Catalog benchmarks failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert report['entries'] == 500, "Synthetic URLs are unique"
+        assert {'url', 'name', 'group', 'last_tested', 'test_results'} <= set(report['fields'])
+        assert report['ran'] == report['benches']
+        assert abs(report['projected'] - 16.0) < 0.01, "Quadratic growth projects 4x per doubling"
+
+
+class TestFailoverBenchmark:
+    """Test how the failover benchmark turns frame times into blank-screen time"""
+
+    def test_gap_after_fault_is_the_blank_screen(self, execute_on_pi_root, cleanup_pi):
+        """Buffered frames after the fault don't count; the first >1s gap does"""
+        code = """
+import json
+from failover_benchmark import find_gap, summarize
+frames = [i * 0.1 for i in range(100)] + [25.0 + i * 0.1 for i in range(50)]
+recovered = find_gap(frames, 5.0, 30.0)
+playing = find_gap(frames, 26.0, 29.95)
+lost = find_gap(frames[:100], 5.0, 30.0)
+trials = [{'fault': 'process_killed', 'status': 'ok', 'blank_s': v, 'detect_s': 1.0} for v in (10, 12, 14)]
+trials.append({'fault': 'process_killed', 'status': 'not_recovered', 'blank_s': 240})
+summary = summarize(trials)[0]
+print(json.dumps({'recovered': recovered, 'playing': playing, 'lost': lost,
+                  'n': summary['blank_s']['n'], 'p50': summary['blank_s']['p50'],
+                  'statuses': summary['statuses']}))
+"""
+        result = run_python(execute_on_pi_root, code)
+        assert result['success'], f"Failover statistics failed: {result.get('stderr')}"
+
+        report = json.loads(result['stdout'])
+        assert abs(report['recovered']['lost_at'] - 9.9) < 1e-6 and report['recovered']['recovered_at'] == 25.0
+        assert report['playing'] == {'lost_at': None, 'recovered_at': None}
+        assert report['lost']['recovered_at'] is None
+        assert report['n'] == 3 and report['p50'] == 12, "Unrecovered trials are a lower bound, not a sample"
+        assert report['statuses'] == {'not_recovered': 1, 'ok': 3}
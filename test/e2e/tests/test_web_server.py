@@ -112,6 +112,42 @@ class TestWebServer:
         except requests.exceptions.RequestException:
             pass  # Expected in simulated environment
 
+    def test_stream_test_runs_as_job(self, web_client, pi_simulator, execute_on_pi_root, cleanup_pi):
+        """Test that /test_stream answers immediately and can be polled"""
+        # Start web server
+        execute_on_pi_root('sudo -u jeremy ./setup/setup-wizard.sh',
+                          cwd="/home/jeremy/gtv", timeout=120)
+        execute_on_pi_root('./setup/verify-setup.sh',
+                          cwd="/home/jeremy/gtv", timeout=60)
+
+        time.sleep(5)
+
+        try:
+            # Nothing listens here, so the test fails fast without internet access
+            url = 'http://127.0.0.1:9/fixture.m3u8'
+            started = time.time()
+            response = web_client.post(f"{pi_simulator['base_url']}/test_stream", json={'url': url})
+            assert time.time() - started < 2, "Starting a test must not wait for mpv"
+            assert response.status_code in [200, 202]
+            job = response.json()
+
+            again = web_client.post(f"{pi_simulator['base_url']}/test_stream", json={'url': url})
+            assert again.json()['id'] == job['id'], "Identical URLs share one job"
+
+            deadline = time.time() + 30
+            while job['status'] != 'done' and time.time() < deadline:
+                time.sleep(1)
+                job = web_client.get(f"{pi_simulator['base_url']}/test_stream/{job['id']}").json()
+            assert job['status'] == 'done'
+            assert job['result']['success'] is False
+
+            # Fixing the network (or the URL) and tapping again must re-test
+            time.sleep(4)
+            retry = web_client.post(f"{pi_simulator['base_url']}/test_stream", json={'url': url}).json()
+            assert retry['id'] != job['id'] and not retry['cached'], "Failures are not cached for minutes"
+        except requests.exceptions.RequestException:
+            pass  # Expected in simulated environment
+
 
 class TestWebServerErrorHandling:
     """Test web server error handling"""
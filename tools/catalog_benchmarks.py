@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Catalog Benchmarks for GrannyTV
+Times the pure-Python paths that grow with catalog size
+
+Generates synthetic catalogs (1k to 1M entries) shaped like
+working_streams.json, with realistic channel names, groups, URLs, freshness
+and decode flags. It then times:
+  - load_working_streams           (player: JSON load of the database)
+  - get_best_streams_for_category  (player: the three start_player categories)
+  - detect_protocol                (optimizer: cold classifier cache)
+  - generate_performance_report    (analyzer: result statistics)
+  - create_optimized_database      (analyzer: ranking + write)
+Each path is timed several times (min and median) and its peak memory is
+taken from a separate tracemalloc run, since tracing slows the timed run.
+Sizes whose projected time exceeds --max-seconds are skipped instead of run
+(create_optimized_database is quadratic). Results are appended to a JSONL
+history keyed by git commit, so --compare shows what a change bought.
+"""
+
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from iptv_protocol_optimizer import IPTVProtocolOptimizer, clear_classifier_cache, generate_synthetic_urls
+from playback_telemetry import PlaybackTelemetryStore
+from stream_performance_analyzer import StreamPerformanceAnalyzer
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_REPEATS = 3
+MAX_SECONDS = 60               # projected time per call above which a size is skipped
+HISTORY_FILE = 'catalog_benchmarks.jsonl'
+
+# The categories start_player tries, in order
+CATEGORIES = [
+    ['classic', 'movies', 'cinema', 'film', 'tcm'],
+    ['tv', 'general', 'entertainment'],
+    [],
+]
+
+GROUPS = ['Classic', 'Movies', 'Series', 'News', 'Sports', 'Kids', 'Music', 'General',
+          'Entertainment', 'Documentary', 'Religious', 'Family', 'Comedy', 'Lifestyle']
+NAME_WORDS = ['Classic', 'Movies', 'Action', 'Comedy', 'News', 'Sports', 'Family', 'Retro', 'Gold',
+              'Cinema', 'Drama', 'Western', 'Mystery', 'Kids', 'Music', 'Country', 'Jazz', 'Nature',
+              'Travel', 'Cooking', 'TCM', 'Pluto', 'Plus', 'HD', 'Live', 'World', 'Local', 'Film']
+CODECS = [('h264', 720), ('h264', 1080), ('h264', 480), ('hevc', 1080), ('mpeg2video', 576)]
+
+
+def generate_catalog(count: int, seed: int = 42) -> Dict[str, Dict]:
+    """Synthetic working_streams.json with count entries"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    catalog = {}
+    for i, url in enumerate(generate_synthetic_urls(count, seed)):
+        if url in catalog:
+            url += f"{'&' if '?' in url else '?'}n={i}"
+        tested = now - timedelta(hours=rng.uniform(0, 96))
+        groups = ';'.join(sorted(rng.sample(GROUPS, rng.choice((1, 1, 1, 2, 3)))))
+        entry = {
+            'url': url,
+            'name': ' '.join(rng.sample(NAME_WORDS, rng.choice((1, 2, 2, 3)))) + (f" {i % 97}" if i % 3 else ''),
+            'group': groups,
+            'last_tested': tested.isoformat(),
+            'last_working': tested.isoformat(),
+            'test_duration': round(rng.uniform(0.3, 4.0), 3),
+            'test_results': {'network': True, 'http': True, 'vlc': True},
+            'stream_type': 'hls' if '.m3u8' in url else 'direct',
+        }
+        if rng.random() < 0.3:
+            codec, height = rng.choice(CODECS)
+            entry['decode_info'] = {'codec': codec, 'height': height, 'fps': 30}
+            entry['test_results']['decode'] = rng.random() > 0.05
+        catalog[url] = entry
+    return catalog
+
+
+def synthetic_telemetry(catalog: Dict[str, Dict], fraction: float = 0.01, seed: int = 42) -> Dict:
+    """Telemetry sessions for a slice of the catalog, so ranking pays its penalty lookups"""
+    rng = random.Random(seed)
+    streams = {}
+    for url, entry in catalog.items():
+        if rng.random() >= fraction:
+            continue
+        info = entry.get('decode_info') or {}
+        streams[url] = {'sessions': [{
+            'ended': time.time(), 'seconds': 600.0, 'samples': 300,
+            'vo_drops': rng.randint(0, 400), 'decoder_drops': 0, 'drops_per_minute': 0,
+            'avsync_mean': rng.uniform(0, 0.15), 'avsync_max': 0.2, 'fps_mean': 29.9,
+            'container_fps': 30, 'bitrate_kbps': 2500,
+            'codec': info.get('codec'), 'width': None, 'height': info.get('height'),
+        }]}
+    return {'streams': streams}
+
+
+def synthetic_results(catalog: Dict[str, Dict], seed: int = 42) -> Dict[str, Dict]:
+    """What analyze_stream_batch would return for the catalog"""
+    rng = random.Random(seed)
+    results = {}
+    for url, entry in catalog.items():
+        success = rng.random() > 0.15
+        results[url] = {
+            'stream_data': entry,
+            'performance': {
+                'success': success,
+                'latency_ms': round(rng.lognormvariate(5, 0.8), 1) if success else None,
+                'cdn': rng.choice(('pluto', 'akamai', 'cloudfront', 'unknown')),
+            },
+        }
+    return results
+
+
+def _import_player(workdir: str):
+    """Import the player without touching the real log file or base path"""
+    os.environ.setdefault('IPTV_ENV', 'development')
+    cwd = os.getcwd()
+    os.chdir(workdir)  # the development config logs to a relative file
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import iptv_smart_player
+    finally:
+        os.chdir(cwd)
+    logging.getLogger().setLevel(logging.WARNING)
+    return iptv_smart_player
+
+
+def _bare_player(module, workdir: str, telemetry_file: str):
+    """MPVIPTVPlayer with only the state the catalog paths use (no mpv, no threads)"""
+    player = module.MPVIPTVPlayer.__new__(module.MPVIPTVPlayer)
+    player.config = dict(module.CONFIG, base_path=workdir)
+    player.working_streams_file = os.path.join(workdir, 'working_streams.json')
+    player.working_streams = {}
+    player.telemetry_store = PlaybackTelemetryStore(telemetry_file)
+    return player
+
+
+class CatalogFixture:
+    """One catalog size: the generated data plus files and objects the benchmarks share"""
+
+    def __init__(self, size: int, workdir: str, player_module):
+        self.size = size
+        self.workdir = workdir
+        self.catalog = generate_catalog(size)
+        self.urls = list(self.catalog)
+        with open(os.path.join(workdir, 'working_streams.json'), 'w') as f:
+            json.dump(self.catalog, f)
+        telemetry_file = os.path.join(workdir, 'stream_telemetry.json')
+        with open(telemetry_file, 'w') as f:
+            json.dump(synthetic_telemetry(self.catalog), f)
+        self.player = _bare_player(player_module, workdir, telemetry_file)
+        self.analyzer = StreamPerformanceAnalyzer(os.path.join(workdir, 'working_streams.json'))
+        self.results = None
+
+    def analyzer_results(self) -> Dict[str, Dict]:
+        if self.results is None:
+            self.results = synthetic_results(self.catalog)
+        return self.results
+
+
+def _quiet(fn: Callable) -> Callable:
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+
+def _bench_load(fixture: CatalogFixture) -> Callable:
+    return fixture.player.load_working_streams
+
+
+def _bench_select(fixture: CatalogFixture) -> Callable:
+    player = fixture.player
+
+    def run():
+        player.working_streams = fixture.catalog
+        for keywords in CATEGORIES:
+            player.get_best_streams_for_category(keywords, 10)
+    return run
+
+
+def _bench_detect(fixture: CatalogFixture) -> Callable:
+    optimizer = IPTVProtocolOptimizer()
+
+    def run():
+        clear_classifier_cache()
+        for url in fixture.urls:
+            optimizer.detect_protocol(url)
+    return run
+
+
+def _bench_report(fixture: CatalogFixture) -> Callable:
+    results = fixture.analyzer_results()
+    return _quiet(lambda: fixture.analyzer.generate_performance_report(results))
+
+
+def _bench_optimize(fixture: CatalogFixture) -> Callable:
+    results = fixture.analyzer_results()
+    output = os.path.join(fixture.workdir, 'optimized_streams.json')
+    return _quiet(lambda: fixture.analyzer.create_optimized_database(results, output))
+
+
+BENCHMARKS = {
+    'load_working_streams': _bench_load,
+    'get_best_streams_for_category': _bench_select,
+    'detect_protocol': _bench_detect,
+    'generate_performance_report': _bench_report,
+    'create_optimized_database': _bench_optimize,
+}
+
+
+def measure(fn: Callable, repeats: int) -> Dict:
+    """Timed runs, then one traced run for peak memory"""
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'min_s': min(times), 'median_s': statistics.median(times), 'peak_mb': peak / 1024 / 1024}
+
+
+def projected_seconds(history: List[Dict], size: int) -> Optional[float]:
+    """Extrapolate from earlier sizes, using the growth exponent they showed"""
+    if not history:
+        return None
+    last = history[-1]
+    exponent = 1.0
+    if len(history) >= 2:
+        prev = history[-2]
+        if prev['min_s'] > 0 and last['min_s'] > 0:
+            exponent = max(1.0, math.log(last['min_s'] / prev['min_s']) / math.log(last['size'] / prev['size']))
+    return last['min_s'] * (size / last['size']) ** exponent
+
+
+def git_revision() -> Dict:
+    def git(*args):
+        try:
+            result = subprocess.run(['git', '-C', REPO_DIR] + list(args), capture_output=True, text=True, timeout=30)
+            return result.stdout.strip() if result.returncode == 0 else None
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+    status = git('status', '--porcelain', '--untracked-files=no')
+    return {'commit': git('rev-parse', '--short', 'HEAD'), 'dirty': bool(status) if status is not None else None}
+
+
+def run_benchmarks(sizes, names, repeats: int = DEFAULT_REPEATS, max_seconds: float = MAX_SECONDS,
+                   report: Callable = print) -> List[Dict]:
+    results = []
+    by_bench = {name: [] for name in names}
+    with tempfile.TemporaryDirectory(prefix='gtv-bench-') as workdir:
+        player_module = _import_player(workdir)
+        for size in sorted(sizes):
+            started = time.perf_counter()
+            fixture = CatalogFixture(size, workdir, player_module)
+            report(f"📚 {size:,} entries (generated in {time.perf_counter() - started:.1f}s)")
+            for name in names:
+                projected = projected_seconds(by_bench[name], size)
+                if projected is not None and projected > max_seconds:
+                    row = {'bench': name, 'size': size, 'skipped': True, 'projected_s': round(projected, 1)}
+                    report(f"   {name:<30} skipped (projected {projected:,.0f}s > {max_seconds:.0f}s)")
+                else:
+                    fn = BENCHMARKS[name](fixture)
+                    row = dict(measure(fn, repeats if size < 1000000 else 1), bench=name, size=size)
+                    report(f"   {name:<30} {row['min_s'] * 1000:10.1f}ms  "
+                           f"(median {row['median_s'] * 1000:.1f}ms, peak {row['peak_mb']:.1f}MB)")
+                    by_bench[name].append(row)
+                results.append(row)
+            del fixture
+    return results
+
+
+def load_history(path: str) -> List[Dict]:
+    entries = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return entries
+
+
+def compare(current: Dict, baseline: Dict):
+    """Print speedups of current over baseline for every (bench, size) both measured"""
+    base = {(r['bench'], r['size']): r for r in baseline['results'] if not r.get('skipped')}
+    print(f"\n⚖️ {current['commit']}{'+' if current.get('dirty') else ''} vs "
+          f"{baseline['commit']}{'+' if baseline.get('dirty') else ''} ({baseline['timestamp'][:16]})")
+    for row in current['results']:
+        old = base.get((row['bench'], row['size']))
+        if row.get('skipped') or not old:
+            continue
+        speedup = old['min_s'] / row['min_s'] if row['min_s'] else float('inf')
+        marker = '🚀' if speedup >= 1.1 else ('🐢' if speedup <= 0.9 else '  ')
+        print(f"{marker} {row['bench']:<30} {row['size']:>9,}  {old['min_s'] * 1000:9.1f}ms -> "
+              f"{row['min_s'] * 1000:9.1f}ms  ({speedup:.2f}x, peak {old['peak_mb']:.1f} -> {row['peak_mb']:.1f}MB)")
+
+
+def main():
+    """Run the catalog benchmarks and record them for this commit"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV catalog-size benchmarks')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='Comma-separated catalog sizes (default: 1k,10k,100k,1M)')
+    parser.add_argument('--bench', help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help='Timed runs per size (1 at 1M)')
+    parser.add_argument('--max-seconds', type=float, default=MAX_SECONDS,
+                        help='Skip sizes projected to take longer than this per call')
+    parser.add_argument('--history', default=HISTORY_FILE, help=f'Results history (default: {HISTORY_FILE})')
+    parser.add_argument('--no-save', action='store_true', help="Don't append to the history")
+    parser.add_argument('--compare', nargs='?', const='', metavar='COMMIT',
+                        help='Compare with the latest run of COMMIT (default: the latest other commit)')
+    args = parser.parse_args()
+
+    names = args.bench.split(',') if args.bench else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"❌ Unknown benchmark(s): {', '.join(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    revision = git_revision()
+    print(f"⏱️ Catalog benchmarks at {revision['commit'] or 'unknown commit'}"
+          f"{' (uncommitted changes)' if revision['dirty'] else ''} - Python {platform.python_version()}")
+    entry = dict(revision, timestamp=datetime.now().isoformat(), python=platform.python_version(),
+                 machine=platform.machine(), results=run_benchmarks(sizes, names, args.repeats, args.max_seconds))
+
+    history = load_history(args.history)
+    if not args.no_save:
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        print(f"💾 Appended to {args.history}")
+
+    if args.compare is not None:
+        candidates = [e for e in history
+                      if (e.get('commit') or '').startswith(args.compare)
+                      and (args.compare or e.get('commit') != entry['commit'])]
+        if candidates:
+            compare(entry, candidates[-1])
+        else:
+            print(f"⚠️ No earlier run{' of ' + args.compare if args.compare else ' from another commit'} "
+                  f"in {args.history}")
+
+
+if __name__ == "__main__":
+    main()
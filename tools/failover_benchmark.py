@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+Failover Benchmark for GrannyTV
+Seconds of blank screen when the stream breaks, measured end to end
+
+Runs the real player (iptv_smart_player.py) as systemd would: a supervisor
+restarts it RestartSec after it exits. The catalog holds two channels on
+two local fixture origins, so the player has somewhere to fail over to.
+Each trial lets playback settle, injects one fault and times:
+  - detect    fault -> first player log line reacting to it
+  - relaunch  fault -> the player starting a new mpv
+  - recover   fault -> next frame on screen
+  - blank     last frame before the gap -> next frame (what granny sees)
+Faults:
+  origin_down      the primary origin drops every connection
+  manifest_freeze  the primary live playlist stops advancing
+  process_killed   SIGKILL to mpv
+  network_drop     both origins unreachable for --drop-seconds
+Frames are observed independently over mpv's IPC socket: playback-time
+advancing means new frames, a gap of more than GAP_SECONDS is a blank
+screen. Trials of different faults are interleaved, and each trial starts
+from a fresh player and state directory so learned tuning can't leak
+between trials. Distributions (median, p90, mean with 95% CI) are reported
+per fault; --json saves them and --compare diffs two runs.
+
+The player kills every mpv process on start, so don't run this next to
+another mpv you care about.
+"""
+
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from hls_fixture_server import FixtureServer
+from mpv_benchmark import HEADLESS_OPTIONS, mean_ci
+from mpv_ipc import MPVIPCClient, remove_stale_socket
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLAYER_SCRIPT = os.path.join(REPO_DIR, 'iptv_smart_player.py')
+
+FAULTS = ('origin_down', 'manifest_freeze', 'process_killed', 'network_drop')
+FIXTURE_FAULTS = ('origin_down', 'manifest_freeze', 'network_drop')
+DEFAULT_TRIALS = 5
+RESTART_SEC = 15               # RestartSec in platforms/linux/iptv-player.service
+SETTLE_SECONDS = 10            # steady playback before the fault
+STARTUP_TIMEOUT = 90
+TRIAL_TIMEOUT = 240            # give up on recovery after this
+DROP_SECONDS = 10
+GAP_SECONDS = 1.0              # no new frames for this long = blank screen
+STABLE_SECONDS = 3             # playback must continue this long to count as recovered
+MASKED_AFTER = 30              # no gap this long after the fault: buffers rode it out
+POLL_INTERVAL = 0.1
+
+# Player log lines that show it noticed something is wrong
+DETECTION_MARKERS = ('[WARNING] Player ended', '[HEALTH] Playback health check failed',
+                     '[CACHE] Buffering started', '[RESTART]', '[MEMORY] Critical')
+RELAUNCH_MARKER = '[MPV] Starting MPV player'
+STAGES = ('detect_s', 'relaunch_s', 'recover_s', 'blank_s')
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Linear-interpolated percentile of values (fraction 0..1)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def distribution(values: List[float]) -> Dict:
+    stats = mean_ci(values)
+    stats.update({'min': min(values) if values else None, 'p50': percentile(values, 0.5),
+                  'p90': percentile(values, 0.9), 'max': max(values) if values else None})
+    return stats
+
+
+def build_catalog(primary_url: str, backup_url: Optional[str]) -> Dict[str, Dict]:
+    """working_streams.json with the primary channel ranked above the backup"""
+    now = datetime.now()
+    catalog = {}
+    for url, name, age in ((primary_url, 'Classic Movies Primary', 0), (backup_url, 'Classic Movies Backup', 1)):
+        if not url:
+            continue
+        tested = (now - timedelta(hours=age)).isoformat()
+        catalog[url] = {
+            'url': url, 'name': name, 'group': 'Movies', 'last_tested': tested, 'last_working': tested,
+            'test_duration': 1.0, 'test_results': {'network': True, 'http': True, 'vlc': True},
+            'stream_type': 'hls' if '.m3u8' in url else 'direct',
+        }
+    return catalog
+
+
+def player_config(base_path: str, headless: bool) -> Dict:
+    """A production-shaped player config confined to base_path"""
+    config = {
+        'platform': 'benchmark',
+        'base_path': base_path,
+        'log_file': os.path.join(base_path, 'iptv_player.log'),
+        'working_streams_file': os.path.join(base_path, 'working_streams.json'),
+        'use_vlc': False,
+        'test_mode': False,
+        'display': {'setup_display': False, 'setup_audio': False},
+        'metrics': {'enabled': False},
+        'mpv_ipc_socket': os.path.join(base_path, 'mpv.sock'),
+        'mpv_pidfile': os.path.join(base_path, 'mpv.pid'),
+        'player_command': 'mpv',
+    }
+    if headless:
+        config['mpv_options'] = dict(HEADLESS_OPTIONS)
+    return config
+
+
+class PlayerSupervisor:
+    """Runs the player like systemd's Restart=always, recording its log lines"""
+
+    def __init__(self, config_file: str, restart_sec: float = RESTART_SEC):
+        self.config_file = config_file
+        self.restart_sec = restart_sec
+        self.process = None
+        self.lines = []
+        self.starts = []
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='player-supervisor', daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        env = dict(os.environ, IPTV_CONFIG=self.config_file, IPTV_ENV='development', PYTHONUNBUFFERED='1')
+        while True:
+            with self.lock:
+                if self.stopping.is_set():
+                    break
+                self.starts.append(time.time())
+                self.process = subprocess.Popen([sys.executable, PLAYER_SCRIPT], env=env, cwd=REPO_DIR,
+                                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            for line in self.process.stdout:
+                with self.lock:
+                    self.lines.append((time.time(), line.rstrip('\n')))
+            self.process.wait()
+            with self.lock:
+                self.lines.append((time.time(), f"[SUPERVISOR] Player exited ({self.process.returncode})"))
+            self.stopping.wait(self.restart_sec)
+
+    def first_line(self, markers, after: float) -> Optional[tuple]:
+        """(time, line) of the first line after `after` containing any marker"""
+        with self.lock:
+            for at, line in self.lines:
+                if at > after and any(marker in line for marker in markers):
+                    return at, line
+        return None
+
+    def log(self) -> List[str]:
+        with self.lock:
+            return [f"{at:.3f} {line}" for at, line in self.lines]
+
+    def stop(self):
+        self.stopping.set()
+        with self.lock:
+            process = self.process
+        if process and process.poll() is None:
+            process.send_signal(signal.SIGTERM)  # the player's handler stops mpv too
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+
+class FrameWatcher:
+    """Timestamps of new frames, from playback-time over whichever mpv owns the socket"""
+
+    def __init__(self, socket_path: str, interval: float = POLL_INTERVAL):
+        self.socket_path = socket_path
+        self.interval = interval
+        self.frames = []
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.ipc = None
+        self.inode = None
+        self.last_position = None
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='frame-watcher', daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            self.poll()
+        self._disconnect()
+
+    def _disconnect(self):
+        if self.ipc:
+            self.ipc.close()
+        self.ipc = None
+        self.last_position = None
+
+    def poll(self):
+        try:
+            inode = os.stat(self.socket_path).st_ino
+        except OSError:
+            inode = None
+        if self.ipc and (not self.ipc.connected or inode != self.inode):
+            self._disconnect()  # mpv died or a new one replaced the socket
+        if self.ipc is None:
+            if inode is None:
+                return
+            ipc = MPVIPCClient(self.socket_path, timeout=0.5)
+            if not ipc.connect(wait=0):
+                return
+            self.ipc, self.inode = ipc, inode
+        position = self.ipc.get_property('playback-time')
+        if position is None:
+            return
+        now = time.time()
+        if self.last_position is None:
+            # First look at this mpv: its first frame was `position` seconds ago
+            self._add(now - position if position > 0 else now)
+        elif position > self.last_position:
+            self._add(now)
+        self.last_position = position
+
+    def _add(self, at: float):
+        with self.lock:
+            self.frames.append(at)
+
+    def frames_since(self, after: float) -> List[float]:
+        with self.lock:
+            return sorted(at for at in self.frames if at > after)
+
+    def last_frame(self) -> Optional[float]:
+        with self.lock:
+            return max(self.frames) if self.frames else None
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+
+def find_gap(frames: List[float], fault_at: float, now: float, gap: float = GAP_SECONDS) -> Dict:
+    """The first blank-screen gap after the fault and the frame that ended it"""
+    before = [at for at in frames if at <= fault_at]
+    previous = before[-1] if before else fault_at
+    for at in (at for at in frames if at > fault_at):
+        if at - previous > gap:
+            return {'lost_at': previous, 'recovered_at': at}
+        previous = at
+    if now - previous > gap:
+        return {'lost_at': previous, 'recovered_at': None}
+    return {'lost_at': None, 'recovered_at': None}  # still playing: the fault was masked so far
+
+
+class FailoverRig:
+    """Two fixture origins (or stand-in URLs) and the fault injectors"""
+
+    def __init__(self, media_dir: Optional[str] = None, primary_url: Optional[str] = None,
+                 backup_url: Optional[str] = None, drop_seconds: float = DROP_SECONDS):
+        self.drop_seconds = drop_seconds
+        self.origins = []
+        if primary_url:
+            self.primary_url, self.backup_url = primary_url, backup_url
+        else:
+            self.origins = [FixtureServer(media_dir, port=0).start(), FixtureServer(media_dir, port=0).start()]
+            self.primary_url, self.backup_url = (origin.url() for origin in self.origins)
+        self.timers = []
+
+    def supports(self, fault: str) -> bool:
+        return fault not in FIXTURE_FAULTS or bool(self.origins)
+
+    def inject(self, fault: str, pidfile: str) -> bool:
+        if fault == 'origin_down':
+            self.origins[0].set_faults(down={})
+        elif fault == 'manifest_freeze':
+            self.origins[0].set_faults(freeze={})
+        elif fault == 'network_drop':
+            for origin in self.origins:
+                origin.set_faults(down={})
+            timer = threading.Timer(self.drop_seconds, self.reset)
+            timer.daemon = True
+            timer.start()
+            self.timers.append(timer)
+        elif fault == 'process_killed':
+            try:
+                with open(pidfile, 'r') as f:
+                    os.kill(int(f.read().strip()), signal.SIGKILL)
+            except (OSError, ValueError):
+                return False
+        return True
+
+    def reset(self):
+        for origin in self.origins:
+            origin.set_faults(reset=True)
+
+    def close(self):
+        for timer in self.timers:
+            timer.cancel()
+        self.reset()
+        for origin in self.origins:
+            origin.stop()
+
+
+def run_trial(rig: FailoverRig, fault: str, workdir: str, headless: bool = False,
+              restart_sec: float = RESTART_SEC, settle: float = SETTLE_SECONDS,
+              timeout: float = TRIAL_TIMEOUT) -> Dict:
+    """Start a fresh player, let it settle, break it, and time the recovery"""
+    os.makedirs(workdir, exist_ok=True)
+    config = player_config(workdir, headless)
+    with open(os.path.join(workdir, 'working_streams.json'), 'w') as f:
+        json.dump(build_catalog(rig.primary_url, rig.backup_url), f, indent=2)
+    config_file = os.path.join(workdir, 'config.json')
+    with open(config_file, 'w') as f:
+        json.dump({'development': config, 'production': config}, f, indent=2)
+    remove_stale_socket(config['mpv_ipc_socket'])
+
+    result = {'fault': fault, 'status': 'ok', 'started': time.time()}
+    rig.reset()
+    watcher = FrameWatcher(config['mpv_ipc_socket']).start()
+    supervisor = PlayerSupervisor(config_file, restart_sec).start()
+    try:
+        deadline = time.time() + STARTUP_TIMEOUT
+        while watcher.last_frame() is None and time.time() < deadline:
+            time.sleep(0.2)
+        first_frame = watcher.last_frame()
+        if first_frame is None:
+            return dict(result, status='no_video')
+        result['startup_s'] = round(first_frame - supervisor.starts[0], 3)
+        time.sleep(settle)
+
+        fault_at = time.time()
+        if not rig.inject(fault, config['mpv_pidfile']):
+            return dict(result, status='fault_failed')
+
+        gap = {'lost_at': None, 'recovered_at': None}
+        while time.time() - fault_at < timeout:
+            time.sleep(0.5)
+            gap = find_gap(watcher.frames_since(0), fault_at, time.time())
+            if gap['recovered_at'] and watcher.last_frame() - gap['recovered_at'] >= STABLE_SECONDS:
+                break
+            if not gap['lost_at'] and time.time() - fault_at >= MASKED_AFTER:
+                break
+
+        detected = supervisor.first_line(DETECTION_MARKERS, fault_at)
+        relaunched = supervisor.first_line((RELAUNCH_MARKER,), fault_at)
+        result.update({
+            'detect_s': round(detected[0] - fault_at, 3) if detected else None,
+            'detected_by': detected[1].split(' - ', 2)[-1][:80] if detected else None,
+            'relaunch_s': round(relaunched[0] - fault_at, 3) if relaunched else None,
+            'player_restarts': len(supervisor.starts) - 1,
+        })
+        if gap['recovered_at']:
+            result['recover_s'] = round(gap['recovered_at'] - fault_at, 3)
+            result['blank_s'] = round(gap['recovered_at'] - gap['lost_at'], 3)
+        elif gap['lost_at']:
+            result['status'] = 'not_recovered'
+            result['blank_s'] = round(time.time() - gap['lost_at'], 3)  # a lower bound
+        else:
+            result['status'] = 'masked'
+            result['blank_s'] = 0.0
+        return result
+    finally:
+        supervisor.stop()
+        watcher.stop()
+        rig.reset()
+        with open(os.path.join(workdir, 'player-output.log'), 'w') as f:
+            f.write('\n'.join(supervisor.log()) + '\n')
+
+
+def summarize(trials: List[Dict]) -> List[Dict]:
+    """Per-fault distributions of each stage"""
+    summary = []
+    for fault in FAULTS:
+        runs = [t for t in trials if t['fault'] == fault]
+        if not runs:
+            continue
+        entry = {'fault': fault, 'trials': len(runs),
+                 'statuses': {status: sum(1 for r in runs if r['status'] == status)
+                              for status in sorted({r['status'] for r in runs})}}
+        for stage in STAGES:
+            # Unrecovered trials only give a lower bound on blank time; keep them out of the stats
+            values = [r[stage] for r in runs if r.get(stage) is not None and r['status'] in ('ok', 'masked')]
+            entry[stage] = distribution(values)
+        summary.append(entry)
+    return summary
+
+
+def _fmt(stats: Dict) -> str:
+    if stats['n'] == 0:
+        return '--'
+    ci = f" ±{stats['ci95']:.1f}" if stats['ci95'] is not None else ''
+    return f"p50 {stats['p50']:.1f}s  p90 {stats['p90']:.1f}s  max {stats['max']:.1f}s  (mean {stats['mean']:.1f}{ci}s)"
+
+
+def print_summary(summary: List[Dict]):
+    print("\n🏁 Failover (fault -> detect -> relaunch -> next frame)")
+    for entry in summary:
+        statuses = ', '.join(f"{count} {status}" for status, count in entry['statuses'].items())
+        print(f"⚡ {entry['fault']:<16} {entry['trials']} trials ({statuses})")
+        for stage in STAGES:
+            print(f"     {stage[:-2]:<9} {_fmt(entry[stage])}")
+
+
+def compare(summary: List[Dict], baseline: List[Dict]):
+    """Median blank-screen seconds saved against an earlier --json result"""
+    before = {entry['fault']: entry for entry in baseline}
+    print("\n⚖️ Blank screen vs baseline (median)")
+    compared = 0
+    for entry in summary:
+        old = before.get(entry['fault'])
+        now, then = entry['blank_s']['p50'], old['blank_s']['p50'] if old else None
+        if now is None or then is None:
+            continue
+        compared += 1
+        print(f"   {entry['fault']:<16} {then:6.1f}s -> {now:6.1f}s  ({then - now:+.1f}s saved)")
+    if not compared:
+        print("   No recovered fault in common with the baseline")
+
+
+def main():
+    """Measure failover time of the real player under injected faults"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV failover benchmark')
+    parser.add_argument('--media', help='Fixture media from hls_fixture_server.py --generate (needed for real video)')
+    parser.add_argument('--url', help='Stand-in primary stream instead of the fixture (process_killed only)')
+    parser.add_argument('--backup-url', help='Stand-in backup stream for --url')
+    parser.add_argument('--faults', default=','.join(FAULTS), help=f"Comma-separated subset of: {', '.join(FAULTS)}")
+    parser.add_argument('--trials', type=int, default=DEFAULT_TRIALS, help='Trials per fault')
+    parser.add_argument('--settle', type=float, default=SETTLE_SECONDS, help='Seconds of playback before the fault')
+    parser.add_argument('--timeout', type=float, default=TRIAL_TIMEOUT, help='Seconds to wait for recovery')
+    parser.add_argument('--drop-seconds', type=float, default=DROP_SECONDS, help='Length of a network_drop')
+    parser.add_argument('--restart-sec', type=float, default=RESTART_SEC, help='Supervisor restart delay (RestartSec)')
+    parser.add_argument('--headless', action='store_true', help='Run mpv with vo/ao=null')
+    parser.add_argument('--seed', type=int, help='Seed for the trial order')
+    parser.add_argument('--json', help='Write trials and summary to this file')
+    parser.add_argument('--compare', metavar='JSON', help='Earlier --json result to compare blank-screen time with')
+    parser.add_argument('--keep', action='store_true', help='Keep per-trial player logs and state')
+    args = parser.parse_args()
+
+    faults = [f.strip() for f in args.faults.split(',') if f.strip()]
+    unknown = [f for f in faults if f not in FAULTS]
+    if unknown:
+        raise SystemExit(f"❌ Unknown fault(s): {', '.join(unknown)}")
+
+    rig = FailoverRig(args.media, args.url, args.backup_url, args.drop_seconds)
+    skipped = [f for f in faults if not rig.supports(f)]
+    faults = [f for f in faults if rig.supports(f)]
+    if skipped:
+        print(f"⚠️ Skipping {', '.join(skipped)} (needs the fixture origins, not --url)")
+    if not faults:
+        rig.close()
+        raise SystemExit("❌ No faults to run")
+
+    print(f"📺 Player: {PLAYER_SCRIPT}")
+    print(f"🔗 Primary: {rig.primary_url}")
+    print(f"🔗 Backup:  {rig.backup_url or '-'}")
+    if rig.origins and rig.origins[0].media.synthetic:
+        print("⚠️ Synthetic fixture segments have no picture - use --media for real video")
+
+    rng = random.Random(args.seed)
+    workroot = tempfile.mkdtemp(prefix='gtv-failover-')
+    trials = []
+    try:
+        for round_number in range(1, args.trials + 1):
+            order = list(faults)
+            rng.shuffle(order)
+            for fault in order:
+                print(f"\n🔁 Round {round_number}/{args.trials}: {fault}")
+                trial = run_trial(rig, fault, os.path.join(workroot, f"{len(trials) + 1:03d}-{fault}"),
+                                  args.headless, args.restart_sec, args.settle, args.timeout)
+                trials.append(trial)
+                if trial['status'] in ('ok', 'masked'):
+                    detect = f"{trial['detect_s']:.1f}s" if trial.get('detect_s') is not None else '--'
+                    print(f"   ✅ blank {trial['blank_s']:.1f}s (detect {detect}, "
+                          f"{trial['player_restarts']} player restarts) [{trial['status']}]")
+                else:
+                    print(f"   ❌ {trial['status']}" +
+                          (f" (blank ≥ {trial['blank_s']:.0f}s)" if trial.get('blank_s') else ''))
+                time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrupted - summarizing completed trials")
+    finally:
+        rig.close()
+        if args.keep:
+            print(f"\n📁 Trial logs kept in {workroot}")
+        else:
+            shutil.rmtree(workroot, ignore_errors=True)
+
+    summary = summarize(trials)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'primary': rig.primary_url, 'restart_sec': args.restart_sec,
+                       'trials': trials, 'summary': summary}, f, indent=2)
+        print(f"\n💾 Results saved to {args.json}")
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(summary, json.load(f)['summary'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+HLS Fixture Server for GrannyTV
+Local live/VOD HLS, MPEG-TS and MP4 with injectable faults
+
+Benchmarks and tests pointed at Pluto/Akamai can't be reproduced or run
+offline. This server plays the origin instead:
+  /live/master.m3u8   live HLS (sliding window that advances in real time)
+  /vod/master.m3u8    VOD HLS (full playlist with ENDLIST)
+  /ts/stream.ts       endless MPEG-TS paced at real time (a "direct" stream)
+  /mp4/video.mp4      progressive MP4 with Range support (generated media only)
+  /control            GET the state and counters, POST JSON to set faults
+
+Faults are deterministic: count- and every-Nth-based, never random.
+  latency   {"ms": 300}                 delay before each response
+  bandwidth {"kbps": 1500}              cap the body rate
+  errors    {"status": 404, "count": 5} fail the next N requests
+  stall     {"seconds": 20}             stop sending halfway through a body
+  truncate  {"fraction": 0.5}           close the connection partway through a body
+  freeze    {}                          live playlists stop advancing
+  down      {}                          drop every connection without a response
+Each fault takes optional "match" (path substring), "every" (apply to every
+Nth matching request) and "count" (apply this many times, then clear).
+
+Media comes from --media DIR, made with --generate DIR (needs ffmpeg).
+Without it, segments are synthetic MPEG-TS null packets. Players get the
+right sizes and timing, which is enough for HTTP, playlist and recovery
+logic, but there is no picture to decode.
+"""
+
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+DEFAULT_PORT = 8800
+SEGMENT_SECONDS = 2.0
+LIVE_WINDOW = 6                 # segments in a live playlist
+VOD_SEGMENTS = 30
+CHUNK_SIZE = 16 * 1024
+TS_PACKET = 188
+MANIFEST_FILE = 'fixture.json'
+
+# Variants used for synthetic media and for --generate
+VARIANTS = [
+    {'name': '720p', 'width': 1280, 'height': 720, 'bandwidth': 2800000, 'video_kbps': 2500},
+    {'name': '360p', 'width': 640, 'height': 360, 'bandwidth': 900000, 'video_kbps': 750},
+]
+CODECS = 'avc1.64001f,mp4a.40.2'
+
+FAULTS = ('latency', 'bandwidth', 'errors', 'stall', 'truncate', 'freeze', 'down')
+DEFAULT_MATCH = {'stall': '.ts', 'truncate': '.ts'}  # body faults target segments unless told otherwise
+
+_SEGMENT_RE = re.compile(r'^/(live|vod)/([^/]+)/seg(\d+)\.ts$')
+_PLAYLIST_RE = re.compile(r'^/(live|vod)/([^/]+)/index\.m3u8$')
+
+
+def null_ts_packets(size: int) -> bytes:
+    """size bytes (rounded to whole packets) of MPEG-TS null packets"""
+    packet = bytes([0x47, 0x1F, 0xFF, 0x10]) + b'\xff' * (TS_PACKET - 4)
+    return packet * max(1, size // TS_PACKET)
+
+
+class FixtureMedia:
+    """Variants with their segment list, from a generated directory or synthetic"""
+
+    def __init__(self, media_dir: Optional[str] = None):
+        self.media_dir = media_dir
+        self.mp4 = None
+        self._synthetic = {}
+        if media_dir:
+            with open(os.path.join(media_dir, MANIFEST_FILE), 'r') as f:
+                manifest = json.load(f)
+            self.variants = manifest['variants']
+            if manifest.get('mp4'):
+                self.mp4 = os.path.join(media_dir, manifest['mp4'])
+            self.synthetic = False
+        else:
+            self.variants = [dict(v, segments=[{'duration': SEGMENT_SECONDS}] * VOD_SEGMENTS) for v in VARIANTS]
+            self.synthetic = True
+        self.by_name = {v['name']: v for v in self.variants}
+        self.segment_seconds = max(s['duration'] for s in self.variants[0]['segments'])
+
+    def segment(self, variant: str, index: int) -> bytes:
+        entry = self.by_name[variant]
+        segments = entry['segments']
+        segment = segments[index % len(segments)]
+        if not self.synthetic:
+            with open(os.path.join(self.media_dir, variant, segment['file']), 'rb') as f:
+                return f.read()
+        if variant not in self._synthetic:
+            self._synthetic[variant] = null_ts_packets(int(entry['bandwidth'] / 8 * segment['duration']))
+        return self._synthetic[variant]
+
+
+class FaultSet:
+    """Active faults and their counters, shared by all request threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.faults = {}
+        self.matched = {}
+        self.hits = {name: 0 for name in FAULTS}
+        self.frozen_sequence = None
+
+    def configure(self, spec: Dict):
+        """Merge a fault spec; a null/false value clears that fault"""
+        with self.lock:
+            if spec.get('reset'):
+                self.faults.clear()
+                self.matched.clear()
+                self.frozen_sequence = None
+            for name in FAULTS:
+                if name not in spec:
+                    continue
+                if spec[name] in (None, False):
+                    self.faults.pop(name, None)
+                    if name == 'freeze':
+                        self.frozen_sequence = None
+                else:
+                    self.faults[name] = dict(spec[name]) if isinstance(spec[name], dict) else {}
+                    self.matched[name] = 0
+
+    def take(self, name: str, path: str) -> Optional[Dict]:
+        """The fault's parameters if it applies to this request"""
+        with self.lock:
+            fault = self.faults.get(name)
+            if fault is None or fault.get('match', DEFAULT_MATCH.get(name, '')) not in path:
+                return None
+            self.matched[name] += 1
+            if self.matched[name] % max(1, int(fault.get('every', 1))) != 0:
+                return None
+            self.hits[name] += 1
+            if 'count' in fault:
+                fault['count'] -= 1
+                if fault['count'] <= 0:
+                    del self.faults[name]
+            return fault
+
+    def live_sequence(self, current: int) -> int:
+        """Newest live segment, held still while the manifest is frozen"""
+        with self.lock:
+            if 'freeze' not in self.faults:
+                self.frozen_sequence = None
+                return current
+            if self.frozen_sequence is None:
+                self.frozen_sequence = current
+                self.hits['freeze'] += 1
+            return self.frozen_sequence
+
+    def state(self) -> Dict:
+        with self.lock:
+            return {'faults': json.loads(json.dumps(self.faults)), 'hits': dict(self.hits)}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    fixture = None  # FixtureServer, set by FixtureServer.start()
+
+    def log_message(self, format, *args):
+        if self.fixture.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    # --- plumbing -------------------------------------------------------
+
+    def _fault_gate(self, path: str) -> bool:
+        """Apply down/latency/errors; False when the request was answered by a fault"""
+        faults = self.fixture.faults
+        if faults.take('down', path) is not None:
+            self.close_connection = True
+            return False
+        latency = faults.take('latency', path)
+        if latency is not None:
+            time.sleep(latency.get('ms', 0) / 1000)
+        error = faults.take('errors', path)
+        if error is not None:
+            self._send_simple(int(error.get('status', 500)), f"Injected {error.get('status', 500)}\n")
+            return False
+        return True
+
+    def _send_simple(self, status: int, text: str, content_type: str = 'text/plain'):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_body(self, path: str, body: bytes, content_type: str, status: int = 200,
+                   extra_headers: Optional[Dict] = None):
+        """Headers, then the body through the bandwidth/stall/truncate faults"""
+        faults = self.fixture.faults
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+
+        bandwidth = faults.take('bandwidth', path)
+        stall = faults.take('stall', path)
+        truncate = faults.take('truncate', path)
+        limit = int(len(body) * float(truncate.get('fraction', 0.5))) if truncate is not None else len(body)
+        stall_at = int(len(body) * float(stall.get('fraction', 0.5))) if stall is not None else None
+        bytes_per_second = bandwidth['kbps'] * 1000 / 8 if bandwidth and bandwidth.get('kbps') else None
+
+        sent = 0
+        started = time.monotonic()
+        try:
+            while sent < limit:
+                if stall_at is not None and sent >= stall_at:
+                    time.sleep(float(stall.get('seconds', 30)))
+                    stall_at = None
+                end = min(limit, sent + CHUNK_SIZE)
+                if stall_at is not None:
+                    end = min(end, max(stall_at, sent + 1))
+                self.wfile.write(body[sent:end])
+                sent = end
+                if bytes_per_second:
+                    ahead = sent / bytes_per_second - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            return
+        if truncate is not None:
+            self.close_connection = True  # the client sees fewer bytes than Content-Length
+
+    # --- routes ---------------------------------------------------------
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == '/control':
+            self._send_simple(200, json.dumps(self.fixture.state(), indent=2), 'application/json')
+            return
+        if not self._fault_gate(path):
+            return
+        self.fixture.count_request(path)
+
+        media = self.fixture.media
+        if path in ('/live/master.m3u8', '/vod/master.m3u8'):
+            self._send_body(path, self.fixture.master_playlist(path.split('/')[1]).encode('utf-8'),
+                            'application/vnd.apple.mpegurl')
+            return
+        m = _PLAYLIST_RE.match(path)
+        if m and m.group(2) in media.by_name:
+            kind, variant = m.groups()
+            text = self.fixture.live_playlist(variant) if kind == 'live' else self.fixture.vod_playlist(variant)
+            self._send_body(path, text.encode('utf-8'), 'application/vnd.apple.mpegurl')
+            return
+        m = _SEGMENT_RE.match(path)
+        if m and m.group(2) in media.by_name:
+            self._send_body(path, media.segment(m.group(2), int(m.group(3))), 'video/mp2t')
+            return
+        if path == '/ts/stream.ts':
+            self._stream_ts(path)
+            return
+        if path == '/mp4/video.mp4' and media.mp4:
+            self._send_file(path, media.mp4, 'video/mp4')
+            return
+        self._send_simple(404, 'Not found\n')
+
+    def do_POST(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path != '/control':
+            self._send_simple(404, 'Not found\n')
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            spec = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(spec, dict):
+                raise ValueError('expected a JSON object')
+        except ValueError as e:
+            self._send_simple(400, f"Bad fault spec: {e}\n")
+            return
+        self.fixture.faults.configure(spec)
+        self._send_simple(200, json.dumps(self.fixture.state(), indent=2), 'application/json')
+
+    def _stream_ts(self, path: str):
+        """Endless TS from the first variant's segments, one segment per segment duration"""
+        media = self.fixture.media
+        variant = media.variants[0]['name']
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp2t')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        started = time.monotonic()
+        index = 0
+        try:
+            while not self.fixture.stopping.is_set():
+                if self.fixture.faults.take('down', path) is not None:
+                    return  # origin died mid-stream
+                stall = self.fixture.faults.take('stall', path)
+                if stall is not None:
+                    time.sleep(float(stall.get('seconds', 30)))
+                    started += float(stall.get('seconds', 30))
+                self.wfile.write(media.segment(variant, index))
+                self.wfile.flush()
+                index += 1
+                ahead = index * media.segment_seconds - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_file(self, path: str, filename: str, content_type: str):
+        """Static file with single-range support (mpv seeks MP4 with Range)"""
+        with open(filename, 'rb') as f:
+            data = f.read()
+        m = re.match(r'bytes=(\d*)-(\d*)$', self.headers.get('Range', ''))
+        if m and (m.group(1) or m.group(2)):
+            if m.group(1):
+                start = int(m.group(1))
+                end = min(int(m.group(2)), len(data) - 1) if m.group(2) else len(data) - 1
+            else:
+                start, end = max(0, len(data) - int(m.group(2))), len(data) - 1
+            if start >= len(data) or start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(data)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self._send_body(path, data[start:end + 1], content_type, 206,
+                            {'Content-Range': f'bytes {start}-{end}/{len(data)}', 'Accept-Ranges': 'bytes'})
+            return
+        self._send_body(path, data, content_type, extra_headers={'Accept-Ranges': 'bytes'})
+
+
+class FixtureServer:
+    """The fixture origin; usable in-process (tests, benchmarks) or from the CLI"""
+
+    def __init__(self, media_dir: Optional[str] = None, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 live_window: int = LIVE_WINDOW, verbose: bool = False):
+        self.media = FixtureMedia(media_dir)
+        self.faults = FaultSet()
+        self.host = host
+        self.port = port
+        self.live_window = live_window
+        self.verbose = verbose
+        # Start the live clock a full window in, so the first playlist is complete
+        self.epoch = time.time() - live_window * self.media.segment_seconds
+        self.requests = {'playlist': 0, 'segment': 0, 'other': 0}
+        self.requests_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.httpd = None
+
+    def start(self) -> 'FixtureServer':
+        handler = type('Handler', (FixtureHandler,), {'fixture': self})
+        self.httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]  # port=0 picks a free one
+        threading.Thread(target=self.httpd.serve_forever, name='hls-fixture', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+    def url(self, path: str = '/live/master.m3u8') -> str:
+        return f"http://{self.host}:{self.port}{path}"
+
+    def set_faults(self, **spec):
+        """e.g. set_faults(errors={'status': 404, 'count': 3}), set_faults(reset=True)"""
+        self.faults.configure(spec)
+
+    def count_request(self, path: str):
+        kind = 'playlist' if path.endswith('.m3u8') else 'segment' if path.endswith('.ts') else 'other'
+        with self.requests_lock:
+            self.requests[kind] += 1
+
+    def state(self) -> Dict:
+        state = self.faults.state()
+        with self.requests_lock:
+            state['requests'] = dict(self.requests)
+        state.update({
+            'synthetic': self.media.synthetic,
+            'variants': [v['name'] for v in self.media.variants],
+            'segment_seconds': self.media.segment_seconds,
+            'live_sequence': self.current_sequence(),
+        })
+        return state
+
+    # --- playlists ------------------------------------------------------
+
+    def current_sequence(self) -> int:
+        """Sequence number of the newest complete live segment"""
+        return int((time.time() - self.epoch) / self.media.segment_seconds) - 1
+
+    def master_playlist(self, kind: str) -> str:
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+        for v in self.media.variants:
+            lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={v['bandwidth']},"
+                         f"RESOLUTION={v['width']}x{v['height']},CODECS=\"{v.get('codecs', CODECS)}\"")
+            lines.append(f"{v['name']}/index.m3u8")
+        return '\n'.join(lines) + '\n'
+
+    def live_playlist(self, variant: str) -> str:
+        segments = self.media.by_name[variant]['segments']
+        newest = self.faults.live_sequence(self.current_sequence())
+        first = max(0, newest - self.live_window + 1)
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3',
+                 f"#EXT-X-TARGETDURATION:{math.ceil(self.media.segment_seconds)}",
+                 f"#EXT-X-MEDIA-SEQUENCE:{first}",
+                 f"#EXT-X-DISCONTINUITY-SEQUENCE:{first // len(segments)}"]
+        for sequence in range(first, newest + 1):
+            if sequence % len(segments) == 0 and sequence != first:
+                lines.append('#EXT-X-DISCONTINUITY')  # the loop wraps around
+            lines.append(f"#EXTINF:{segments[sequence % len(segments)]['duration']:.3f},")
+            lines.append(f"seg{sequence}.ts")
+        return '\n'.join(lines) + '\n'
+
+    def vod_playlist(self, variant: str) -> str:
+        segments = self.media.by_name[variant]['segments']
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-PLAYLIST-TYPE:VOD',
+                 f"#EXT-X-TARGETDURATION:{math.ceil(max(s['duration'] for s in segments))}",
+                 '#EXT-X-MEDIA-SEQUENCE:0']
+        for i, segment in enumerate(segments):
+            lines.append(f"#EXTINF:{segment['duration']:.3f},")
+            lines.append(f"seg{i}.ts")
+        lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines) + '\n'
+
+
+def generate_media(directory: str, seconds: int = int(SEGMENT_SECONDS * VOD_SEGMENTS),
+                   segment_seconds: float = SEGMENT_SECONDS) -> Dict:
+    """Encode test-pattern HLS variants and an MP4 with ffmpeg; writes fixture.json"""
+    if not shutil.which('ffmpeg'):
+        raise SystemExit("❌ ffmpeg is not installed (sudo apt install ffmpeg)")
+    os.makedirs(directory, exist_ok=True)
+    fps = 30
+    manifest = {'segment_seconds': segment_seconds, 'variants': [], 'mp4': 'video.mp4'}
+    for v in VARIANTS:
+        out = os.path.join(directory, v['name'])
+        os.makedirs(out, exist_ok=True)
+        print(f"🎞️ Encoding {v['name']} ({seconds}s)...")
+        subprocess.run([
+            'ffmpeg', '-loglevel', 'error', '-y',
+            '-f', 'lavfi', '-i', f"testsrc2=size={v['width']}x{v['height']}:rate={fps}",
+            '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000',
+            '-t', str(seconds),
+            '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'high', '-pix_fmt', 'yuv420p',
+            '-b:v', f"{v['video_kbps']}k", '-maxrate', f"{v['video_kbps']}k", '-bufsize', f"{v['video_kbps'] * 2}k",
+            '-g', str(int(fps * segment_seconds)), '-keyint_min', str(int(fps * segment_seconds)),
+            '-sc_threshold', '0',
+            '-c:a', 'aac', '-b:a', '128k',
+            '-f', 'hls', '-hls_time', str(segment_seconds), '-hls_playlist_type', 'vod',
+            '-hls_segment_filename', os.path.join(out, 'seg%03d.ts'),
+            os.path.join(out, 'index.m3u8'),
+        ], check=True)
+        segments = []
+        duration = None
+        with open(os.path.join(out, 'index.m3u8'), 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('#EXTINF:'):
+                    duration = float(line[8:].split(',')[0])
+                elif line and not line.startswith('#'):
+                    segments.append({'file': line, 'duration': duration})
+        entry = {k: v[k] for k in ('name', 'width', 'height', 'bandwidth')}
+        entry.update({'codecs': CODECS, 'segments': segments})
+        manifest['variants'].append(entry)
+
+    print("🎞️ Encoding video.mp4...")
+    v = VARIANTS[0]
+    subprocess.run([
+        'ffmpeg', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', f"testsrc2=size={v['width']}x{v['height']}:rate={fps}",
+        '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000',
+        '-t', str(seconds), '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+        '-b:v', f"{v['video_kbps']}k", '-c:a', 'aac', '-b:a', '128k', '-movflags', '+faststart',
+        os.path.join(directory, 'video.mp4'),
+    ], check=True)
+
+    with open(os.path.join(directory, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    """Run the fixture server (or generate its media)"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV HLS/TS fixture server with fault injection')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    parser.add_argument('--media', help='Directory made by --generate (default: synthetic segments)')
+    parser.add_argument('--generate', metavar='DIR', help='Encode test media into DIR with ffmpeg and exit')
+    parser.add_argument('--seconds', type=int, default=int(SEGMENT_SECONDS * VOD_SEGMENTS),
+                        help='Length of generated media')
+    parser.add_argument('--faults', help='Initial faults as JSON, e.g. \'{"latency": {"ms": 300}}\'')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    if args.generate:
+        manifest = generate_media(args.generate, args.seconds)
+        print(f"✅ {len(manifest['variants'])} variants × {len(manifest['variants'][0]['segments'])} segments "
+              f"in {args.generate} - serve with --media {args.generate}")
+        return
+
+    server = FixtureServer(args.media, args.host, args.port, verbose=args.verbose)
+    if args.faults:
+        server.faults.configure(json.loads(args.faults))
+    server.start()
+    kind = 'synthetic segments (no picture)' if server.media.synthetic else f"media from {args.media}"
+    print(f"🧪 HLS fixture server on http://{args.host}:{server.port} - {kind}")
+    for path in ('/live/master.m3u8', '/vod/master.m3u8', '/ts/stream.ts', '/mp4/video.mp4', '/control'):
+        if path != '/mp4/video.mp4' or server.media.mp4:
+            print(f"   {server.url(path)}")
+    print(f"   curl -d '{{\"errors\": {{\"status\": 500, \"count\": 3}}}}' {server.url('/control')}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
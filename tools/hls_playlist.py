@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+HLS Playlist Tools for GrannyTV
+Master playlist parsing, link capacity estimation and variant selection
+
+The player hands mpv a single variant that the link and the decoder can
+sustain, instead of letting mpv pick the highest one from the master.
+Variants with demuxed audio (an AUDIO= rendition group) keep the master
+URL and steer mpv with --hls-bitrate, since the variant playlist alone
+has no sound.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+USER_AGENT = 'Mozilla/5.0 (Smart-IPTV-Player)'
+PLAYLIST_TIMEOUT = 5        # seconds per playlist fetch
+LAUNCH_PLAYLIST_TIMEOUT = 2  # the player is waiting to start mpv
+SEGMENT_TIMEOUT = 10        # seconds per segment download
+SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+
+# What each platform can decode in software (--hwdec=no) without dropping frames
+DECODE_CAPABILITIES = {
+    'pi3': {'max_height': 720, 'max_fps': 30, 'max_bitrate_kbps': 4000,
+            'codecs': ('avc1', 'mp4a')},
+    'pi4': {'max_height': 1080, 'max_fps': 30, 'max_bitrate_kbps': 8000,
+            'codecs': ('avc1', 'mp4a', 'ac-3', 'ec-3')},
+    'pi_zero': {'max_height': 480, 'max_fps': 30, 'max_bitrate_kbps': 1500,
+                'codecs': ('avc1', 'mp4a')},
+    'desktop': {'max_height': 2160, 'max_fps': 60, 'max_bitrate_kbps': None,
+                'codecs': None},
+}
+
+_ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+def detect_decode_profile() -> str:
+    """Map the board model to a DECODE_CAPABILITIES key"""
+    try:
+        with open('/proc/device-tree/model', 'r') as f:
+            model = f.read().strip('\x00\n ').lower()
+    except Exception:
+        return 'desktop'
+
+    if 'raspberry pi' not in model:
+        return 'desktop'
+    if 'raspberry pi 3' in model or 'zero 2' in model:
+        return 'pi3'
+    if any(board in model for board in ('raspberry pi 4', 'raspberry pi 5', 'compute module 4')):
+        return 'pi4'
+    # Zero, Pi 1 and Pi 2 class boards
+    return 'pi_zero'
+
+
+def fetch_playlist(url: str, timeout: float = PLAYLIST_TIMEOUT) -> Tuple[str, str]:
+    """Fetch a playlist, returning (text, final_url after redirects)"""
+    response = requests.get(url, timeout=timeout, headers={'User-Agent': USER_AGENT})
+    response.raise_for_status()
+    return response.text, response.url
+
+
+def _parse_attributes(line: str) -> Dict[str, str]:
+    """Parse an #EXT-X-...:KEY=VALUE,... attribute list"""
+    attributes = {}
+    for key, value in _ATTRIBUTE_RE.findall(line.split(':', 1)[1] if ':' in line else ''):
+        attributes[key] = value.strip('"')
+    return attributes
+
+
+def parse_master_playlist(text: str, base_url: str) -> List[Dict]:
+    """Return the variants of a master playlist ([] for a media playlist)
+
+    A variant with malformed numbers (e.g. RESOLUTION=1280x720p) is skipped.
+    """
+    variants = []
+    pending = None
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if line.startswith('#EXT-X-STREAM-INF'):
+            attributes = _parse_attributes(line)
+            width, height = None, None
+            try:
+                if 'x' in attributes.get('RESOLUTION', ''):
+                    width, height = (int(v) for v in attributes['RESOLUTION'].split('x', 1))
+                bandwidth = attributes.get('AVERAGE-BANDWIDTH') or attributes.get('BANDWIDTH') or 0
+                pending = {
+                    'bandwidth_kbps': int(bandwidth) // 1000,
+                    'peak_bandwidth': int(attributes.get('BANDWIDTH') or bandwidth),
+                    'audio_group': attributes.get('AUDIO'),
+                    'width': width,
+                    'height': height,
+                    'fps': float(attributes['FRAME-RATE']) if 'FRAME-RATE' in attributes else None,
+                    'codecs': attributes.get('CODECS', ''),
+                }
+            except ValueError:
+                pending = None  # Its URI line is then ignored too
+        elif pending is not None and line and not line.startswith('#'):
+            pending['url'] = urllib.parse.urljoin(base_url, line)
+            variants.append(pending)
+            pending = None
+
+    return variants
+
+
+def parse_media_playlist(text: str, base_url: str) -> Dict:
+    """Return segment URLs and header tags of a media playlist"""
+    playlist = {
+        'segments': [],
+        'target_duration': None,
+        'media_sequence': 0,
+        'endlist': False,
+        'playlist_type': None,
+        'init_segment': None,
+    }
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if line.startswith('#EXT-X-TARGETDURATION:'):
+            playlist['target_duration'] = float(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            playlist['media_sequence'] = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-PLAYLIST-TYPE:'):
+            playlist['playlist_type'] = line.split(':', 1)[1].strip().upper()
+        elif line.startswith('#EXT-X-ENDLIST'):
+            playlist['endlist'] = True
+        elif line.startswith('#EXT-X-MAP'):
+            uri = _parse_attributes(line).get('URI')
+            if uri:
+                playlist['init_segment'] = urllib.parse.urljoin(base_url, uri)
+        elif line and not line.startswith('#'):
+            playlist['segments'].append(urllib.parse.urljoin(base_url, line))
+
+    return playlist
+
+
+def variant_is_decodable(variant: Dict, capability: Dict) -> bool:
+    """Check a variant against a DECODE_CAPABILITIES entry"""
+    if variant.get('height') and variant['height'] > capability['max_height']:
+        return False
+    if variant.get('fps') and variant['fps'] > capability['max_fps'] + 0.5:
+        return False
+    max_bitrate = capability.get('max_bitrate_kbps')
+    if max_bitrate and variant.get('bandwidth_kbps', 0) > max_bitrate:
+        return False
+    codecs = capability.get('codecs')
+    if codecs and variant.get('codecs'):
+        for codec in variant['codecs'].split(','):
+            if not codec.strip().lower().startswith(codecs):
+                return False
+    return True
+
+
+def select_variant(variants: List[Dict], capacity_kbps: Optional[float],
+                   capability: Dict, headroom: float = 0.75) -> Optional[Dict]:
+    """Pick the best variant the link and decoder can both sustain.
+
+    Only `headroom` of the measured capacity is budgeted so segment
+    downloads keep ahead of playback on a jittery Wi-Fi link. When nothing
+    fits, the lowest decodable variant is the safest choice.
+    """
+    decodable = [v for v in variants if variant_is_decodable(v, capability)]
+    if not decodable:
+        # Nothing matches the table (e.g. missing CODECS) - fall back to the smallest
+        decodable = sorted(variants, key=lambda v: v.get('bandwidth_kbps', 0))[:1]
+    if not decodable:
+        return None
+
+    if capacity_kbps:
+        sustainable = [v for v in decodable if v['bandwidth_kbps'] <= capacity_kbps * headroom]
+        if sustainable:
+            return max(sustainable, key=lambda v: v['bandwidth_kbps'])
+        return min(decodable, key=lambda v: v['bandwidth_kbps'])
+
+    return max(decodable, key=lambda v: v['bandwidth_kbps'])
+
+
+def variant_play_url(master_url: str, variant: Dict) -> str:
+    """URL to hand mpv for a variant (the master when audio is a separate rendition)"""
+    return master_url if variant.get('audio_group') else variant['url']
+
+
+def variant_mpv_options(variant: Optional[Dict]) -> Dict:
+    """mpv options that make it pick `variant` from the master playlist"""
+    if variant and variant.get('audio_group'):
+        # mpv plays the highest variant at or below this rate, with its audio group
+        return {'hls-bitrate': str(variant['peak_bandwidth'])}
+    return {}
+
+
+class LinkCapacityEstimator:
+    """Estimate sustainable download throughput from segment downloads.
+
+    Samples come from the analyzer, from background probes started at
+    launch and from mpv's read rate during playback, and are persisted so
+    all of them share one view of the link.
+    """
+
+    def __init__(self, state_file='link_capacity.json', max_samples=20, max_age_hours=6):
+        self.state_file = state_file
+        self.max_samples = max_samples
+        self.max_age = max_age_hours * 3600
+        self.samples = []
+        self.lock = threading.Lock()
+        self.probe_thread = None
+        self.load()
+
+    def load(self):
+        """Load persisted samples"""
+        try:
+            if os.path.exists(self.state_file):
+                with open(self.state_file, 'r') as f:
+                    self.samples = json.load(f).get('samples', [])
+        except Exception:
+            self.samples = []
+
+    def save(self):
+        """Persist samples atomically"""
+        try:
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({'samples': self.samples}, f)
+            os.replace(tmp_file, self.state_file)
+        except OSError:
+            pass  # Read-only filesystem - estimates stay in memory
+
+    def add_sample(self, num_bytes: int, seconds: float, source: str = 'probe'):
+        """Record one download of num_bytes that took seconds"""
+        if num_bytes <= 0 or seconds <= 0:
+            return
+        with self.lock:
+            self.samples.append({
+                'time': time.time(),
+                'kbps': round(num_bytes * 8 / 1000 / seconds, 1),
+                'source': source,
+            })
+            self.samples = self.samples[-self.max_samples:]
+            self.save()
+
+    def estimate_kbps(self) -> Optional[float]:
+        """Conservative capacity: lower quartile of recent samples"""
+        cutoff = time.time() - self.max_age
+        recent = sorted(s['kbps'] for s in self.samples if s['time'] >= cutoff)
+        if not recent:
+            return None
+        return recent[len(recent) // 4]
+
+    def is_fresh(self, max_age_seconds: float = 1800) -> bool:
+        """True if a sample was taken within max_age_seconds"""
+        return any(s['time'] >= time.time() - max_age_seconds for s in self.samples)
+
+    def measure_segment(self, segment_url: str, source: str = 'probe') -> Optional[float]:
+        """Download one segment and record its throughput (kbps)"""
+        try:
+            start = time.time()
+            received = 0
+            with requests.get(segment_url, timeout=SEGMENT_TIMEOUT, stream=True,
+                              headers={'User-Agent': USER_AGENT}) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    received += len(chunk)
+                    if received >= SEGMENT_MAX_BYTES:
+                        break
+            elapsed = time.time() - start
+            self.add_sample(received, elapsed, source)
+            return received * 8 / 1000 / elapsed if elapsed > 0 else None
+        except Exception:
+            return None
+
+    def probe_variants(self, variants: List[Dict], source: str = 'probe') -> Optional[float]:
+        """Measure throughput with a segment from a mid-range variant"""
+        if not variants:
+            return None
+        ordered = sorted(variants, key=lambda v: v['bandwidth_kbps'])
+        variant = ordered[len(ordered) // 2]
+        try:
+            text, final_url = fetch_playlist(variant['url'])
+            segments = parse_media_playlist(text, final_url)['segments']
+        except Exception:
+            return None
+        if not segments:
+            return None
+        # The newest segment is the one a live player would fetch next
+        return self.measure_segment(segments[-1], source)
+
+    def probe_in_background(self, variants: List[Dict], source: str = 'probe') -> bool:
+        """Run probe_variants on a daemon thread (one at a time); False if one is running"""
+        if self.probe_thread and self.probe_thread.is_alive():
+            return False
+        self.probe_thread = threading.Thread(target=self.probe_variants, args=(variants, source),
+                                             name='link-probe', daemon=True)
+        self.probe_thread.start()
+        return True
+
+
+def choose_variant_url(url: str, estimator: LinkCapacityEstimator,
+                       profile: Optional[str] = None,
+                       timeout: float = LAUNCH_PLAYLIST_TIMEOUT) -> Tuple[str, Optional[Dict]]:
+    """Resolve a master playlist URL to the best sustainable variant URL.
+
+    Returns (url_to_play, variant); pass the variant to variant_mpv_options
+    for the options that go with the URL. Only the master is fetched here -
+    a stale link estimate is refreshed by a background probe for the next
+    launch. Media playlists and failures return the original URL so
+    playback never depends on this step.
+    """
+    try:
+        text, final_url = fetch_playlist(url, timeout)
+        variants = parse_master_playlist(text, final_url)
+    except Exception:
+        return url, None
+
+    if len(variants) < 2:
+        return url, None
+
+    if not estimator.is_fresh():
+        estimator.probe_in_background(variants, source='player')
+
+    capability = DECODE_CAPABILITIES[profile or detect_decode_profile()]
+    variant = select_variant(variants, estimator.estimate_kbps(), capability)
+    if not variant:
+        return url, None
+    return variant_play_url(url, variant), variant
+
+
+def choose_lower_variant(url: str, current: Dict, profile: Optional[str] = None,
+                         step: float = 0.7, timeout: float = LAUNCH_PLAYLIST_TIMEOUT) -> Optional[Dict]:
+    """Best decodable variant of the master at `url` using at most `step` of
+    the current variant's bandwidth, or None if there is nothing lower.
+    """
+    try:
+        text, final_url = fetch_playlist(url, timeout)
+        variants = parse_master_playlist(text, final_url)
+    except Exception:
+        return None
+
+    capability = DECODE_CAPABILITIES[profile or detect_decode_profile()]
+    lower = [v for v in variants
+             if v['bandwidth_kbps'] <= current['bandwidth_kbps'] * step
+             and variant_is_decodable(v, capability)]
+    if not lower:
+        return None
+    return max(lower, key=lambda v: v['bandwidth_kbps'])
+
+
+def inspect_hls_type(url: str, confirm_movement: bool = False) -> Dict:
+    """Classify an HLS stream as live or VOD from its media playlist.
+
+    #EXT-X-ENDLIST or PLAYLIST-TYPE:VOD means VOD; PLAYLIST-TYPE:EVENT or
+    a missing end tag means live. With confirm_movement the playlist is
+    fetched again after one target duration: a playlist that neither
+    advances its media sequence nor grows is a VOD missing its end tag.
+    """
+    text, final_url = fetch_playlist(url)
+    variants = parse_master_playlist(text, final_url)
+    if variants:
+        # Any variant carries the same tags - the smallest is cheapest to fetch
+        variant = min(variants, key=lambda v: v['bandwidth_kbps'])
+        text, final_url = fetch_playlist(variant['url'])
+
+    playlist = parse_media_playlist(text, final_url)
+    result = {
+        'type': 'live',
+        'playlist_type': playlist['playlist_type'],
+        'target_duration': playlist['target_duration'],
+        'media_sequence': playlist['media_sequence'],
+        'checked_at': time.time(),
+    }
+
+    if playlist['endlist'] or playlist['playlist_type'] == 'VOD':
+        result['type'] = 'vod'
+    elif confirm_movement and playlist['playlist_type'] != 'EVENT':
+        time.sleep(min(playlist['target_duration'] or 6, 10))
+        again = parse_media_playlist(fetch_playlist(final_url)[0], final_url)
+        moved = (again['media_sequence'] != playlist['media_sequence']
+                 or len(again['segments']) != len(playlist['segments']))
+        result['sequence_moved'] = moved
+        if not moved:
+            result['type'] = 'vod'
+
+    return result
+
+
+class HLSTypeCache:
+    """Per-stream live/VOD classification persisted with a TTL.
+
+    Lookups never fetch on the caller's thread: a miss returns None (the
+    caller falls back to its URL guess) and the playlist is classified on
+    a background thread for the next launch. A playlist with neither
+    ENDLIST nor PLAYLIST-TYPE is then re-checked for media-sequence
+    movement on that thread, so a VOD missing its end tag is caught too.
+    """
+
+    def __init__(self, cache_file='hls_type_cache.json', ttl_hours=12):
+        self.cache_file = cache_file
+        self.ttl = ttl_hours * 3600
+        self.entries = {}
+        self.loaded = False
+        self.inspecting = set()
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Read persisted entries; entries already in memory win"""
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r') as f:
+                    stored = json.load(f)
+                with self.lock:
+                    stored.update(self.entries)
+                    self.entries = stored
+        except Exception:
+            pass
+        self.loaded = True
+
+    def save(self):
+        """Persist entries atomically, dropping expired ones"""
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            self.entries = {url: e for url, e in self.entries.items() if e['checked_at'] >= cutoff}
+            entries = dict(self.entries)
+        try:
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            pass  # Read-only filesystem - cache stays in memory
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Cached classification, or None if missing or expired"""
+        if not self.loaded:
+            self.load()  # Cleared under memory pressure - the file still has everything
+        entry = self.entries.get(url)
+        if entry and time.time() - entry['checked_at'] < self.ttl:
+            return entry
+        return None
+
+    def get_type(self, url: str, confirm_movement: bool = True) -> Optional[str]:
+        """'live' or 'vod' if cached; a miss returns None and classifies in the background"""
+        entry = self.get(url)
+        if entry is None:
+            self._inspect_in_background(url, confirm_movement)
+            return None
+        return entry['type']
+
+    def _store(self, url: str, entry: Dict):
+        with self.lock:
+            self.entries[url] = entry
+        self.save()
+
+    def _inspect_in_background(self, url: str, confirm_movement: bool):
+        """Classify a playlist, then re-check an untagged live one for movement"""
+        with self.lock:
+            if url in self.inspecting:
+                return
+            self.inspecting.add(url)
+
+        def inspect():
+            try:
+                entry = inspect_hls_type(url)
+                self._store(url, entry)
+                if confirm_movement and entry['type'] == 'live' and not entry['playlist_type']:
+                    self._store(url, inspect_hls_type(url, confirm_movement=True))
+            except Exception:
+                pass  # Unreachable now - the next launch tries again
+            finally:
+                with self.lock:
+                    self.inspecting.discard(url)
+
+        threading.Thread(target=inspect, name='hls-type-inspect', daemon=True).start()
+
+    def clear(self):
+        """Drop in-memory entries; the file is reloaded lazily on the next lookup"""
+        with self.lock:
+            self.entries = {}
+        self.loaded = False
+
+
+def main():
+    """Show the variant the player would choose for a URL"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='HLS variant selection check')
+    parser.add_argument('url', help='Master playlist URL')
+    parser.add_argument('--profile', choices=sorted(DECODE_CAPABILITIES),
+                        help='Decode profile (default: detect from hardware)')
+    parser.add_argument('--state-file', default='link_capacity.json',
+                        help='Link capacity state file (default: link_capacity.json)')
+    args = parser.parse_args()
+
+    estimator = LinkCapacityEstimator(args.state_file)
+    profile = args.profile or detect_decode_profile()
+    play_url, variant = choose_variant_url(args.url, estimator, profile, PLAYLIST_TIMEOUT)
+
+    print(f"Decode profile: {profile} {DECODE_CAPABILITIES[profile]}")
+    print(f"Link capacity:  {estimator.estimate_kbps()} kbps")
+    if variant:
+        print(f"Variant:        {variant['bandwidth_kbps']} kbps "
+              f"{variant['width']}x{variant['height']} {variant['codecs']}")
+    print(f"Play URL:       {play_url} {variant_mpv_options(variant) or ''}")
+
+
+if __name__ == "__main__":
+    main()
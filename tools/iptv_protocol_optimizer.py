@@ -1,53 +1,136 @@
 #!/usr/bin/env python3
 """
 IPTV Protocol Detection and Optimization Engine
-Automatically detects stream protocol and applies optimal VLC configurations
+Automatically detects stream protocol and builds the matching mpv option profile
 """
 
+import functools
+import random
 import re
-import urllib.parse
-from typing import Dict, List
+import time
+from typing import Dict, List, Optional
+
+# Options shared by every profile (the tested "Variant 14" base for Pi 3)
+BASE_MPV_OPTIONS = {
+    'hwdec': 'no',
+    'vo': 'gpu',
+    'cache': 'yes',
+    'framedrop': 'vo',
+    'no-osc': None,
+    'no-input-default-bindings': None,
+    'really-quiet': None,
+    'fullscreen': None,
+    'loop-playlist': 'inf',
+    'user-agent': 'Mozilla/5.0 (Smart-IPTV-Player)',
+    'network-timeout': '15',                    # Timeout after 15s of no data
+    'demuxer-lavf-o': 'timeout=10000000',       # 10 second timeout for initial connection
+}
+
+# --stream-lavf-o is a key/value list: repeating the option replaces the
+# whole list, so all reconnect settings must go in a single assignment
+HTTP_RECONNECT = 'reconnect=1,reconnect_delay_max=5'
+HTTP_RECONNECT_STREAMED = 'reconnect=1,reconnect_streamed=1,reconnect_delay_max=5'
+
+# URL patterns per protocol, in priority order (first protocol to match wins)
+PROTOCOL_PATTERNS = {
+    'hls': [
+        r'\.m3u8',                    # HLS manifest files
+        r'/hls/',                     # HLS path indicator
+        r'master\.m3u8',              # Master playlist
+        r'playlist\.m3u8',            # Media playlist
+        r'index\.m3u8',               # Index playlist
+    ],
+    'dash': [
+        r'\.mpd',                     # DASH manifest
+        r'/dash/',                    # DASH path indicator
+        r'manifest\.mpd',             # DASH manifest
+    ],
+    'rtmp': [
+        r'^rtmp://',                  # RTMP protocol
+        r'^rtmps://',                 # RTMP secure
+        r'^rtmpe://',                 # RTMP encrypted
+    ],
+    'rtsp': [
+        r'^rtsp://',                  # RTSP protocol
+        r'^rtsps://',                 # RTSP secure
+    ],
+    'udp': [
+        r'^udp://',                   # UDP multicast
+        r'@\d+\.\d+\.\d+\.\d+:\d+',  # Multicast address pattern
+    ],
+    'http_ts': [
+        r'\.ts$',                     # Transport Stream
+        r'\.ts\?',                    # Transport Stream with params
+        r'/mpegts/',                  # MPEG-TS path
+    ],
+    'http_progressive': [
+        r'\.mp4',                     # MP4 progressive
+        r'\.mkv',                     # MKV progressive
+        r'\.avi',                     # AVI progressive
+        r'\.mov',                     # MOV progressive
+    ]
+}
+
+# Schemes that identify the protocol on their own - no pattern scan needed
+SCHEME_PROTOCOLS = {
+    'rtmp': 'rtmp', 'rtmps': 'rtmp', 'rtmpe': 'rtmp',
+    'rtsp': 'rtsp', 'rtsps': 'rtsp',
+    'udp': 'udp',
+}
+
+CLASSIFIER_CACHE_SIZE = 4096
+
+
+def _compile_classifier(patterns: Dict[str, List[str]]):
+    """Compile each protocol's patterns into one alternation, in priority order.
+
+    Scheme-anchored patterns are left out - SCHEME_PROTOCOLS answers those
+    before any scan. Keeping one alternation per protocol (rather than a
+    single alternation of named groups) lets the regex engine use its
+    literal-prefix scan, which benchmarked about twice as fast.
+    """
+    classifier = []
+    for protocol, regexes in patterns.items():
+        unanchored = [r for r in regexes if not r.startswith('^')]
+        if unanchored:
+            classifier.append((protocol, re.compile('|'.join(unanchored))))
+    return classifier
+
+
+_CLASSIFIER = _compile_classifier(PROTOCOL_PATTERNS)
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL for classification (case and fragment don't matter)"""
+    return url.strip().lower().split('#', 1)[0]
+
+
+@functools.lru_cache(maxsize=CLASSIFIER_CACHE_SIZE)
+def classify_url(canonical: str) -> str:
+    """Classify a canonical URL (memoized)"""
+    scheme = canonical.split('://', 1)[0] if '://' in canonical else ''
+    if scheme in SCHEME_PROTOCOLS:
+        return SCHEME_PROTOCOLS[scheme]
+
+    for protocol, pattern in _CLASSIFIER:
+        if pattern.search(canonical):
+            return protocol
+
+    if scheme in ('http', 'https'):
+        return 'http_progressive'  # Default HTTP fallback
+    return 'unknown'
+
+
+def clear_classifier_cache():
+    """Drop memoized classifications (e.g. under memory pressure)"""
+    classify_url.cache_clear()
+
 
 class IPTVProtocolOptimizer:
-    def __init__(self):
-        self.protocol_patterns = {
-            'hls': [
-                r'\.m3u8',                    # HLS manifest files
-                r'/hls/',                     # HLS path indicator
-                r'master\.m3u8',              # Master playlist
-                r'playlist\.m3u8',            # Media playlist
-                r'index\.m3u8',               # Index playlist
-            ],
-            'dash': [
-                r'\.mpd',                     # DASH manifest
-                r'/dash/',                    # DASH path indicator
-                r'manifest\.mpd',             # DASH manifest
-            ],
-            'rtmp': [
-                r'^rtmp://',                  # RTMP protocol
-                r'^rtmps://',                 # RTMP secure
-                r'^rtmpe://',                 # RTMP encrypted
-            ],
-            'rtsp': [
-                r'^rtsp://',                  # RTSP protocol
-                r'^rtsps://',                 # RTSP secure
-            ],
-            'udp': [
-                r'^udp://',                   # UDP multicast
-                r'@\d+\.\d+\.\d+\.\d+:\d+',  # Multicast address pattern
-            ],
-            'http_ts': [
-                r'\.ts$',                     # Transport Stream
-                r'\.ts\?',                    # Transport Stream with params
-                r'/mpegts/',                  # MPEG-TS path
-            ],
-            'http_progressive': [
-                r'\.mp4',                     # MP4 progressive
-                r'\.mkv',                     # MKV progressive
-                r'\.avi',                     # AVI progressive
-                r'\.mov',                     # MOV progressive
-            ]
-        }
+    def __init__(self, hls_type_cache=None):
+        self.protocol_patterns = PROTOCOL_PATTERNS
+        # Optional hls_playlist.HLSTypeCache - live/VOD from the playlist itself
+        self.hls_type_cache = hls_type_cache
         
         # Protocol-specific optimizations
         self.protocol_optimizations = {
@@ -62,184 +145,142 @@ class IPTVProtocolOptimizer:
     
     def detect_protocol(self, url: str) -> str:
         """Detect the streaming protocol from URL"""
-        url_lower = url.lower()
-        
-        # Check each protocol pattern
-        for protocol, patterns in self.protocol_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, url_lower):
-                    return protocol
-        
-        # Fallback based on URL scheme
-        parsed = urllib.parse.urlparse(url)
-        if parsed.scheme in ['rtmp', 'rtmps', 'rtmpe']:
-            return 'rtmp'
-        elif parsed.scheme in ['rtsp', 'rtsps']:
-            return 'rtsp'
-        elif parsed.scheme == 'udp':
-            return 'udp'
-        elif parsed.scheme in ['http', 'https']:
-            return 'http_progressive'  # Default HTTP fallback
-        
-        return 'unknown'
+        return classify_url(canonical_url(url))
     
-    def get_optimized_vlc_args(self, url: str, vlc_version_info: Dict) -> List[str]:
-        """Get optimized VLC arguments for the detected protocol"""
+    def get_mpv_options(self, url: str) -> Dict[str, Optional[str]]:
+        """Get the mpv option profile for the detected protocol.
+
+        Returns an ordered {option: value} dict (value None for bare flags)
+        so callers can override individual options before building the
+        command line.
+        """
         protocol = self.detect_protocol(url)
+        options = dict(BASE_MPV_OPTIONS)
         
         if protocol in self.protocol_optimizations:
-            return self.protocol_optimizations[protocol](url, vlc_version_info)
+            options.update(self.protocol_optimizations[protocol](url))
         else:
-            return self._get_fallback_optimizations(url, vlc_version_info)
+            options.update(self._get_fallback_optimizations(url))
+        
+        return options
     
-    def _get_hls_optimizations(self, url: str, vlc_version_info: Dict) -> List[str]:
-        """Ultra-optimized HLS configuration with adaptive profiles"""
-        args = []
+    def get_profile_name(self, url: str) -> str:
+        """Human-readable profile name, e.g. 'hls/live'"""
+        protocol = self.detect_protocol(url)
+        if protocol == 'hls':
+            return f"hls/{self._detect_hls_type(url)}"
+        return protocol
+    
+    def build_mpv_command(self, url: str, options: Optional[Dict[str, Optional[str]]] = None,
+                          player: str = 'mpv') -> List[str]:
+        """Render an option profile into an mpv command line"""
+        if options is None:
+            options = self.get_mpv_options(url)
         
-        # Detect HLS type for optimal configuration
+        cmd = [player]
+        for option, value in options.items():
+            cmd.append(f'--{option}' if value is None else f'--{option}={value}')
+        cmd.append(url)
+        return cmd
+    
+    def _get_hls_optimizations(self, url: str) -> Dict[str, Optional[str]]:
+        """HLS profile - tight live-edge buffer for live, deep readahead for VOD"""
         hls_type = self._detect_hls_type(url)
         
-        if hls_type == 'live':
-            # Balanced low latency for live HLS streams (like Pluto TV)
-            args.extend([
-                '--network-caching=800',      # Balanced HLS caching for smooth playback
-                '--live-caching=200',         # Enough buffering to prevent stutters
-                '--file-caching=200',         # Smooth file segment loading
-            ])
-        elif hls_type == 'vod':
-            # Optimized for VOD HLS
-            args.extend([
-                '--network-caching=1000',
-                '--live-caching=300',
-                '--file-caching=300',
-            ])
-        else:
-            # Default HLS optimizations
-            args.extend([
-                '--network-caching=600',      
-                '--live-caching=150',          
-                '--file-caching=150',         # Increased for smoother playback
-            ])
-        
-        # Version-specific HLS enhancements
-        if vlc_version_info.get('major', 0) >= 3:
-            args.extend([
-                '--adaptive-logic=2',         # Aggressive adaptive bitrate
-                '--adaptive-bw-up=0.8',       # Quick bitrate increases
-                '--adaptive-bw-down=0.2',     # Quick bitrate decreases
-                '--hls-segment-threads=4',    # Parallel segment loading
-                '--network-timeout=3000',     # Fast timeout (3s)
-                '--http-timeout=5000',        # HTTP timeout (5s)
-                '--no-audio-time-stretch',    # Prevent audio lag
-            ])
-        
-        # Advanced HLS optimizations for modern VLC
-        if vlc_version_info.get('supports_advanced_caching', False):
-            args.extend([
-                '--clock-jitter=0',           # Eliminate clock jitter
-                '--clock-synchro=0',          # Disable sync delays
-                '--avcodec-skip-frame=0',     # Don't skip frames
-                '--avcodec-skip-idct=0',      # Don't skip IDCT
-            ])
-        
-        # Performance tweaks (less aggressive for smooth playback)
-        if vlc_version_info.get('major', 0) >= 3:
-            args.extend([
-                '--avcodec-threads=0',        # Auto CPU threads
-                # Removed aggressive frame dropping for smoother playback
-            ])
+        if hls_type == 'vod':
+            # Segments are all available - read far ahead, allow seeking back
+            return {
+                'cache-secs': '30',
+                'demuxer-max-bytes': '40M',
+                'demuxer-max-back-bytes': '10M',
+                'demuxer-readahead-secs': '30',
+                'stream-lavf-o': HTTP_RECONNECT,
+            }
         
-        return args
+        # Live (like Pluto TV) - Variant 14: 3s cache, 25M buffer, 3s readahead
+        return {
+            'cache-secs': '3',
+            'demuxer-max-bytes': '25M',
+            'demuxer-max-back-bytes': '5M',   # Live TV never seeks back
+            'demuxer-readahead-secs': '3',
+            'stream-lavf-o': HTTP_RECONNECT_STREAMED,
+        }
     
-    def _get_dash_optimizations(self, url: str, vlc_version_info: Dict) -> List[str]:
-        """DASH-specific optimizations"""
-        args = [
-            '--network-caching=300',
-            '--live-caching=100',
-            '--file-caching=100',
-        ]
-        
-        if vlc_version_info.get('major', 0) >= 3:
-            args.extend([
-                '--adaptive-logic=1',         # Conservative adaptive bitrate
-                '--dash-segment-threads=4',   # Parallel segment loading
-                '--network-timeout=5000',
-                '--http-timeout=8000',
-            ])
-        
-        return args
+    def _get_dash_optimizations(self, url: str) -> Dict[str, Optional[str]]:
+        """DASH profile - same live-edge buffering as live HLS"""
+        return {
+            'cache-secs': '3',
+            'demuxer-max-bytes': '25M',
+            'demuxer-max-back-bytes': '5M',
+            'demuxer-readahead-secs': '3',
+            'stream-lavf-o': HTTP_RECONNECT_STREAMED,
+        }
     
-    def _get_rtmp_optimizations(self, url: str, vlc_version_info: Dict) -> List[str]:
-        """RTMP-specific optimizations"""
-        args = [
-            '--network-caching=800',      # Higher caching for RTMP
-            '--rtmp-caching=500',         # RTMP-specific caching
-            '--no-audio-time-stretch',
-        ]
-        
-        if vlc_version_info.get('major', 0) >= 3:
-            args.extend([
-                '--rtmp-connect-timeout=10000',
-                '--rtmp-seek-threshold=1000',
-            ])
-        
-        return args
+    def _get_rtmp_optimizations(self, url: str) -> Dict[str, Optional[str]]:
+        """RTMP profile - single continuous connection, small buffer"""
+        return {
+            'cache-secs': '2',
+            'demuxer-max-bytes': '16M',
+            'demuxer-max-back-bytes': '2M',
+            'demuxer-readahead-secs': '2',
+        }
     
-    def _get_rtsp_optimizations(self, url: str, vlc_version_info: Dict) -> List[str]:
-        """RTSP-specific optimizations"""
-        args = [
-            '--network-caching=600',
-            '--rtsp-caching=400',
-            '--rtsp-tcp',                 # Use TCP for reliability
-            '--no-audio-time-stretch',
-        ]
-        
-        if vlc_version_info.get('major', 0) >= 3:
-            args.extend([
-                '--rtsp-timeout=10000',
-                '--rtsp-frame-buffer-size=50000',
-            ])
-        
-        return args
+    def _get_rtsp_optimizations(self, url: str) -> Dict[str, Optional[str]]:
+        """RTSP profile - TCP interleaved for reliability, minimal buffer"""
+        return {
+            'rtsp-transport': 'tcp',
+            'cache-secs': '1',
+            'demuxer-max-bytes': '8M',
+            'demuxer-max-back-bytes': '1M',
+            'demuxer-readahead-secs': '1',
+        }
     
-    def _get_udp_optimizations(self, url: str, vlc_version_info: Dict) -> List[str]:
-        """UDP multicast optimizations"""
-        return [
-            '--network-caching=200',      # Low latency for live UDP
-            '--udp-caching=100',
-            '--live-caching=50',
-            '--ts-es-id-pid',             # Elementary stream ID
-            '--no-audio-time-stretch',
-        ]
+    def _get_udp_optimizations(self, url: str) -> Dict[str, Optional[str]]:
+        """UDP multicast profile - lowest latency, tolerate socket overruns"""
+        return {
+            'cache-secs': '1',
+            'demuxer-max-bytes': '8M',
+            'demuxer-max-back-bytes': '1M',
+            'demuxer-readahead-secs': '1',
+            'stream-lavf-o': 'overrun_nonfatal=1,fifo_size=278876',
+        }
     
-    def _get_http_ts_optimizations(self, url: str, vlc_version_info: Dict) -> List[str]:
-        """HTTP Transport Stream optimizations"""
-        return [
-            '--network-caching=400',
-            '--ts-es-id-pid',
-            '--no-audio-time-stretch',
-            '--avcodec-fast',
-        ]
+    def _get_http_ts_optimizations(self, url: str) -> Dict[str, Optional[str]]:
+        """HTTP Transport Stream profile - continuous live TS"""
+        return {
+            'cache-secs': '3',
+            'demuxer-max-bytes': '16M',
+            'demuxer-max-back-bytes': '2M',
+            'demuxer-readahead-secs': '3',
+            'stream-lavf-o': HTTP_RECONNECT_STREAMED,
+        }
     
-    def _get_progressive_optimizations(self, url: str, vlc_version_info: Dict) -> List[str]:
-        """HTTP Progressive download optimizations"""
-        return [
-            '--network-caching=1000',     # Higher for progressive
-            '--file-caching=500',
-            '--http-continuous',          # Continuous HTTP
-            '--no-audio-time-stretch',
-        ]
+    def _get_progressive_optimizations(self, url: str) -> Dict[str, Optional[str]]:
+        """HTTP progressive (VOD file) profile - big readahead, seekable reconnects"""
+        return {
+            'cache-secs': '60',
+            'demuxer-max-bytes': '40M',
+            'demuxer-max-back-bytes': '10M',
+            'demuxer-readahead-secs': '60',
+            'stream-lavf-o': HTTP_RECONNECT,
+        }
     
-    def _get_fallback_optimizations(self, url: str, vlc_version_info: Dict) -> List[str]:
-        """Safe fallback optimizations for unknown protocols"""
-        return [
-            '--network-caching=1000',
-            '--no-audio-time-stretch',
-            '--quiet',
-        ]
+    def _get_fallback_optimizations(self, url: str) -> Dict[str, Optional[str]]:
+        """Safe fallback for unknown protocols - Variant 14 buffering"""
+        return {
+            'cache-secs': '3',
+            'demuxer-max-bytes': '25M',
+            'demuxer-readahead-secs': '3',
+        }
     
     def _detect_hls_type(self, url: str) -> str:
         """Detect if HLS stream is live or VOD"""
+        # Playlist inspection (#EXT-X-ENDLIST, PLAYLIST-TYPE) beats URL guessing
+        if self.hls_type_cache is not None:
+            hls_type = self.hls_type_cache.get_type(url)
+            if hls_type:
+                return hls_type
+        
         url_lower = url.lower()
         
         # Live stream indicators
@@ -331,8 +372,99 @@ class IPTVProtocolOptimizer:
             'adaptive': False,
         })
 
+def _detect_protocol_reference(url: str) -> str:
+    """Original per-pattern re.search loop, kept as the benchmark baseline"""
+    url_lower = url.lower()
+    for protocol, patterns in PROTOCOL_PATTERNS.items():
+        for pattern in patterns:
+            if re.search(pattern, url_lower):
+                return protocol
+    scheme = url_lower.split('://', 1)[0] if '://' in url_lower else ''
+    if scheme in SCHEME_PROTOCOLS:
+        return SCHEME_PROTOCOLS[scheme]
+    if scheme in ('http', 'https'):
+        return 'http_progressive'
+    return 'unknown'
+
+
+def generate_synthetic_urls(count: int, seed: int = 42) -> List[str]:
+    """Build a synthetic catalog of IPTV-like URLs"""
+    rng = random.Random(seed)
+    hosts = ['cfd-v4-service-channel-stitcher-use1-1.prd.pluto.tv', 'clshls.wns.live',
+             'commondatastorage.googleapis.com', 'd1abcdef.cloudfront.net', 'iptv.example.org']
+    templates = [
+        'http://{host}/stitch/hls/channel/{id}/master.m3u8?appName=web&deviceId={id}&sid={sid}',
+        'https://{host}/live/{id}/playlist.m3u8',
+        'https://{host}/dash/{id}/manifest.mpd',
+        'http://{host}/mpegts/{id}.ts?token={sid}',
+        'http://{host}/vod/{id}/movie.mp4',
+        'rtmp://{host}/live/{id}',
+        'rtsp://{host}:554/{id}',
+        'udp://@239.1.{a}.{b}:1234',
+        'http://{host}/stream/{id}',
+    ]
+    urls = []
+    for i in range(count):
+        urls.append(rng.choice(templates).format(
+            host=rng.choice(hosts), id=f"{rng.getrandbits(48):012x}",
+            sid=f"{rng.getrandbits(64):016x}", a=i % 256, b=(i // 256) % 256))
+    return urls
+
+
+def benchmark_classifier(count: int = 100000, passes: int = 3) -> Dict[str, float]:
+    """Time the reference loop against the compiled, memoized classifier.
+
+    The first compiled pass starts with an empty cache (ingest); later
+    passes re-classify the same catalog (scan and ranking). Memoization
+    only pays off for the last CLASSIFIER_CACHE_SIZE URLs, so large
+    catalogs mostly measure the single-pass regex.
+    """
+    urls = generate_synthetic_urls(count)
+
+    start = time.perf_counter()
+    reference = [_detect_protocol_reference(url) for url in urls]
+    reference_time = time.perf_counter() - start
+
+    clear_classifier_cache()
+    optimizer = IPTVProtocolOptimizer()
+    compiled_times = []
+    for _ in range(passes):
+        start = time.perf_counter()
+        compiled = [optimizer.detect_protocol(url) for url in urls]
+        compiled_times.append(time.perf_counter() - start)
+
+    mismatches = sum(1 for a, b in zip(reference, compiled) if a != b)
+    return {
+        'urls': count,
+        'reference_s': round(reference_time, 4),
+        'compiled_cold_s': round(compiled_times[0], 4),
+        'compiled_warm_s': round(min(compiled_times[1:] or compiled_times), 4),
+        'speedup_cold': round(reference_time / compiled_times[0], 2),
+        'speedup_warm': round(reference_time / max(min(compiled_times[1:] or compiled_times), 1e-9), 2),
+        'mismatches': mismatches,
+    }
+
+
 def main():
     """Test the protocol optimizer"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='IPTV protocol detection and mpv profiles')
+    parser.add_argument('--benchmark', type=int, metavar='URLS',
+                       help='Benchmark the classifier over a synthetic catalog of URLS entries')
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        results = benchmark_classifier(args.benchmark)
+        print(f"Classified {results['urls']} synthetic URLs")
+        print(f"   Reference loop:     {results['reference_s']:.3f}s")
+        print(f"   Compiled (cold):    {results['compiled_cold_s']:.3f}s "
+              f"({results['speedup_cold']}x faster)")
+        print(f"   Compiled (warm):    {results['compiled_warm_s']:.3f}s "
+              f"({results['speedup_warm']}x faster)")
+        print(f"   Mismatches:         {results['mismatches']}")
+        return
+    
     optimizer = IPTVProtocolOptimizer()
     
     # Test URLs for different protocols
@@ -349,9 +481,13 @@ def main():
     for url in test_urls:
         protocol = optimizer.detect_protocol(url)
         info = optimizer.get_protocol_info(url)
+        options = optimizer.get_mpv_options(url)
         print(f"URL: {url}")
         print(f"Protocol: {protocol} - {info['name']}")
         print(f"Latency: {info['latency']}")
+        print(f"mpv: cache-secs={options.get('cache-secs')} "
+              f"demuxer-max-bytes={options.get('demuxer-max-bytes')} "
+              f"readahead={options.get('demuxer-readahead-secs')}s")
         print("---")
 
 if __name__ == "__main__":
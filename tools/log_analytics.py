@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Log Analytics for GrannyTV
+Rebuilds playback history from the player and service logs
+
+Streams iptv_player_mpv.log and iptv_service.log (plus rotated and
+.gz copies) a line at a time through one compiled pattern, so months of
+logs take seconds and almost no memory. Lines that aren't events are
+rejected right after the timestamp. From the events it rebuilds playback
+sessions, restarts and health-check failures. It reports per-stream
+uptime, MTBF/MTTR and an hour-of-week heatmap of stalls. Use --since and
+--until to zoom in on "it froze at 8pm".
+"""
+
+import glob
+import gzip
+import json
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional
+
+PLAYER_LOG = 'iptv_player_mpv.log'
+SERVICE_LOG = 'iptv_service.log'
+
+# Session endings that count as failures for MTBF/MTTR
+FAILURE_REASONS = ('crashed', 'stalled', 'memory', 'killed')
+SESSION_REASON_WINDOW = 5  # Seconds a [TUNING] line may trail the marker that ended its session
+
+# (event, pattern) - matched against the message right after the timestamp/level prefix
+EVENTS = (
+    ('start', r'\[START\] === MPV IPTV PLAYER STARTING'),
+    ('stop', r'\[STOP\] Shutting down'),
+    ('playing', r'PLAYING: (?P<stream>.*)'),
+    ('stable', r'\[OK\] SUCCESS! MPV'),
+    ('heartbeat', r'\[TV\] Status: Playing'),
+    ('exited', r'\[WARNING\] Player ended \(exit code: (?P<exit_code>-?\d+)\)'),
+    ('health_failed', r'\[HEALTH\] Playback health check failed'),
+    ('stalled', r'\[HEALTH\] Multiple consecutive health check failures'),
+    ('memory', r'\[MEMORY\] Critical memory pressure'),
+    ('restart', r'\[RESTART\] (?!Stopping)(?P<restart_reason>.*)'),
+    ('buffering', r'\[CACHE\] Buffering started'),
+    ('launch_failed', r'\[FAIL\] Failed: (?P<failed_stream>.*)'),
+    ('session', r'\[TUNING\] Session (?P<session_reason>\w+):'),
+)
+EVENT_RE = re.compile(
+    r'(\d{4}-\d\d-\d\d) (\d\d):(\d\d):(\d\d),(\d{3}) - \w+ - (?:'
+    + '|'.join(f'(?P<{name}>{pattern})' for name, pattern in EVENTS) + ')')
+TRACEBACK_RE = re.compile(r'Traceback \(most recent call last\)')
+TIMESTAMPED_RE = re.compile(r'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3} - ')
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+HEAT_CHARS = ' .:-=+*#%@'
+
+
+def open_log(path: str):
+    """Open a plain or gzipped log as text"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def rotated_copies(path: str) -> List[str]:
+    """A log and its rotated/backup copies, oldest first"""
+    # logrotate and gzip keep mtimes, so they order copies however they were named
+    paths = sorted((p for p in glob.glob(glob.escape(path) + '.*') if not p.endswith('.tmp')),
+                   key=os.path.getmtime)
+    if os.path.exists(path):
+        paths.append(path)
+    return paths
+
+
+def discover_logs(paths: List[str]) -> Dict[str, List[str]]:
+    """Expand files/directories into {'player': [...], 'service': [...]}"""
+    found = {'player': [], 'service': []}
+    for path in paths:
+        if os.path.isdir(path):
+            found['player'] += rotated_copies(os.path.join(path, PLAYER_LOG))
+            found['service'] += rotated_copies(os.path.join(path, SERVICE_LOG))
+        elif os.path.basename(path).startswith(SERVICE_LOG.split('.')[0]):
+            found['service'] += rotated_copies(path)
+        else:
+            found['player'] += rotated_copies(path)
+    return found
+
+
+class LogAnalyzer:
+    def __init__(self, since: Optional[float] = None, until: Optional[float] = None):
+        self.since = since
+        self.until = until
+        self._days = {}  # 'YYYY-MM-DD' -> (midnight epoch, weekday)
+
+        self.lines = 0
+        self.first_ts = self.last_ts = None
+        self.sessions = []
+        self.open_session = None
+        self.last_closed = None
+        self.pending_stream = None
+        self.down_since = None
+        self.repairs = []            # Seconds from a failure to the next stable playback
+
+        self.process_starts = 0
+        self.unclean_exits = 0
+        self.restarts = Counter()
+        self.health_failures = Counter()
+        self.buffering = Counter()
+        self.launch_failures = Counter()
+        self.heatmap = [[0] * 24 for _ in range(7)]
+        self.exceptions = Counter()
+
+    def _day(self, date: str):
+        day = self._days.get(date)
+        if day is None:
+            parsed = time.strptime(date, '%Y-%m-%d')
+            day = self._days[date] = (time.mktime(parsed), parsed.tm_wday)
+        return day
+
+    def feed(self, lines: Iterator[str], events: bool = True, tracebacks: bool = False):
+        """Consume log lines; service logs only contribute tracebacks unless events=True"""
+        match = EVENT_RE.match
+        handlers = {name: getattr(self, f'_on_{name}') for name, _ in EVENTS}
+        in_traceback = False
+        for line in lines:
+            self.lines += 1
+            if tracebacks:
+                if in_traceback and line[:1] not in (' ', '\t', '\n', '') and not TIMESTAMPED_RE.match(line):
+                    self.exceptions[line.strip()[:120]] += 1
+                    in_traceback = False
+                elif TRACEBACK_RE.match(line):
+                    in_traceback = True
+            if not events:
+                continue
+            m = match(line)
+            if not m:
+                continue
+            date, hour = m.group(1), int(m.group(2))
+            midnight, weekday = self._day(date)
+            ts = midnight + hour * 3600 + int(m.group(3)) * 60 + int(m.group(4)) + int(m.group(5)) / 1000
+            if (self.since and ts < self.since) or (self.until and ts > self.until):
+                continue
+            if self.first_ts is None:
+                self.first_ts = ts
+            handlers[m.lastgroup](m, ts, weekday, hour)
+            self.last_ts = ts
+
+    def feed_file(self, path: str, events: bool = True, tracebacks: bool = False):
+        with open_log(path) as f:
+            self.feed(f, events, tracebacks)
+
+    # Event handlers
+
+    def _close(self, ts: float, reason: str):
+        session, self.open_session = self.open_session, None
+        session['end'] = ts
+        session['reason'] = reason
+        self.sessions.append(session)
+        self.last_closed = session
+        if reason in FAILURE_REASONS:
+            self.down_since = ts
+
+    def _on_start(self, m, ts, weekday, hour):
+        # The player exits after every session and systemd restarts it, so a start is
+        # only suspicious when the previous process died mid-session without saying why
+        # (OOM kill, power cut, SIGKILL). It ends at the last line it logged.
+        if self.open_session:
+            self.unclean_exits += 1
+            self._close(self.last_ts, 'killed')
+        self.process_starts += 1
+
+    def _on_stop(self, m, ts, weekday, hour):
+        if self.open_session:
+            self._close(ts, 'shutdown')
+        self.down_since = None  # Deliberate stop - not downtime to repair
+
+    def _on_playing(self, m, ts, weekday, hour):
+        self.pending_stream = m.group('stream').strip()
+
+    def _on_stable(self, m, ts, weekday, hour):
+        if self.open_session:
+            self._close(ts, 'restarted')
+        if self.down_since is not None:
+            self.repairs.append(ts - self.down_since)
+            self.down_since = None
+        self.open_session = {'stream': self.pending_stream or '?', 'start': ts}
+
+    def _on_heartbeat(self, m, ts, weekday, hour):
+        pass  # Only moves last_ts, so a killed process ends its session here
+
+    def _on_exited(self, m, ts, weekday, hour):
+        if self.open_session:
+            self._close(ts, 'ended' if m.group('exit_code') == '0' else 'crashed')
+
+    def _on_health_failed(self, m, ts, weekday, hour):
+        self.health_failures[self._stream()] += 1
+        self.heatmap[weekday][hour] += 1
+
+    def _on_stalled(self, m, ts, weekday, hour):
+        if self.open_session:
+            self._close(ts, 'stalled')
+
+    def _on_memory(self, m, ts, weekday, hour):
+        if self.open_session:
+            self._close(ts, 'memory')
+
+    def _on_restart(self, m, ts, weekday, hour):
+        self.restarts[m.group('restart_reason').strip()] += 1
+
+    def _on_buffering(self, m, ts, weekday, hour):
+        self.buffering[self._stream()] += 1
+        self.heatmap[weekday][hour] += 1
+
+    def _on_launch_failed(self, m, ts, weekday, hour):
+        self.launch_failures[m.group('failed_stream').strip()] += 1
+
+    def _on_session(self, m, ts, weekday, hour):
+        # Players since the tuning store log the reason explicitly - trust it over inference
+        reason = m.group('session_reason')
+        if self.open_session:
+            self._close(ts, reason)
+        elif self.last_closed and ts - self.last_closed['end'] <= SESSION_REASON_WINDOW:
+            self.last_closed['reason'] = reason
+            if reason not in FAILURE_REASONS and self.down_since == self.last_closed['end']:
+                self.down_since = None
+
+    def _stream(self) -> str:
+        return self.open_session['stream'] if self.open_session else (self.pending_stream or '?')
+
+    # Reporting
+
+    def report(self) -> Dict:
+        sessions = list(self.sessions)
+        if self.open_session and self.last_ts:
+            sessions.append(dict(self.open_session, end=self.last_ts, reason='open'))
+
+        streams = defaultdict(lambda: {'sessions': 0, 'play_seconds': 0.0, 'failures': 0})
+        for session in sessions:
+            stats = streams[session['stream']]
+            stats['sessions'] += 1
+            stats['play_seconds'] += session['end'] - session['start']
+            stats['failures'] += session['reason'] in FAILURE_REASONS
+        for name, stats in streams.items():
+            stats['health_failures'] = self.health_failures.get(name, 0)
+            stats['buffering'] = self.buffering.get(name, 0)
+            stats['launch_failures'] = self.launch_failures.get(name, 0)
+
+        play_seconds = sum(s['play_seconds'] for s in streams.values())
+        failures = sum(s['failures'] for s in streams.values())
+        repair_seconds = sum(self.repairs)
+        return {
+            'lines': self.lines,
+            'first': self.first_ts,
+            'last': self.last_ts,
+            'process_starts': self.process_starts,
+            'unclean_exits': self.unclean_exits,
+            'sessions': len(sessions),
+            'endings': dict(Counter(s['reason'] for s in sessions)),
+            'restarts': dict(self.restarts),
+            'health_failures': sum(self.health_failures.values()),
+            'buffering_events': sum(self.buffering.values()),
+            'play_seconds': play_seconds,
+            'failures': failures,
+            'mtbf_seconds': play_seconds / failures if failures else None,
+            'mttr_seconds': repair_seconds / len(self.repairs) if self.repairs else None,
+            'availability': play_seconds / (play_seconds + repair_seconds) if play_seconds else None,
+            'streams': dict(streams),
+            'heatmap': self.heatmap,
+            'exceptions': dict(self.exceptions.most_common(10)),
+        }
+
+
+def analyze(paths: List[str], since: Optional[float] = None, until: Optional[float] = None) -> LogAnalyzer:
+    """Run the analyzer over player and service logs"""
+    logs = discover_logs(paths)
+    analyzer = LogAnalyzer(since, until)
+    # The service log also captures the player's stdout - only use its events when
+    # the player log is missing (e.g. it couldn't be written on a read-only filesystem)
+    service_events = not logs['player']
+    for path in logs['player']:
+        analyzer.feed_file(path)
+    for path in logs['service']:
+        analyzer.feed_file(path, events=service_events, tracebacks=True)
+    return analyzer
+
+
+def _duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '--'
+    if seconds >= 86400:
+        return f"{seconds / 86400:.1f}d"
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}h"
+    if seconds >= 60:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds:.0f}s"
+
+
+def print_report(report: Dict, top: int = 15):
+    fmt = lambda ts: time.strftime('%Y-%m-%d %H:%M', time.localtime(ts)) if ts else '--'
+    print(f"📜 {report['lines']:,} lines, {fmt(report['first'])} -> {fmt(report['last'])}")
+    print(f"🔁 {report['process_starts']} service starts ({report['unclean_exits']} after dying mid-session), "
+          f"{sum(report['restarts'].values())} playback restarts")
+    for reason, count in sorted(report['restarts'].items(), key=lambda item: -item[1]):
+        print(f"   {reason}: {count}")
+    endings = ', '.join(f"{reason} {count}" for reason, count in sorted(report['endings'].items()))
+    print(f"🎬 {report['sessions']} sessions ({endings or 'none'})")
+    print(f"🩺 {report['health_failures']} health-check failures, {report['buffering_events']} buffering stalls")
+    availability = f"{report['availability']:.2%}" if report['availability'] is not None else '--'
+    print(f"⏱️ Played {_duration(report['play_seconds'])} | MTBF {_duration(report['mtbf_seconds'])} | "
+          f"MTTR {_duration(report['mttr_seconds'])} | availability {availability}")
+
+    if report['streams']:
+        print(f"\n📺 Streams by play time (top {top}):")
+        ranked = sorted(report['streams'].items(), key=lambda item: -item[1]['play_seconds'])
+        for name, stats in ranked[:top]:
+            print(f"   {name[:40]:<40} {_duration(stats['play_seconds']):>7}  {stats['sessions']:>4} sessions  "
+                  f"{stats['failures']:>3} failures  {stats['health_failures']:>3} health  "
+                  f"{stats['buffering']:>4} stalls  {stats['launch_failures']:>3} launch fails")
+
+    peak = max(max(row) for row in report['heatmap'])
+    if peak:
+        print(f"\n🔥 Stalls by hour of week (peak {peak}):")
+        print("        " + ''.join(f"{h:<3}" for h in range(0, 24, 3)).rstrip())
+        for day, row in zip(WEEKDAYS, report['heatmap']):
+            cells = ''.join(HEAT_CHARS[min(len(HEAT_CHARS) - 1, -(-count * (len(HEAT_CHARS) - 1) // peak))]
+                            for count in row)
+            print(f"   {day}  {cells}  {sum(row)}")
+
+    if report['exceptions']:
+        print("\n💥 Uncaught exceptions (service log):")
+        for line, count in report['exceptions'].items():
+            print(f"   {count:>4}x {line}")
+
+
+def _parse_time(value: str) -> float:
+    for fmt in ('%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            pass
+    raise ValueError(f"Expected 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM', got {value!r}")
+
+
+def main():
+    """Analyze player/service logs"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV log analytics')
+    parser.add_argument('paths', nargs='*',
+                        default=[os.path.dirname(os.path.dirname(os.path.abspath(__file__)))],
+                        help='Log files or directories (default: the GrannyTV directory)')
+    parser.add_argument('--since', type=_parse_time, help="Start time ('YYYY-MM-DD [HH:MM]')")
+    parser.add_argument('--until', type=_parse_time, help="End time ('YYYY-MM-DD [HH:MM]')")
+    parser.add_argument('--top', type=int, default=15, help='Streams to list (default: 15)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    logs = discover_logs(args.paths)
+    if not logs['player'] and not logs['service']:
+        print(f"❌ No {PLAYER_LOG} or {SERVICE_LOG} found in {', '.join(args.paths)}")
+        return
+
+    started = time.time()
+    report = analyze(args.paths, args.since, args.until).report()
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"🔍 {len(logs['player'])} player / {len(logs['service'])} service log files "
+          f"analyzed in {time.time() - started:.1f}s\n")
+    print_report(report, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Memory Budget Planner for GrannyTV
+Sizes mpv's demuxer buffers from the service's cgroup v2 memory limit
+
+iptv-player.service runs with MemoryHigh=200M / MemoryMax=250M. mpv's
+decoder, frame queues and libraries need a fixed baseline, the Python
+supervisor needs its own RSS; whatever is left is split between the
+forward and back demuxer buffers so the OOM killer never hits mpv
+mid-stream while we still buffer as much as safely fits.
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+
+from stream_tuning import parse_megabytes
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+MPV_BASELINE_MB = 90      # Software decode, frame queues, libs (measured on Pi 3, 720p)
+SAFETY_MARGIN_MB = 20     # Slack for allocation spikes and page cache churn
+MIN_DEMUXER_MB = 4        # mpv needs some buffer even when memory is tight
+MIN_BACK_MB = 1
+FORWARD_SHARE = 0.75      # Rest of the budget goes to the back buffer (seeking/reconnect)
+UNLIMITED_FRACTION = 0.5  # Without a cgroup limit, use at most half of MemAvailable
+MPV_DEFAULT_DEMUXER_MB = 150  # What mpv buffers when a profile leaves the option unset
+MPV_DEFAULT_BACK_MB = 50
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _read_bytes_mb(path: str) -> Optional[float]:
+    """Read a cgroup byte counter; 'max' (no limit) and missing files are None"""
+    value = _read_text(path)
+    if value is None or value == 'max':
+        return None
+    try:
+        return int(value) / (1024 * 1024)
+    except ValueError:
+        return None
+
+
+def cgroup_path(proc_root: str = '/proc', cgroup_root: str = CGROUP_ROOT) -> Optional[str]:
+    """Directory of this process's cgroup v2 group, if mounted"""
+    content = _read_text(os.path.join(proc_root, 'self', 'cgroup'))
+    if not content:
+        return None
+    for line in content.splitlines():
+        if line.startswith('0::'):
+            path = os.path.join(cgroup_root, line[3:].lstrip('/'))
+            if os.path.exists(os.path.join(path, 'memory.current')):
+                return path
+    return None
+
+
+def parse_inactive_file(text: Optional[str]) -> int:
+    """Bytes of inactive page cache in a cgroup memory.stat (reclaimed before any OOM kill)"""
+    for line in (text or '').splitlines():
+        if line.startswith('inactive_file '):
+            try:
+                return int(line.split()[1])
+            except (IndexError, ValueError):
+                return 0
+    return 0
+
+
+def read_status_kb(field: str, pid='self', proc_root: str = '/proc') -> Optional[int]:
+    """Read one kB field (VmRSS, VmHWM, ...) from /proc/<pid>/status"""
+    content = _read_text(os.path.join(proc_root, str(pid), 'status'))
+    if not content:
+        return None
+    for line in content.splitlines():
+        if line.startswith(f"{field}:"):
+            try:
+                return int(line.split()[1])
+            except (IndexError, ValueError):
+                return None
+    return None
+
+
+class MemoryBudgetPlanner:
+    def __init__(self, proc_root='/proc', cgroup_root=CGROUP_ROOT,
+                 mpv_baseline_mb=MPV_BASELINE_MB, safety_margin_mb=SAFETY_MARGIN_MB):
+        self.proc_root = proc_root
+        self.cgroup_root = cgroup_root
+        self.mpv_baseline_mb = mpv_baseline_mb
+        self.safety_margin_mb = safety_margin_mb
+
+    def _mem_available_mb(self) -> Optional[float]:
+        content = _read_text(os.path.join(self.proc_root, 'meminfo'))
+        if not content:
+            return None
+        for line in content.splitlines():
+            if line.startswith('MemAvailable:'):
+                return int(line.split()[1]) / 1024
+        return None
+
+    def read(self) -> Dict:
+        """Current limits and usage, in MB"""
+        supervisor_kb = read_status_kb('VmRSS', proc_root=self.proc_root)
+        info = {
+            'cgroup': None,
+            'limit_mb': None,
+            'in_use_mb': None,
+            'supervisor_rss_mb': supervisor_kb / 1024 if supervisor_kb else 0,
+        }
+
+        path = cgroup_path(self.proc_root, self.cgroup_root)
+        if path:
+            limits = [mb for mb in (_read_bytes_mb(os.path.join(path, 'memory.high')),
+                                    _read_bytes_mb(os.path.join(path, 'memory.max'))) if mb]
+            current = _read_bytes_mb(os.path.join(path, 'memory.current'))
+            if limits and current is not None:
+                # Inactive page cache is reclaimed before anything gets killed
+                inactive_file = parse_inactive_file(_read_text(os.path.join(path, 'memory.stat'))) / (1024 * 1024)
+                info['cgroup'] = path
+                info['limit_mb'] = min(limits)
+                info['in_use_mb'] = max(current - inactive_file, info['supervisor_rss_mb'])
+                return info
+
+        # No cgroup limit (desktop, manual runs) - stay within free memory
+        available = self._mem_available_mb()
+        if available is not None:
+            info['limit_mb'] = available * UNLIMITED_FRACTION + info['supervisor_rss_mb']
+            info['in_use_mb'] = info['supervisor_rss_mb']
+        return info
+
+    def buffer_budget_mb(self, info: Optional[Dict] = None) -> Optional[float]:
+        """MB left for mpv's demuxer buffers, or None if limits are unknown"""
+        info = info or self.read()
+        if info['limit_mb'] is None:
+            return None
+        return info['limit_mb'] - info['in_use_mb'] - self.mpv_baseline_mb - self.safety_margin_mb
+
+    def apply(self, options: Dict, bitrate_kbps: Optional[float] = None) -> Tuple[Dict, Optional[Dict]]:
+        """Clamp an mpv option profile to the budget
+
+        Returns (options, plan); plan is None when nothing was measured.
+        Buffers only ever shrink - the profile already says how much is useful.
+        A buffer the profile leaves unset counts at mpv's default size.
+        """
+        info = self.read()
+        budget = self.buffer_budget_mb(info)
+        if budget is None:
+            return options, None
+
+        options = dict(options)
+        forward_mb = max(MIN_DEMUXER_MB, budget * FORWARD_SHARE)
+        back_mb = max(MIN_BACK_MB, budget - forward_mb)
+
+        requested = parse_megabytes(options.get('demuxer-max-bytes'))
+        if (MPV_DEFAULT_DEMUXER_MB if requested is None else requested) > forward_mb:
+            options['demuxer-max-bytes'] = f"{int(forward_mb)}M"
+        requested_back = parse_megabytes(options.get('demuxer-max-back-bytes'))
+        if (MPV_DEFAULT_BACK_MB if requested_back is None else requested_back) > back_mb:
+            options['demuxer-max-back-bytes'] = f"{int(back_mb)}M"
+
+        # At a known bitrate, don't ask for more seconds than the buffer holds
+        if bitrate_kbps:
+            demuxer_mb = parse_megabytes(options.get('demuxer-max-bytes')) or forward_mb
+            fits_secs = max(1, int(demuxer_mb * 1024 * 1024 / (bitrate_kbps * 1000 / 8)))
+            for key in ('cache-secs', 'demuxer-readahead-secs'):
+                try:
+                    if key in options and float(options[key]) > fits_secs:
+                        options[key] = str(fits_secs)
+                except (TypeError, ValueError):
+                    pass
+
+        plan = dict(info, budget_mb=budget, forward_mb=forward_mb, back_mb=back_mb)
+        return options, plan
+
+
+def main():
+    """Show the current memory budget"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV mpv memory budget')
+    parser.add_argument('--bitrate', type=float, help='Stream bitrate in kbps')
+    args = parser.parse_args()
+
+    planner = MemoryBudgetPlanner()
+    info = planner.read()
+    budget = planner.buffer_budget_mb(info)
+    print(f"🧠 cgroup: {info['cgroup'] or 'none (using MemAvailable)'}")
+    if budget is None:
+        print("❌ Memory limits unknown - buffers left as configured")
+        return
+    print(f"   Limit: {info['limit_mb']:.0f}MB, in use: {info['in_use_mb']:.0f}MB "
+          f"(supervisor {info['supervisor_rss_mb']:.0f}MB)")
+    print(f"   mpv baseline: {planner.mpv_baseline_mb}MB, margin: {planner.safety_margin_mb}MB")
+    print(f"   Buffer budget: {budget:.0f}MB")
+
+    options, _ = planner.apply({'demuxer-max-bytes': '60M', 'demuxer-max-back-bytes': '10M',
+                                'cache-secs': '60', 'demuxer-readahead-secs': '60'}, args.bitrate)
+    print(f"📦 Largest profile clamps to: demuxer {options['demuxer-max-bytes']}, "
+          f"back {options['demuxer-max-back-bytes']}, cache {options['cache-secs']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Memory Pressure Watchdog for GrannyTV
+Reacts to rising memory pressure before the kernel OOM-kills mpv
+
+Reads PSI (/proc/pressure/memory) and the service cgroup's
+memory.current / memory.stat / memory.events through held file handles
+every couple of seconds. Usage is counted without inactive page cache
+(logs, state files and the stream itself fill the cgroup up to
+MemoryHigh with reclaimable cache), and only PSI stalls - not the
+cgroup merely reaching memory.high - grade above ELEVATED. Pressure is
+graded into escalating levels; the player decides what each level does
+(shrink mpv buffers, drop caches, trim the catalog, and only at the
+last level restart playback).
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from memory_budget import CGROUP_ROOT, cgroup_path, parse_inactive_file
+from sysfs_collectors import HeldFile
+
+LEVEL_OK = 0
+LEVEL_ELEVATED = 1   # Shrink mpv's demuxer/cache over IPC
+LEVEL_HIGH = 2       # Also drop in-process caches and trim the catalog
+LEVEL_CRITICAL = 3   # Restart playback - last resort
+
+LEVEL_NAMES = {LEVEL_OK: 'ok', LEVEL_ELEVATED: 'elevated', LEVEL_HIGH: 'high', LEVEL_CRITICAL: 'critical'}
+
+# Thresholds: PSI avg10 is the % of the last 10s tasks were stalled on memory
+PSI_SOME_ELEVATED = 10.0
+PSI_SOME_HIGH = 25.0
+PSI_FULL_HIGH = 5.0
+PSI_FULL_CRITICAL = 20.0
+USAGE_ELEVATED = 0.85     # Fraction of the cgroup limit in use, excluding inactive page cache
+USAGE_HIGH = 0.92
+USAGE_CRITICAL = 0.97
+HIGH_CHECKS_TO_CRITICAL = 5   # HIGH that does not ease off after this many checks escalates
+CHECK_INTERVAL = 2.0
+RECOVERY_CHECKS = 5           # Consecutive calmer checks before stepping a level down
+
+
+def parse_psi(text: Optional[str]) -> Dict[str, Dict[str, float]]:
+    """Parse 'some avg10=0.00 avg60=0.00 avg300=0.00 total=0' lines"""
+    psi = {}
+    for line in (text or '').splitlines():
+        kind, _, rest = line.partition(' ')
+        values = {}
+        for field in rest.split():
+            key, _, value = field.partition('=')
+            try:
+                values[key] = float(value)
+            except ValueError:
+                pass
+        psi[kind] = values
+    return psi
+
+
+def parse_events(text: Optional[str]) -> Dict[str, int]:
+    """Parse cgroup memory.events ('low 0', 'high 12', 'max 0', 'oom 0', 'oom_kill 0')"""
+    events = {}
+    for line in (text or '').splitlines():
+        key, _, value = line.partition(' ')
+        try:
+            events[key] = int(value)
+        except ValueError:
+            pass
+    return events
+
+
+class MemoryWatchdog:
+    def __init__(self, on_level_change: Optional[Callable[[int, str], None]] = None,
+                 proc_root: str = '/proc', cgroup_root: str = CGROUP_ROOT,
+                 interval: float = CHECK_INTERVAL):
+        self.on_level_change = on_level_change
+        self.interval = interval
+        self.psi = HeldFile(os.path.join(proc_root, 'pressure', 'memory'))
+
+        self.current = self.stat = self.events = None
+        self.limit_bytes = None
+        group = cgroup_path(proc_root, cgroup_root)
+        if group:
+            self.current = HeldFile(os.path.join(group, 'memory.current'))
+            self.stat = HeldFile(os.path.join(group, 'memory.stat'))
+            self.events = HeldFile(os.path.join(group, 'memory.events'))
+            limits = []
+            for name in ('memory.high', 'memory.max'):
+                held = HeldFile(os.path.join(group, name))
+                value = held.read_int()  # 'max' (unlimited) reads as None
+                held.close()
+                if value:
+                    limits.append(value)
+            self.limit_bytes = min(limits) if limits else None
+
+        self.level = LEVEL_OK
+        self.high_checks = 0
+        self.calm_checks = 0
+        self.last_events = parse_events(self.events.read()) if self.events else {}
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    @property
+    def available(self) -> bool:
+        """True when there is anything to watch (PSI or a limited cgroup)"""
+        return self.psi.available or (self.current is not None and self.limit_bytes is not None)
+
+    def sample(self) -> Dict:
+        """Current pressure readings"""
+        psi = parse_psi(self.psi.read())
+        usage = None
+        if self.current and self.limit_bytes:
+            current = self.current.read_int()
+            if current is not None:
+                # Inactive page cache is reclaimed long before anything is killed
+                current -= parse_inactive_file(self.stat.read())
+                usage = max(current, 0) / self.limit_bytes
+
+        events = parse_events(self.events.read()) if self.events else {}
+        new_events = {key: events.get(key, 0) - self.last_events.get(key, 0) for key in events}
+        self.last_events = events
+        return {
+            'some_avg10': psi.get('some', {}).get('avg10', 0.0),
+            'full_avg10': psi.get('full', {}).get('avg10', 0.0),
+            'usage': usage,
+            'new_events': new_events,
+        }
+
+    def assess(self, sample: Dict) -> Tuple[int, str]:
+        """Grade one sample into a level and the reason for it"""
+        usage = sample['usage'] or 0.0
+        events = sample['new_events']
+        if events.get('oom', 0) or events.get('oom_kill', 0) or events.get('max', 0):
+            return LEVEL_CRITICAL, 'cgroup hit memory.max'
+        if sample['full_avg10'] >= PSI_FULL_CRITICAL or usage >= USAGE_CRITICAL:
+            return LEVEL_CRITICAL, f"full pressure {sample['full_avg10']:.0f}%, usage {usage:.0%}"
+        if sample['full_avg10'] >= PSI_FULL_HIGH or sample['some_avg10'] >= PSI_SOME_HIGH or usage >= USAGE_HIGH:
+            return LEVEL_HIGH, (f"pressure some {sample['some_avg10']:.0f}% / full {sample['full_avg10']:.0f}%, "
+                                f"usage {usage:.0%}")
+        # Reaching memory.high only means the kernel reclaimed cache for us;
+        # on its own that is worth a smaller buffer, never a restart
+        if sample['some_avg10'] >= PSI_SOME_ELEVATED or usage >= USAGE_ELEVATED or events.get('high', 0):
+            return LEVEL_ELEVATED, (f"pressure some {sample['some_avg10']:.0f}%, usage {usage:.0%}"
+                                    + (", reclaimed at memory.high" if events.get('high') else ''))
+        return LEVEL_OK, f"usage {usage:.0%}"
+
+    def check(self) -> int:
+        """One watchdog pass; calls on_level_change when the level moves"""
+        level, reason = self.assess(self.sample())
+
+        # Sustained HIGH means the cheaper actions did not help
+        self.high_checks = self.high_checks + 1 if level == LEVEL_HIGH else 0
+        if self.high_checks >= HIGH_CHECKS_TO_CRITICAL:
+            level, reason = LEVEL_CRITICAL, f"high pressure for {self.high_checks} checks ({reason})"
+            self.high_checks = 0
+
+        if level > self.level:
+            self.calm_checks = 0
+            self._set_level(level, reason)
+        elif level < self.level:
+            # Step down slowly so we don't flap between actions
+            self.calm_checks += 1
+            if self.calm_checks >= RECOVERY_CHECKS:
+                self.calm_checks = 0
+                self._set_level(self.level - 1, reason)
+        else:
+            self.calm_checks = 0
+        return self.level
+
+    def _set_level(self, level: int, reason: str):
+        self.level = level
+        if self.on_level_change:
+            try:
+                self.on_level_change(level, reason)
+            except Exception:
+                pass  # A failing action must not stop the watchdog
+
+    def reset(self):
+        """Forget escalation (e.g. after playback was restarted)"""
+        self.level = LEVEL_OK
+        self.high_checks = self.calm_checks = 0
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.check()
+
+    def start(self) -> bool:
+        if not self.available:
+            return False
+        self.thread = threading.Thread(target=self._run, name='memory-watchdog', daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def main():
+    """Print pressure readings and the level they map to"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV memory pressure watchdog')
+    parser.add_argument('--count', type=int, default=10, help='Number of checks (default: 10)')
+    args = parser.parse_args()
+
+    watchdog = MemoryWatchdog(interval=1)
+    if not watchdog.available:
+        print("❌ Neither PSI nor a cgroup memory limit is available")
+        return
+    limit = f"{watchdog.limit_bytes / 1024 / 1024:.0f}MB" if watchdog.limit_bytes else 'none'
+    print(f"🧠 PSI: {'yes' if watchdog.psi.available else 'no'}, cgroup limit: {limit}")
+    for _ in range(args.count):
+        sample = watchdog.sample()
+        level, reason = watchdog.assess(sample)
+        usage = f"{sample['usage']:.0%}" if sample['usage'] is not None else '--'
+        print(f"📊 some {sample['some_avg10']:5.1f}% | full {sample['full_avg10']:5.1f}% | "
+              f"usage {usage} -> {LEVEL_NAMES[level]} ({reason})")
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Fixed-memory Metrics History for GrannyTV
+Ring-buffer time series at 1s / 1m / 1h resolution
+
+Each tier is a set of preallocated `array` columns, so memory is fixed
+(~230KB for all tiers) no matter how long the Pi runs. Raw samples are
+folded into every tier's current bucket. When a bucket closes it is
+written into that tier's ring, overwriting the oldest slot. The coarse
+tiers are snapshotted to a compact binary file now and then, together
+with their still-open bucket. That keeps days of history across restarts
+with only a small SD write per snapshot.
+"""
+
+import math
+import os
+import struct
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# Metric -> how samples in one bucket are combined
+METRICS = {
+    'cpu_percent': 'mean',
+    'temp_c': 'max',
+    'mpv_rss_mb': 'max',
+    'network_recv_mbps': 'mean',
+    'cache_secs': 'min',        # The lowest buffer level is what predicts a stall
+    'dropped_frames': 'sum',    # Frames dropped during the bucket
+}
+
+# (name, seconds per bucket, buckets kept, persisted)
+TIERS = (
+    ('1s', 1, 3600, False),      # Last hour - too volatile to be worth SD writes
+    ('1m', 60, 2880, True),      # Last 2 days
+    ('1h', 3600, 720, True),     # Last 30 days
+)
+
+SNAPSHOT_MAGIC = b'GTVM'
+SNAPSHOT_VERSION = 2      # 2 adds each tier's open bucket; version 1 still loads
+SNAPSHOT_INTERVAL = 1800  # Seconds between snapshots
+NAN = float('nan')
+
+
+class RingTier:
+    """One resolution: a timestamp column plus one float32 column per metric"""
+
+    def __init__(self, name: str, resolution: int, capacity: int, persisted: bool):
+        self.name = name
+        self.resolution = resolution
+        self.capacity = capacity
+        self.persisted = persisted
+        self.timestamps = array('d', [NAN]) * capacity
+        self.columns = {metric: array('f', [NAN]) * capacity for metric in METRICS}
+        self.head = 0  # Next slot to write
+        self.count = 0
+        self._reset_bucket(None)
+
+    def _reset_bucket(self, bucket_start: Optional[float]):
+        self.bucket_start = bucket_start
+        self.acc = {metric: None for metric in METRICS}
+        self.acc_count = {metric: 0 for metric in METRICS}
+
+    def add(self, timestamp: float, values: Dict[str, float]):
+        bucket_start = timestamp - timestamp % self.resolution
+        if self.bucket_start is not None and bucket_start != self.bucket_start:
+            self.flush()
+        if self.bucket_start is None:
+            self.bucket_start = bucket_start
+
+        for metric, value in values.items():
+            if value is None or metric not in METRICS:
+                continue
+            current = self.acc[metric]
+            how = METRICS[metric]
+            if current is None:
+                self.acc[metric] = value
+            elif how in ('mean', 'sum'):
+                self.acc[metric] = current + value
+            elif how == 'max':
+                self.acc[metric] = max(current, value)
+            else:
+                self.acc[metric] = min(current, value)
+            self.acc_count[metric] += 1
+
+    def flush(self):
+        """Close the current bucket into the ring"""
+        if self.bucket_start is None:
+            return
+        slot = self.head
+        self.timestamps[slot] = self.bucket_start
+        for metric, column in self.columns.items():
+            value = self.acc[metric]
+            if value is not None and METRICS[metric] == 'mean':
+                value /= self.acc_count[metric]
+            column[slot] = NAN if value is None else value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self._reset_bucket(None)
+
+    def pack_bucket(self) -> bytes:
+        """The open bucket's start and accumulators, for the snapshot"""
+        data = struct.pack('<d', NAN if self.bucket_start is None else self.bucket_start)
+        for metric in METRICS:
+            value = self.acc[metric]
+            data += struct.pack('<dI', NAN if value is None else value, self.acc_count[metric])
+        return data
+
+    def unpack_bucket(self, f):
+        (bucket_start,) = struct.unpack('<d', f.read(8))
+        self._reset_bucket(None if bucket_start != bucket_start else bucket_start)
+        for metric in METRICS:
+            value, count = struct.unpack('<dI', f.read(12))
+            self.acc[metric] = None if value != value else value
+            self.acc_count[metric] = count
+
+    def oldest(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return self.timestamps[(self.head - self.count) % self.capacity]
+
+    def series(self, metric: str, start: float = 0, end: float = math.inf) -> List[Tuple[float, float]]:
+        """(bucket start, value) pairs in time order, NaN gaps skipped"""
+        column = self.columns[metric]
+        points = []
+        for i in range(self.count):
+            slot = (self.head - self.count + i) % self.capacity
+            ts = self.timestamps[slot]
+            value = column[slot]
+            if start <= ts < end and value == value:  # NaN != NaN
+                points.append((ts, value))
+        return points
+
+
+class MetricsStore:
+    def __init__(self, snapshot_file: Optional[str] = None, snapshot_interval: int = SNAPSHOT_INTERVAL):
+        self.tiers = [RingTier(*spec) for spec in TIERS]
+        self.snapshot_file = snapshot_file
+        self.snapshot_interval = snapshot_interval
+        self.last_snapshot = time.time()
+        if snapshot_file:
+            self.load()
+
+    def add(self, values: Dict[str, Optional[float]], timestamp: Optional[float] = None):
+        """Record one sample (missing metrics may be omitted or None)"""
+        timestamp = timestamp or time.time()
+        for tier in self.tiers:
+            tier.add(timestamp, values)
+        if self.snapshot_file and timestamp - self.last_snapshot >= self.snapshot_interval:
+            self.save()
+
+    def tier(self, name: str) -> RingTier:
+        for tier in self.tiers:
+            if tier.name == name:
+                return tier
+        raise KeyError(name)
+
+    def query(self, metric: str, start: float, end: Optional[float] = None,
+              tier: Optional[str] = None) -> List[Tuple[float, float]]:
+        """Series for a window, from the finest tier that still covers its start"""
+        if metric not in METRICS:
+            raise KeyError(metric)
+        end = end or time.time()
+        if tier:
+            return self.tier(tier).series(metric, start, end)
+        for candidate in self.tiers:
+            oldest = candidate.oldest()
+            if oldest is not None and oldest <= start:
+                return candidate.series(metric, start, end)
+        # Nothing reaches back that far - use the longest history we have
+        populated = [t for t in self.tiers if t.count]
+        if not populated:
+            return []
+        return min(populated, key=lambda t: t.oldest()).series(metric, start, end)
+
+    def memory_bytes(self) -> int:
+        return sum(t.timestamps.itemsize * t.capacity
+                   + sum(c.itemsize * t.capacity for c in t.columns.values())
+                   for t in self.tiers)
+
+    def save(self):
+        """Snapshot the persisted tiers to the binary file (atomic)"""
+        self.last_snapshot = time.time()
+        metric_names = ','.join(METRICS).encode('ascii')
+        persisted = [t for t in self.tiers if t.persisted]
+        try:
+            tmp_file = f"{self.snapshot_file}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(struct.pack('<4sHH', SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(metric_names)))
+                f.write(metric_names)
+                f.write(struct.pack('<H', len(persisted)))
+                for t in persisted:
+                    name = t.name.encode('ascii')
+                    f.write(struct.pack('<B', len(name)) + name)
+                    f.write(struct.pack('<IIII', t.resolution, t.capacity, t.head, t.count))
+                    t.timestamps.tofile(f)
+                    for metric in METRICS:
+                        t.columns[metric].tofile(f)
+                    f.write(t.pack_bucket())
+            os.replace(tmp_file, self.snapshot_file)
+        except OSError:
+            pass  # Read-only filesystem - history stays in memory
+
+    def load(self) -> bool:
+        """Restore persisted tiers; snapshots from another layout are ignored"""
+        try:
+            with open(self.snapshot_file, 'rb') as f:
+                magic, version, names_len = struct.unpack('<4sHH', f.read(8))
+                if magic != SNAPSHOT_MAGIC or version not in (1, SNAPSHOT_VERSION):
+                    return False
+                if f.read(names_len).decode('ascii') != ','.join(METRICS):
+                    return False
+                (tier_count,) = struct.unpack('<H', f.read(2))
+                for _ in range(tier_count):
+                    (name_len,) = struct.unpack('<B', f.read(1))
+                    name = f.read(name_len).decode('ascii')
+                    resolution, capacity, head, count = struct.unpack('<IIII', f.read(16))
+                    try:
+                        t = self.tier(name)
+                    except KeyError:
+                        return False
+                    if t.resolution != resolution or t.capacity != capacity:
+                        return False
+                    timestamps = array('d')
+                    timestamps.fromfile(f, capacity)
+                    columns = {}
+                    for metric in METRICS:
+                        columns[metric] = array('f')
+                        columns[metric].fromfile(f, capacity)
+                    t.timestamps, t.columns, t.head, t.count = timestamps, columns, head, count
+                    if version >= 2:
+                        t.unpack_bucket(f)
+            return True
+        except (OSError, EOFError, struct.error, UnicodeDecodeError, ValueError):
+            return False
+
+    def close(self):
+        """Take a final snapshot (open buckets resume after a restart)"""
+        if self.snapshot_file:
+            self.save()
+
+
+def main():
+    """Summarize recorded history"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV metrics history')
+    parser.add_argument('snapshot', nargs='?', default='metrics_history.bin',
+                        help='Snapshot file (default: metrics_history.bin)')
+    parser.add_argument('--hours', type=float, default=24, help='Window to summarize (default: 24)')
+    parser.add_argument('--metric', choices=list(METRICS), help='Print the series for one metric')
+    args = parser.parse_args()
+
+    store = MetricsStore(args.snapshot)
+    start = time.time() - args.hours * 3600
+    print(f"📈 Metrics history: {args.snapshot} ({store.memory_bytes() / 1024:.0f}KB in memory)")
+    for t in store.tiers:
+        oldest = t.oldest()
+        span = f"since {time.strftime('%Y-%m-%d %H:%M', time.localtime(oldest))}" if oldest else "empty"
+        print(f"   {t.name}: {t.count}/{t.capacity} buckets, {span}")
+
+    if args.metric:
+        for ts, value in store.query(args.metric, start):
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}  {value:.2f}")
+        return
+
+    print(f"\n📊 Last {args.hours:g}h:")
+    for metric in METRICS:
+        values = [v for _, v in store.query(metric, start)]
+        if values:
+            print(f"   {metric:<18} min {min(values):8.2f}  avg {sum(values) / len(values):8.2f}  "
+                  f"max {max(values):8.2f}")
+
+
+if __name__ == "__main__":
+    main()
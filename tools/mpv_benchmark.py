@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+MPV Configuration Benchmark for GrannyTV
+Repeated, interleaved runs of mpv configurations with confidence intervals
+
+Configurations are data (mpv_benchmark_configs.json, or YAML if PyYAML is
+installed). Each one runs several times against the same source. Rounds
+are shuffled so network or thermal drift doesn't favour whichever config
+happens to go first. Every run measures over IPC and /proc:
+  - time to first frame
+  - CPU% and RSS of the mpv process
+  - cache stalls (paused-for-cache) and their duration
+  - VO + decoder dropped frames
+The summary reports the mean and a 95% confidence interval (Student's t)
+per metric. Configs whose interval overlaps the best one are marked as not
+distinguishable, so a "Variant 14" choice has numbers behind it.
+"""
+
+import csv
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+from iptv_protocol_optimizer import IPTVProtocolOptimizer
+from mpv_ipc import MPVIPCClient, remove_stale_socket
+from proc_sampler import MPVProcessSampler
+
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mpv_benchmark_configs.json')
+DEFAULT_RUNS = 5
+DEFAULT_DURATION = 30          # seconds of playback measured per run
+FIRST_FRAME_TIMEOUT = 20       # give up on a run without video after this
+SAMPLE_INTERVAL = 1.0
+COOLDOWN_SECONDS = 2
+IPC_SOCKET = '/tmp/grannytv-bench-{pid}.sock'
+HEADLESS_OPTIONS = {'vo': 'null', 'ao': 'null'}
+
+# Lower is better for every metric
+METRICS = ('ttff_s', 'cpu_percent', 'rss_mb', 'peak_rss_mb', 'stalls', 'stall_seconds', 'drops_per_minute')
+METRIC_UNITS = {'ttff_s': 's', 'cpu_percent': '%', 'rss_mb': 'MB', 'peak_rss_mb': 'MB',
+                'stalls': '', 'stall_seconds': 's', 'drops_per_minute': '/min'}
+
+# Two-sided 95% Student's t critical values for 1..30 degrees of freedom
+T_95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+
+def detect_platform() -> str:
+    """'pi' on a Raspberry Pi, else 'desktop'"""
+    try:
+        with open('/proc/device-tree/model', 'r') as f:
+            if 'Raspberry Pi' in f.read():
+                return 'pi'
+    except OSError:
+        pass
+    return 'desktop'
+
+
+def load_configs(path: str) -> Dict:
+    """Read a benchmark config file (JSON, or YAML when PyYAML is available)"""
+    with open(path, 'r') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("❌ PyYAML is not installed - use a .json config file")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def resolve_options(config: Dict, base: Dict, url: str, headless: bool = False) -> Dict[str, Optional[str]]:
+    """The {option: value} dict a config runs with"""
+    if config.get('profile') == 'player':
+        options = IPTVProtocolOptimizer().get_mpv_options(url)
+    else:
+        options = dict(base)
+        options.update(config.get('options', {}))
+    if headless:
+        options.update(HEADLESS_OPTIONS)
+    return {k: (None if v is None else str(v)) for k, v in options.items()}
+
+
+def mean_ci(values: List[float]) -> Dict:
+    """Mean, sample stdev and 95% confidence interval half-width"""
+    n = len(values)
+    if n == 0:
+        return {'n': 0, 'mean': None, 'stdev': None, 'ci95': None}
+    mean = sum(values) / n
+    if n == 1:
+        return {'n': 1, 'mean': mean, 'stdev': None, 'ci95': None}
+    stdev = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1))
+    t = T_95[n - 2] if n - 1 <= len(T_95) else 1.96
+    return {'n': n, 'mean': mean, 'stdev': stdev, 'ci95': t * stdev / math.sqrt(n)}
+
+
+def drop_page_cache() -> bool:
+    """Drop the page cache between runs (root only - no sudo prompts mid-benchmark)"""
+    try:
+        os.sync()
+        with open('/proc/sys/vm/drop_caches', 'w') as f:
+            f.write('3\n')
+        return True
+    except OSError:
+        return False
+
+
+def run_once(config: Dict, options: Dict, url: str, duration: float,
+             first_frame_timeout: float = FIRST_FRAME_TIMEOUT) -> Dict:
+    """Play url with one config and measure it"""
+    socket_path = IPC_SOCKET.format(pid=os.getpid())
+    remove_stale_socket(socket_path)
+    options = dict(options, **{'input-ipc-server': socket_path})
+    options.pop('loop-playlist', None)  # a finished VOD fixture should end the run, not restart
+    cmd = IPTVProtocolOptimizer().build_mpv_command(url, options)
+
+    result = {'config': config['name'], 'started': time.time(), 'status': 'ok',
+              'ttff_s': None, 'stalls': 0, 'stall_seconds': 0.0}
+    launched = time.monotonic()
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    except OSError as e:
+        return dict(result, status='failed_to_start', error=str(e))
+
+    ipc = MPVIPCClient(socket_path, timeout=2.0)
+    first_frame = []
+    stall = {'since': None}
+
+    def on_restart(_message):
+        if not first_frame:
+            first_frame.append(time.monotonic())
+
+    def on_cache_pause(_name, paused):
+        now = time.monotonic()
+        if paused and stall['since'] is None and first_frame:
+            result['stalls'] += 1
+            stall['since'] = now
+        elif not paused and stall['since'] is not None:
+            result['stall_seconds'] += now - stall['since']
+            stall['since'] = None
+
+    cpu, rss, peak_rss = [], [], 0.0
+    try:
+        if not ipc.connect(wait=5.0):
+            return dict(result, status='failed_to_start', error=_stderr_tail(process))
+        ipc.on_event('playback-restart', on_restart)
+        ipc.observe_property('paused-for-cache', on_cache_pause)
+        try:
+            sampler = MPVProcessSampler(process.pid)
+        except ProcessLookupError:
+            return dict(result, status='crashed', error=_stderr_tail(process))
+
+        deadline = launched + first_frame_timeout
+        while not first_frame and time.monotonic() < deadline and process.poll() is None:
+            time.sleep(0.05)
+        if not first_frame:
+            status = 'crashed' if process.poll() is not None else 'no_video'
+            return dict(result, status=status, error=_stderr_tail(process) if status == 'crashed' else None)
+        result['ttff_s'] = first_frame[0] - launched
+
+        sampler.sample()  # CPU% needs a previous sample
+        measure_end = time.monotonic() + duration
+        while time.monotonic() < measure_end:
+            time.sleep(SAMPLE_INTERVAL)
+            if process.poll() is not None:
+                result['status'] = 'ended' if process.returncode == 0 else 'crashed'
+                break
+            sample = sampler.sample()
+            if not sample:
+                break
+            if sample['cpu_percent'] is not None:
+                cpu.append(sample['cpu_percent'])
+            rss.append(sample['rss_mb'])
+            peak_rss = max(peak_rss, sample['peak_rss_mb'])
+        sampler.close()
+
+        measured = time.monotonic() - first_frame[0]
+        drops = (ipc.get_property('frame-drop-count') or 0) + (ipc.get_property('decoder-frame-drop-count') or 0)
+        if stall['since'] is not None:
+            result['stall_seconds'] += time.monotonic() - stall['since']
+        result.update({
+            'seconds': round(measured, 2),
+            'cpu_percent': sum(cpu) / len(cpu) if cpu else None,
+            'rss_mb': sum(rss) / len(rss) if rss else None,
+            'peak_rss_mb': peak_rss or None,
+            'dropped_frames': drops,
+            'drops_per_minute': drops / max(measured / 60, 1 / 60),
+        })
+        if result['status'] == 'crashed':
+            result['error'] = _stderr_tail(process)
+        return result
+    finally:
+        try:
+            ipc.command('quit')
+        except Exception:
+            pass
+        ipc.close()
+        try:
+            process.wait(timeout=3)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        remove_stale_socket(socket_path)
+
+
+def _stderr_tail(process) -> Optional[str]:
+    if process.poll() is None:
+        return None
+    try:
+        return (process.stderr.read() or '').strip()[-300:] or None
+    except (OSError, ValueError):
+        return None
+
+
+def summarize(runs: List[Dict], rank_by: str) -> List[Dict]:
+    """Per-config statistics, best first; `tied` marks CIs overlapping the best"""
+    summary = {}
+    for run in runs:
+        entry = summary.setdefault(run['config'], {'config': run['config'], 'runs': 0, 'failures': 0})
+        entry['runs'] += 1
+        if run['status'] not in ('ok', 'ended'):
+            entry['failures'] += 1
+    for name, entry in summary.items():
+        ok = [r for r in runs if r['config'] == name and r['status'] in ('ok', 'ended')]
+        for metric in METRICS:
+            entry[metric] = mean_ci([r[metric] for r in ok if r.get(metric) is not None])
+
+    ranked = sorted(summary.values(),
+                    key=lambda e: (e[rank_by]['mean'] is None, e[rank_by]['mean'] or 0, e['failures']))
+    best = ranked[0][rank_by] if ranked else None
+    for entry in ranked:
+        stats = entry[rank_by]
+        if best is None or stats['mean'] is None or best['mean'] is None:
+            entry['tied'] = False
+        else:
+            # Overlapping 95% intervals - the difference is not established
+            entry['tied'] = stats['mean'] - (stats['ci95'] or 0) <= best['mean'] + (best['ci95'] or 0)
+    return ranked
+
+
+def write_csv(path: str, ranked: List[Dict]):
+    """One row per config: runs, failures, then mean/stdev/ci95 per metric"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        header = ['config', 'runs', 'failures']
+        for metric in METRICS:
+            header += [f'{metric}_mean', f'{metric}_stdev', f'{metric}_ci95', f'{metric}_n']
+        writer.writerow(header)
+        for entry in ranked:
+            row = [entry['config'], entry['runs'], entry['failures']]
+            for metric in METRICS:
+                stats = entry[metric]
+                row += ['' if stats[k] is None else round(stats[k], 4) for k in ('mean', 'stdev', 'ci95')]
+                row.append(stats['n'])
+            writer.writerow(row)
+
+
+def _fmt(stats: Dict, unit: str) -> str:
+    if stats['mean'] is None:
+        return '--'
+    ci = f" ±{stats['ci95']:.1f}" if stats['ci95'] is not None else ''
+    return f"{stats['mean']:.1f}{ci}{unit}"
+
+
+def print_summary(ranked: List[Dict], rank_by: str):
+    print(f"\n🏁 Ranked by {rank_by} (mean ± 95% CI, lower is better)")
+    for i, entry in enumerate(ranked, 1):
+        marker = '🥇' if i == 1 else ('≈ ' if entry['tied'] else '  ')
+        failures = f", {entry['failures']} failed" if entry['failures'] else ''
+        print(f"{marker} {entry['config']:<20} {entry['runs']} runs{failures}")
+        print(f"     TTFF {_fmt(entry['ttff_s'], 's')}  CPU {_fmt(entry['cpu_percent'], '%')}  "
+              f"RSS {_fmt(entry['rss_mb'], 'MB')} (peak {_fmt(entry['peak_rss_mb'], 'MB')})")
+        print(f"     stalls {_fmt(entry['stalls'], '')} ({_fmt(entry['stall_seconds'], 's')})  "
+              f"drops {_fmt(entry['drops_per_minute'], '/min')}")
+    tied = [e['config'] for e in ranked[1:] if e['tied']]
+    if tied:
+        print(f"\n≈ Not distinguishable from {ranked[0]['config']} on {rank_by}: {', '.join(tied)} "
+              f"(run more rounds to separate them)")
+
+
+def mpv_version() -> Optional[str]:
+    try:
+        result = subprocess.run(['mpv', '--version'], capture_output=True, text=True, timeout=10)
+        return result.stdout.splitlines()[0] if result.stdout else None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def main():
+    """Benchmark mpv configurations against one source"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV mpv configuration benchmark')
+    parser.add_argument('url', help='Stream or file to play (e.g. a local fixture server)')
+    parser.add_argument('--config-file', default=DEFAULT_CONFIG_FILE,
+                        help='Benchmark configs (JSON, or YAML with PyYAML)')
+    parser.add_argument('--configs', help='Comma-separated config names (default: all for this platform)')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help=f'Runs per config (default: {DEFAULT_RUNS})')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION,
+                        help=f'Seconds measured per run after the first frame (default: {DEFAULT_DURATION})')
+    parser.add_argument('--cooldown', type=float, default=COOLDOWN_SECONDS, help='Pause between runs')
+    parser.add_argument('--rank-by', choices=METRICS, default='cpu_percent', help='Metric to rank by')
+    parser.add_argument('--headless', action='store_true', help='vo=null/ao=null (no display needed)')
+    parser.add_argument('--drop-caches', action='store_true', help='Drop the page cache before each run (root)')
+    parser.add_argument('--seed', type=int, help='Shuffle seed (default: random)')
+    parser.add_argument('--json', help='Write runs and summary here')
+    parser.add_argument('--csv', help='Write the summary here')
+    parser.add_argument('--list', action='store_true', help='List the configs and exit')
+    args = parser.parse_args()
+
+    data = load_configs(args.config_file)
+    host_platform = detect_platform()
+    configs = [c for c in data['configs'] if host_platform in c.get('platforms', ('pi', 'desktop'))]
+    if args.configs:
+        wanted = args.configs.split(',')
+        configs = [c for c in data['configs'] if c['name'] in wanted]
+        missing = set(wanted) - {c['name'] for c in configs}
+        if missing:
+            raise SystemExit(f"❌ Unknown config(s): {', '.join(sorted(missing))}")
+
+    if args.list:
+        for config in configs:
+            print(f"   {config['name']:<20} {config.get('description', '')}")
+        return
+    if not configs:
+        raise SystemExit("❌ No configs to run")
+
+    version = mpv_version()
+    if not version:
+        raise SystemExit("❌ mpv is not installed")
+    rng = random.Random(args.seed)
+    total = len(configs) * args.runs
+    print(f"🎬 {len(configs)} configs × {args.runs} runs × {args.duration:.0f}s on {host_platform} ({version})")
+    print(f"   Source: {args.url}")
+    if args.drop_caches and os.geteuid() != 0:
+        print("⚠️ --drop-caches needs root - continuing without it")
+        args.drop_caches = False
+
+    runs = []
+    for round_number in range(args.runs):
+        order = list(configs)
+        rng.shuffle(order)
+        for config in order:
+            if args.drop_caches:
+                drop_page_cache()
+            options = resolve_options(config, data.get('base', {}), args.url, args.headless)
+            run = run_once(config, options, args.url, args.duration)
+            run['round'] = round_number + 1
+            runs.append(run)
+            detail = (f"TTFF {run['ttff_s']:.2f}s, CPU {run['cpu_percent'] or 0:.0f}%, "
+                      f"RSS {run['rss_mb'] or 0:.0f}MB, {run['stalls']} stalls, "
+                      f"{run['dropped_frames']} drops") if run.get('seconds') is not None else run.get('error') or ''
+            print(f"   [{len(runs)}/{total}] {config['name']}: {run['status']} {detail}")
+            time.sleep(args.cooldown)
+
+    ranked = summarize(runs, args.rank_by)
+    print_summary(ranked, args.rank_by)
+
+    if args.json:
+        report = {
+            'source': args.url,
+            'platform': host_platform,
+            'machine': platform.machine(),
+            'mpv': version,
+            'runs_per_config': args.runs,
+            'duration': args.duration,
+            'rank_by': args.rank_by,
+            'configs': {c['name']: resolve_options(c, data.get('base', {}), args.url, args.headless)
+                        for c in configs},
+            'summary': ranked,
+            'runs': runs,
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 JSON: {args.json}")
+    if args.csv:
+        write_csv(args.csv, ranked)
+        print(f"💾 CSV: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+MPV JSON IPC Client for GrannyTV
+Talks to mpv over its --input-ipc-server Unix socket
+
+A background reader thread matches command replies to requests and
+dispatches property-change notifications, so the player can watch
+playback state without polling.
+"""
+
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_SOCKET = '/tmp/grannytv-mpv.sock'
+
+
+class MPVIPCError(Exception):
+    """Raised when mpv rejects a command or the socket is gone"""
+
+
+class MPVIPCClient:
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 2.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.sock = None
+        self.reader = None
+        self.connected = False
+        self._request_ids = itertools.count(1)
+        self._observer_ids = itertools.count(1)
+        self._pending = {}
+        self._observers = {}
+        self._event_handlers = {}
+        self._send_lock = threading.Lock()
+
+    def connect(self, wait: float = 5.0) -> bool:
+        """Connect to mpv's socket, waiting up to `wait` seconds for it to appear"""
+        if not hasattr(socket, 'AF_UNIX'):
+            return False  # Windows named pipes are not supported
+
+        deadline = time.time() + wait
+        while True:
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.socket_path)
+                break
+            except OSError:
+                sock.close()
+                if time.time() >= deadline:
+                    return False
+                time.sleep(0.1)
+
+        self.sock = sock
+        self.connected = True
+        self.reader = threading.Thread(target=self._read_loop, name='mpv-ipc', daemon=True)
+        self.reader.start()
+        return True
+
+    def close(self):
+        """Close the socket; pending commands fail"""
+        self.connected = False
+        if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+        for waiter in list(self._pending.values()):
+            waiter['event'].set()
+
+    def _read_loop(self):
+        """Dispatch replies and events until the socket closes"""
+        buffer = b''
+        try:
+            while self.connected:
+                chunk = self.sock.recv(65536)
+                if not chunk:
+                    break
+                buffer += chunk
+                while b'\n' in buffer:
+                    line, buffer = buffer.split(b'\n', 1)
+                    if line.strip():
+                        self._dispatch(json.loads(line))
+        except (OSError, ValueError, AttributeError):
+            pass
+        finally:
+            self.connected = False
+            for waiter in list(self._pending.values()):
+                waiter['event'].set()
+
+    def _dispatch(self, message: Dict):
+        """Route one message from mpv"""
+        if 'request_id' in message and 'event' not in message:
+            waiter = self._pending.get(message['request_id'])
+            if waiter:
+                waiter['reply'] = message
+                waiter['event'].set()
+            return
+
+        event = message.get('event')
+        if event == 'property-change':
+            callback = self._observers.get(message.get('id'))
+            if callback:
+                self._safe_call(callback, message.get('name'), message.get('data'))
+        elif event:
+            for callback in self._event_handlers.get(event, []):
+                self._safe_call(callback, message)
+
+    @staticmethod
+    def _safe_call(callback, *args):
+        """Callbacks must never kill the reader thread"""
+        try:
+            callback(*args)
+        except Exception:
+            pass
+
+    def command(self, *args) -> Any:
+        """Run an mpv command and return its data (raises MPVIPCError)"""
+        if not self.connected:
+            raise MPVIPCError('not connected')
+
+        request_id = next(self._request_ids)
+        waiter = {'event': threading.Event(), 'reply': None}
+        self._pending[request_id] = waiter
+        payload = json.dumps({'command': list(args), 'request_id': request_id}) + '\n'
+        try:
+            with self._send_lock:
+                self.sock.sendall(payload.encode('utf-8'))
+            if not waiter['event'].wait(self.timeout) or waiter['reply'] is None:
+                raise MPVIPCError(f'no reply to {args[0]}')
+        except OSError as e:
+            self.connected = False
+            raise MPVIPCError(str(e))
+        finally:
+            self._pending.pop(request_id, None)
+
+        reply = waiter['reply']
+        if reply.get('error') != 'success':
+            raise MPVIPCError(reply.get('error', 'unknown error'))
+        return reply.get('data')
+
+    def get_property(self, name: str, default: Any = None) -> Any:
+        """Read a property, returning default if unavailable"""
+        try:
+            return self.command('get_property', name)
+        except MPVIPCError:
+            return default
+
+    def set_property(self, name: str, value: Any) -> bool:
+        """Set a property at runtime"""
+        try:
+            self.command('set_property', name, value)
+            return True
+        except MPVIPCError:
+            return False
+
+    def observe_property(self, name: str, callback: Callable[[str, Any], None]) -> Optional[int]:
+        """Call callback(name, value) whenever the property changes"""
+        observer_id = next(self._observer_ids)
+        self._observers[observer_id] = callback
+        try:
+            self.command('observe_property', observer_id, name)
+            return observer_id
+        except MPVIPCError:
+            self._observers.pop(observer_id, None)
+            return None
+
+    def unobserve_property(self, observer_id: int):
+        """Stop notifications; safe to call from inside an observer callback"""
+        self._observers.pop(observer_id, None)
+        if not self.connected:
+            return
+        # Fire-and-forget: waiting for the reply from a callback would block
+        # the reader thread that has to deliver it
+        payload = json.dumps({'command': ['unobserve_property', observer_id],
+                              'request_id': next(self._request_ids)}) + '\n'
+        try:
+            with self._send_lock:
+                self.sock.sendall(payload.encode('utf-8'))
+        except (OSError, AttributeError):
+            pass
+
+    def on_event(self, event: str, callback: Callable[[Dict], None]):
+        """Call callback(message) for every mpv event of this name"""
+        self._event_handlers.setdefault(event, []).append(callback)
+
+
+def remove_stale_socket(socket_path: str = DEFAULT_SOCKET):
+    """Remove a socket left behind by a killed mpv"""
+    try:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+    except OSError:
+        pass
@@ -9,10 +9,32 @@ import subprocess
 import time
 from datetime import datetime
 
+from metrics_store import MetricsStore
+from mpv_ipc import DEFAULT_SOCKET, MPVIPCClient
+from proc_sampler import DEFAULT_PIDFILE, MPVProcessTracker
+from sysfs_collectors import SystemCollector
+from thermal_guard import STATE_IMMINENT, STATE_THROTTLED, ThermalGuard
+
+REPORT_INTERVAL = 30  # Seconds between status lines (mpv is sampled every second)
+
 class IPTVPerformanceMonitor:
-    def __init__(self):
+    def __init__(self, pidfile=DEFAULT_PIDFILE, ipc_socket=DEFAULT_SOCKET,
+                 history_file="metrics_history.bin"):
         self.monitoring = True
         self.log_file = "performance_monitor.log"
+        self.mpv_tracker = MPVProcessTracker(pidfile, ipc_socket)
+        self.system_collector = SystemCollector()
+        self.gpu_mem_mb = None
+        self.thermal_guard = ThermalGuard()
+        
+        # Queryable 1s/1m/1h history at a fixed memory cost
+        self.history = MetricsStore(history_file)
+        
+        # mpv IPC for buffer level and dropped frames
+        self.ipc_socket = ipc_socket
+        self.ipc = None
+        self.next_ipc_attempt = 0
+        self.last_drop_count = None
         
     def log(self, message):
         """Log message with timestamp"""
@@ -23,65 +45,101 @@ class IPTVPerformanceMonitor:
         with open(self.log_file, 'a') as f:
             f.write(log_entry + "\n")
     
-    def get_system_metrics(self):
-        """Get current system performance metrics"""
-        try:
-            # CPU usage
-            cpu_percent = psutil.cpu_percent(interval=1)
-            cpu_freq = psutil.cpu_freq()
-            
-            # Memory usage
-            memory = psutil.virtual_memory()
-            
-            # Network usage
-            network = psutil.net_io_counters()
-            
-            # GPU temperature (Pi specific)
-            gpu_temp = None
-            try:
-                result = subprocess.run(['vcgencmd', 'measure_temp'], 
-                                      capture_output=True, text=True, timeout=2)
-                if result.returncode == 0:
-                    gpu_temp = float(result.stdout.split('=')[1].split("'")[0])
-            except Exception:
-                pass
-            
-            # GPU memory (Pi specific)
-            gpu_mem = None
+    def read_gpu_mem(self):
+        """GPU memory split (Pi specific) - fixed at boot, so read once"""
+        if self.gpu_mem_mb is None:
             try:
                 result = subprocess.run(['vcgencmd', 'get_mem', 'gpu'], 
                                       capture_output=True, text=True, timeout=2)
                 if result.returncode == 0:
-                    gpu_mem = int(result.stdout.split('=')[1].split('M')[0])
+                    self.gpu_mem_mb = int(result.stdout.split('=')[1].split('M')[0])
             except Exception:
                 pass
-            
+            self.gpu_mem_mb = self.gpu_mem_mb or 0
+        return self.gpu_mem_mb or None
+    
+    def get_system_metrics(self):
+        """Get current system performance metrics (non-blocking; rates since last call)"""
+        try:
+            sample = self.system_collector.sample()
             return {
                 'timestamp': datetime.now().isoformat(),
-                'cpu_percent': cpu_percent,
-                'cpu_freq_current': cpu_freq.current if cpu_freq else None,
-                'memory_percent': memory.percent,
-                'memory_available_mb': memory.available / 1024 / 1024,
-                'network_bytes_sent': network.bytes_sent,
-                'network_bytes_recv': network.bytes_recv,
-                'gpu_temp': gpu_temp,
-                'gpu_mem_mb': gpu_mem
+                'cpu_percent': sample['cpu_percent'] or 0.0,
+                'cpu_freq_current': sample['cpu_freq_mhz'],
+                'memory_percent': sample['memory_percent'] or 0.0,
+                'memory_available_mb': sample['memory_available_mb'],
+                'network_bytes_sent': sample['network_bytes_sent'],
+                'network_bytes_recv': sample['network_bytes_recv'],
+                'network_recv_mbps': sample['network_recv_mbps'] or 0.0,
+                'gpu_temp': sample['temp_c'],
+                'gpu_mem_mb': self.read_gpu_mem()
             }
         except Exception as e:
             self.log(f"Error getting metrics: {e}")
             return None
     
-    def find_vlc_process(self):
-        """Find running VLC process"""
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'cpu_percent', 'memory_percent']):
-            try:
-                if proc.info['name'] == 'vlc':
-                    return proc.info
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-        return None
+    def sample_mpv_process(self):
+        """Sample the player's mpv (located via pidfile/IPC, handle cached)"""
+        return self.mpv_tracker.sample()
     
-    def analyze_performance(self, metrics, vlc_process):
+    @staticmethod
+    def summarize_mpv_samples(samples):
+        """Average CPU and peak memory over one report interval"""
+        if not samples:
+            return None
+        cpu_values = [s['cpu_percent'] for s in samples if s['cpu_percent'] is not None]
+        last = samples[-1]
+        return {
+            'pid': last['pid'],
+            'cpu_percent': sum(cpu_values) / len(cpu_values) if cpu_values else 0.0,
+            'cpu_peak': max(cpu_values) if cpu_values else 0.0,
+            'rss_mb': max(s['rss_mb'] for s in samples),
+            'pss_mb': last['pss_mb'],
+            'threads': last['threads'],
+            'major_faults': last['major_faults'],
+        }
+    
+    def read_playback_state(self):
+        """Buffered seconds and frames dropped since the last call, via mpv IPC"""
+        if not self.ipc_socket:
+            return None, None
+        if not (self.ipc and self.ipc.connected):
+            if time.time() < self.next_ipc_attempt:
+                return None, None
+            self.next_ipc_attempt = time.time() + 5
+            self.ipc = MPVIPCClient(self.ipc_socket, timeout=0.5)
+            if not self.ipc.connect(wait=0):
+                self.ipc = None
+                return None, None
+            self.last_drop_count = None
+        
+        cache_secs = self.ipc.get_property('demuxer-cache-duration')
+        drop_count = self.ipc.get_property('frame-drop-count')
+        dropped = None
+        if drop_count is not None:
+            if self.last_drop_count is not None and drop_count >= self.last_drop_count:
+                dropped = drop_count - self.last_drop_count
+            self.last_drop_count = drop_count
+        return cache_secs, dropped
+    
+    def record_history(self, metrics, mpv_sample):
+        """Add one 1-second sample to the metrics history"""
+        cache_secs, dropped = self.read_playback_state()
+        self.history.add({
+            'cpu_percent': metrics['cpu_percent'],
+            'temp_c': metrics['gpu_temp'],
+            'mpv_rss_mb': mpv_sample['rss_mb'] if mpv_sample else None,
+            'network_recv_mbps': metrics['network_recv_mbps'],
+            'cache_secs': cache_secs,
+            'dropped_frames': dropped,
+        })
+    
+    def recent_average(self, metric, seconds=REPORT_INTERVAL):
+        """Mean of the 1s history over the last report interval"""
+        values = [v for _, v in self.history.query(metric, time.time() - seconds, tier='1s')]
+        return sum(values) / len(values) if values else None
+    
+    def analyze_performance(self, metrics, mpv_process):
         """Analyze performance and provide suggestions"""
         suggestions = []
         
@@ -91,11 +149,22 @@ class IPTVPerformanceMonitor:
         if metrics['memory_percent'] > 85:
             suggestions.append("HIGH MEMORY: Consider restarting system or closing other apps")
         
-        if metrics['gpu_temp'] and metrics['gpu_temp'] > 75:
-            suggestions.append(f"HIGH GPU TEMP ({metrics['gpu_temp']}°C): Improve cooling")
+        thermal = metrics.get('thermal') or {}
+        if thermal.get('state') == STATE_THROTTLED:
+            suggestions.append(f"CPU THROTTLED at {thermal['temp_c']}°C: Improve cooling - decode is slowing down")
+        elif thermal.get('state') == STATE_IMMINENT:
+            suggestions.append(f"THROTTLING IMMINENT ({thermal['temp_c']}°C, "
+                               f"{thermal['slope_c_per_min'] or 0:+.1f}°C/min): Improve cooling")
+        if thermal.get('under_voltage'):
+            suggestions.append("UNDER-VOLTAGE: Use a better power supply (causes throttling and SD errors)")
+        if thermal.get('stuttering') and thermal.get('state') != 'ok':
+            suggestions.append("Frame drops line up with thermal throttling")
         
-        if vlc_process and vlc_process['cpu_percent'] > 50:
-            suggestions.append("VLC HIGH CPU: Stream may be CPU-intensive")
+        if mpv_process and mpv_process['cpu_percent'] > 50:
+            suggestions.append("MPV HIGH CPU: Stream may be CPU-intensive")
+        
+        if mpv_process and mpv_process['rss_mb'] > 180:
+            suggestions.append(f"MPV HIGH MEMORY ({mpv_process['rss_mb']:.0f}MB): close to the service MemoryHigh limit")
         
         return suggestions
     
@@ -107,26 +176,36 @@ class IPTVPerformanceMonitor:
         start_time = time.time()
         end_time = start_time + (duration_minutes * 60)
         
-        last_network_recv = 0
+        mpv_samples = []
+        next_report = time.time() + REPORT_INTERVAL
         
         while time.time() < end_time and self.monitoring:
             try:
-                # Get system metrics
+                # Everything is sampled every second into the history;
+                # a status line is logged once per report interval
+                tick = time.time()
                 metrics = self.get_system_metrics()
-                if not metrics:
-                    time.sleep(30)
-                    continue
+                sample = self.sample_mpv_process()
+                if sample:
+                    mpv_samples.append(sample)
+                if metrics:
+                    self.record_history(metrics, sample)
                 
-                # Find VLC process
-                vlc_process = self.find_vlc_process()
+                if tick < next_report or not metrics:
+                    time.sleep(max(0, 1 - (time.time() - tick)))
+                    continue
+                next_report = tick + REPORT_INTERVAL
                 
-                # Calculate network speed
-                network_speed_mbps = 0
-                if last_network_recv > 0:
-                    bytes_diff = metrics['network_bytes_recv'] - last_network_recv
-                    network_speed_mbps = (bytes_diff * 8) / (30 * 1024 * 1024)  # 30 second interval
+                mpv_process = self.summarize_mpv_samples(mpv_samples)
+                mpv_samples = []
+                ipc = self.ipc if self.ipc and self.ipc.connected else None
+                metrics['thermal'] = self.thermal_guard.check(
+                    ipc.get_property('frame-drop-count') if ipc else None,
+                    ipc.get_property('avsync') if ipc else None)
                 
-                last_network_recv = metrics['network_bytes_recv']
+                # CPU and network averaged over the report interval
+                metrics['cpu_percent'] = self.recent_average('cpu_percent') or metrics['cpu_percent']
+                network_speed_mbps = self.recent_average('network_recv_mbps') or 0.0
                 
                 # Log current status
                 status = f"CPU: {metrics['cpu_percent']:.1f}% | "
@@ -136,13 +215,18 @@ class IPTVPerformanceMonitor:
                 if metrics['gpu_temp']:
                     status += f" | GPU: {metrics['gpu_temp']:.1f}°C"
                 
-                if vlc_process:
-                    status += f" | VLC: {vlc_process['cpu_percent']:.1f}% CPU"
+                cache_secs = self.recent_average('cache_secs')
+                if cache_secs is not None:
+                    status += f" | Cache: {cache_secs:.1f}s"
+                
+                if mpv_process:
+                    status += (f" | MPV: {mpv_process['cpu_percent']:.1f}% CPU "
+                               f"(peak {mpv_process['cpu_peak']:.0f}%), {mpv_process['rss_mb']:.0f}MB")
                 
                 self.log(f"📊 {status}")
                 
                 # Analyze and provide suggestions
-                suggestions = self.analyze_performance(metrics, vlc_process)
+                suggestions = self.analyze_performance(metrics, mpv_process)
                 for suggestion in suggestions:
                     self.log(f"💡 {suggestion}")
                 
@@ -153,18 +237,21 @@ class IPTVPerformanceMonitor:
                 if metrics['memory_percent'] > 95:
                     self.log("🚨 CRITICAL: Memory usage extremely high!")
                 
-                if not vlc_process:
-                    self.log("⚠️ WARNING: VLC process not found")
-                
-                time.sleep(30)  # Check every 30 seconds
+                if not mpv_process:
+                    self.log("⚠️ WARNING: MPV process not found")
                 
             except KeyboardInterrupt:
                 self.log("📊 Monitoring stopped by user")
                 break
             except Exception as e:
                 self.log(f"❌ Error during monitoring: {e}")
-                time.sleep(30)
+                time.sleep(REPORT_INTERVAL)
         
+        self.mpv_tracker.close()
+        self.system_collector.close()
+        self.history.close()
+        if self.ipc:
+            self.ipc.close()
         self.log("✅ Performance monitoring completed")
     
     def system_optimization_check(self):
@@ -172,17 +259,12 @@ class IPTVPerformanceMonitor:
         self.log("🔧 System Optimization Check")
         
         # Check GPU memory
-        try:
-            result = subprocess.run(['vcgencmd', 'get_mem', 'gpu'], 
-                                  capture_output=True, text=True, timeout=2)
-            if result.returncode == 0:
-                gpu_mem = int(result.stdout.split('=')[1].split('M')[0])
-                if gpu_mem < 128:
-                    self.log(f"💡 GPU memory is {gpu_mem}MB - consider increasing to 128MB+")
-                else:
-                    self.log(f"✅ GPU memory: {gpu_mem}MB (good)")
-        except Exception:
-            pass
+        gpu_mem = self.read_gpu_mem()
+        if gpu_mem:
+            if gpu_mem < 128:
+                self.log(f"💡 GPU memory is {gpu_mem}MB - consider increasing to 128MB+")
+            else:
+                self.log(f"✅ GPU memory: {gpu_mem}MB (good)")
         
         # Check network settings
         try:
@@ -199,7 +281,7 @@ class IPTVPerformanceMonitor:
         high_cpu_processes = []
         for proc in psutil.process_iter(['pid', 'name', 'cpu_percent']):
             try:
-                if proc.info['cpu_percent'] > 10 and proc.info['name'] != 'vlc':
+                if proc.info['cpu_percent'] > 10 and proc.info['name'] != 'mpv':
                     high_cpu_processes.append(f"{proc.info['name']} ({proc.info['cpu_percent']:.1f}%)")
             except Exception:
                 continue
@@ -217,10 +299,16 @@ def main():
                        help='Monitoring duration in minutes (default: 60)')
     parser.add_argument('--check-only', '-c', action='store_true',
                        help='Only perform optimization check')
+    parser.add_argument('--pidfile', default=DEFAULT_PIDFILE,
+                       help=f'mpv pidfile written by the player (default: {DEFAULT_PIDFILE})')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET,
+                       help=f'mpv IPC socket for cache/dropped frames (default: {DEFAULT_SOCKET})')
+    parser.add_argument('--history', default='metrics_history.bin',
+                       help='Metrics history snapshot file (default: metrics_history.bin)')
     
     args = parser.parse_args()
     
-    monitor = IPTVPerformanceMonitor()
+    monitor = IPTVPerformanceMonitor(args.pidfile, args.socket, args.history)
     
     if args.check_only:
         monitor.system_optimization_check()
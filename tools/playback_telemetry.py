@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Playback Telemetry for GrannyTV
+Frame drops and A/V sync sampled from mpv, kept per stream and per session
+
+--framedrop=vo keeps the picture moving when decode can't keep up, so an
+overloaded stream looks "fine" to the health check. A sampler thread reads
+mpv's drop counters, avsync, estimated fps and bitrate over IPC, and each
+session is reduced to a small aggregate stored with the stream. The
+aggregates become a ranking penalty. Streams (and codec/resolution classes)
+the Pi can't keep up with sink in the channel order.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+SAMPLE_INTERVAL = 2.0
+SESSIONS_KEPT = 10            # Per stream
+MIN_SECONDS_TO_JUDGE = 60     # Ignore sessions too short to say anything
+DROPS_PER_MINUTE_OK = 6       # Occasional drops are invisible
+PENALTY_PER_DROP_PER_MINUTE = 2
+AVSYNC_BAD_SECONDS = 0.1
+AVSYNC_PENALTY = 20
+MAX_PENALTY = 80              # Freshness scores top out at 100
+
+
+def stream_class(codec: Optional[str], height: Optional[int]) -> Optional[str]:
+    """Codec/resolution class used to judge streams we haven't played yet"""
+    if not codec or not height:
+        return None
+    return f"{codec.lower()}/{height}p"
+
+
+class SessionTelemetry:
+    """Samples one mpv instance in a daemon thread until stopped"""
+
+    def __init__(self, ipc, interval: float = SAMPLE_INTERVAL):
+        self.ipc = ipc
+        self.interval = interval
+        self.started = time.time()
+        self.samples = 0
+        self.last_counts = None
+        self.vo_drops = self.decoder_drops = 0
+        self.file_reloaded = False
+        self.avsync_sum = 0.0
+        self.avsync_max = 0.0
+        self.avsync_samples = 0
+        self.fps_sum = 0.0
+        self.fps_samples = 0
+        self.bitrate_sum = 0.0
+        self.bitrate_samples = 0
+        self.codec = None
+        self.width = self.height = None
+        self.container_fps = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='telemetry', daemon=True)
+        # A loadfile (e.g. the thermal variant switch) resets mpv's counters
+        # and may change codec/resolution
+        ipc.on_event('file-loaded', self._on_file_loaded)
+
+    def _on_file_loaded(self, message):
+        # Runs on the IPC reader thread - just flag it, sample() does the reads
+        self.file_reloaded = True
+        self.codec = None
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            if not self.ipc.connected:
+                break
+            self.sample()
+
+    def sample(self):
+        ipc = self.ipc
+        if self.codec is None:
+            self.codec = ipc.get_property('video-format')
+            self.width = ipc.get_property('width')
+            self.height = ipc.get_property('height')
+            self.container_fps = ipc.get_property('container-fps')
+
+        reloaded, self.file_reloaded = self.file_reloaded, False
+        vo_drops = ipc.get_property('frame-drop-count')
+        decoder_drops = ipc.get_property('decoder-frame-drop-count')
+        if vo_drops is not None or decoder_drops is not None:
+            counts = (vo_drops or 0, decoder_drops or 0)
+            if self.last_counts is not None:
+                # A counter that went down (or a new file) was reset - everything since is new
+                deltas = [count if reloaded or count < last else count - last
+                          for count, last in zip(counts, self.last_counts)]
+                self.vo_drops += deltas[0]
+                self.decoder_drops += deltas[1]
+            self.last_counts = counts
+
+        avsync = ipc.get_property('avsync')
+        if isinstance(avsync, (int, float)):
+            self.avsync_sum += abs(avsync)
+            self.avsync_max = max(self.avsync_max, abs(avsync))
+            self.avsync_samples += 1
+        fps = ipc.get_property('estimated-vf-fps')
+        if isinstance(fps, (int, float)) and fps > 0:
+            self.fps_sum += fps
+            self.fps_samples += 1
+        bitrate = ipc.get_property('video-bitrate')
+        if isinstance(bitrate, (int, float)) and bitrate > 0:
+            self.bitrate_sum += bitrate
+            self.bitrate_samples += 1
+        self.samples += 1
+
+    def stop(self) -> Dict:
+        """Stop sampling and return the session aggregate"""
+        self.stop_event.set()
+        vo_drops, decoder_drops = self.vo_drops, self.decoder_drops
+        seconds = time.time() - self.started
+        minutes = max(seconds / 60, 1 / 60)
+        return {
+            'ended': time.time(),
+            'seconds': round(seconds, 1),
+            'samples': self.samples,
+            'vo_drops': vo_drops,
+            'decoder_drops': decoder_drops,
+            'drops_per_minute': round((vo_drops + decoder_drops) / minutes, 2),
+            'avsync_mean': round(self.avsync_sum / self.avsync_samples, 4) if self.avsync_samples else None,
+            'avsync_max': round(self.avsync_max, 4),
+            'fps_mean': round(self.fps_sum / self.fps_samples, 2) if self.fps_samples else None,
+            'container_fps': self.container_fps,
+            'bitrate_kbps': round(self.bitrate_sum / self.bitrate_samples / 1000) if self.bitrate_samples else None,
+            'codec': self.codec,
+            'width': self.width,
+            'height': self.height,
+        }
+
+
+class PlaybackTelemetryStore:
+    """Per-stream session aggregates plus a precomputed ranking penalty"""
+
+    def __init__(self, state_file='stream_telemetry.json'):
+        self.state_file = state_file
+        self.streams = {}
+        self.penalties = {}
+        self.class_penalties = {}
+        self.load()
+
+    def load(self):
+        try:
+            if os.path.exists(self.state_file):
+                with open(self.state_file, 'r') as f:
+                    self.streams = json.load(f).get('streams', {})
+        except Exception:
+            self.streams = {}
+        self._recompute()
+
+    def save(self):
+        try:
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({'streams': self.streams}, f, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except OSError:
+            pass  # Read-only filesystem - telemetry stays in memory
+
+    @staticmethod
+    def session_penalty(summary: Dict) -> float:
+        """Score penalty for a stream's playback quality (0 = fine)"""
+        if summary['seconds'] < MIN_SECONDS_TO_JUDGE:
+            return 0.0
+        penalty = max(0.0, summary['drops_per_minute'] - DROPS_PER_MINUTE_OK) * PENALTY_PER_DROP_PER_MINUTE
+        if (summary.get('avsync_mean') or 0) >= AVSYNC_BAD_SECONDS:
+            penalty += AVSYNC_PENALTY
+        return min(MAX_PENALTY, penalty)
+
+    @staticmethod
+    def summarize(sessions) -> Dict:
+        """Time-weighted roll-up of a stream's sessions"""
+        seconds = sum(s['seconds'] for s in sessions)
+        drops = sum(s['vo_drops'] + s['decoder_drops'] for s in sessions)
+        avsync = [(s['avsync_mean'], s['seconds']) for s in sessions if s.get('avsync_mean') is not None]
+        avsync_weight = sum(w for _, w in avsync)
+        last = sessions[-1]
+        return {
+            'seconds': seconds,
+            'drops_per_minute': drops / max(seconds / 60, 1 / 60),
+            'avsync_mean': sum(v * w for v, w in avsync) / avsync_weight if avsync_weight else None,
+            'class': stream_class(last.get('codec'), last.get('height')),
+        }
+
+    def _recompute(self):
+        """Refresh penalties so ranking lookups are O(1)"""
+        self.penalties = {}
+        class_totals = {}
+        for url, entry in self.streams.items():
+            summary = self.summarize(entry['sessions']) if entry.get('sessions') else None
+            if not summary:
+                continue
+            entry['summary'] = summary
+            self.penalties[url] = self.session_penalty(summary)
+            if summary['class'] and summary['seconds'] >= MIN_SECONDS_TO_JUDGE:
+                totals = class_totals.setdefault(summary['class'], [0.0, 0.0])
+                totals[0] += self.penalties[url] * summary['seconds']
+                totals[1] += summary['seconds']
+        self.class_penalties = {cls: weighted / seconds for cls, (weighted, seconds) in class_totals.items()}
+
+    def record_session(self, url: str, aggregate: Dict) -> float:
+        """Store one session aggregate; returns the stream's new penalty"""
+        entry = self.streams.setdefault(url, {'sessions': []})
+        entry['sessions'] = (entry['sessions'] + [aggregate])[-SESSIONS_KEPT:]
+        self._recompute()
+        self.save()
+        return self.penalties.get(url, 0.0)
+
+    def penalty(self, url: str, decode_info: Optional[Dict] = None) -> float:
+        """Ranking penalty: the stream's own history, else its codec/resolution class"""
+        if url in self.penalties:
+            return self.penalties[url]
+        if decode_info:
+            cls = stream_class(decode_info.get('codec'), decode_info.get('height'))
+            return self.class_penalties.get(cls, 0.0)
+        return 0.0
+
+
+def main():
+    """Show recorded playback telemetry"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV playback telemetry')
+    parser.add_argument('--state-file', default='stream_telemetry.json',
+                        help='Telemetry file (default: stream_telemetry.json)')
+    args = parser.parse_args()
+
+    store = PlaybackTelemetryStore(args.state_file)
+    if not store.streams:
+        print("No playback telemetry recorded yet")
+        return
+    print("🎞️ Streams (worst first):")
+    for url in sorted(store.streams, key=lambda u: store.penalties.get(u, 0), reverse=True):
+        summary = store.streams[url].get('summary')
+        if not summary:
+            continue
+        avsync = f"{summary['avsync_mean'] * 1000:.0f}ms" if summary['avsync_mean'] is not None else '--'
+        print(f"   {url[:60]}: {summary['drops_per_minute']:.1f} drops/min, avsync {avsync}, "
+              f"{summary['seconds'] / 60:.0f} min, {summary['class'] or '?'} -> penalty {store.penalties[url]:.0f}")
+    if store.class_penalties:
+        print("📉 Codec/resolution classes:")
+        for cls, penalty in sorted(store.class_penalties.items(), key=lambda item: -item[1]):
+            print(f"   {cls}: penalty {penalty:.0f}")
+
+
+if __name__ == "__main__":
+    main()
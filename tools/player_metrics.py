@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Player Metrics Endpoint for GrannyTV
+Serves player and system state in Prometheus text format
+
+The player updates an in-memory PlayerMetrics as things happen (launches,
+stalls, first frames) and from its regular monitoring loop (CPU, RSS,
+temperature). A scrape only renders that state - nothing is measured per
+request, so scraping every few seconds costs next to nothing. Serves on
+localhost TCP by default, or on a Unix socket.
+"""
+
+import os
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Optional
+
+DEFAULT_PORT = 9110
+TTFF_BUCKETS = (0.5, 1, 2, 3, 5, 8, 13, 20, 30)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else f'{value:.4f}'.rstrip('0')
+
+
+def _labels(labels: Dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + '}'
+
+
+class PlayerMetrics:
+    """Thread-safe counters, gauges and a TTFF histogram"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}   # (name, labels tuple) -> value
+        self.gauges = {}
+        self.ttff_counts = [0] * len(TTFF_BUCKETS)
+        self.ttff_sum = 0.0
+        self.ttff_count = 0
+        self.stream_info = None
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name: str, value: Optional[float], **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if value is None:
+                self.gauges.pop(key, None)
+            else:
+                self.gauges[key] = value
+
+    def observe_ttff(self, seconds: float):
+        with self.lock:
+            for i, bound in enumerate(TTFF_BUCKETS):
+                if seconds <= bound:
+                    self.ttff_counts[i] += 1
+            self.ttff_sum += seconds
+            self.ttff_count += 1
+
+    def set_stream(self, url: Optional[str], name: Optional[str] = None, profile: Optional[str] = None):
+        with self.lock:
+            self.stream_info = {'url': url, 'name': name or '', 'profile': profile or ''} if url else None
+
+    def render(self) -> str:
+        """Prometheus text exposition of the current state"""
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            ttff_counts = list(self.ttff_counts)
+            ttff_sum, ttff_count = self.ttff_sum, self.ttff_count
+            stream_info = self.stream_info
+
+        lines = [
+            '# HELP grannytv_uptime_seconds Seconds since the player started',
+            '# TYPE grannytv_uptime_seconds gauge',
+            f'grannytv_uptime_seconds {time.time() - self.started:.0f}',
+            '# HELP grannytv_stream_info Stream currently playing',
+            '# TYPE grannytv_stream_info gauge',
+        ]
+        if stream_info:
+            lines.append(f'grannytv_stream_info{_labels(stream_info)} 1')
+
+        for kind, values in (('counter', counters), ('gauge', gauges)):
+            typed = set()
+            for (name, labels), value in sorted(values.items()):
+                if name not in typed:
+                    lines.append(f'# TYPE grannytv_{name} {kind}')
+                    typed.add(name)
+                lines.append(f'grannytv_{name}{_labels(dict(labels))} {_number(value)}')
+
+        lines += [
+            '# HELP grannytv_ttff_seconds Time from mpv launch to first frame',
+            '# TYPE grannytv_ttff_seconds histogram',
+        ]
+        for bound, count in zip(TTFF_BUCKETS, ttff_counts):
+            lines.append(f'grannytv_ttff_seconds_bucket{{le="{bound:g}"}} {count}')
+        lines += [
+            f'grannytv_ttff_seconds_bucket{{le="+Inf"}} {ttff_count}',
+            f'grannytv_ttff_seconds_sum {ttff_sum:.3f}',
+            f'grannytv_ttff_seconds_count {ttff_count}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the player log
+
+
+class _TCPMetricsServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UnixMetricsServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ('unix', 0)  # BaseHTTPRequestHandler expects a (host, port) address
+
+
+class MetricsServer:
+    """Serves PlayerMetrics from a daemon thread"""
+
+    def __init__(self, metrics: PlayerMetrics, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 socket_path: Optional[str] = None):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.server = None
+        self.thread = None
+
+    @property
+    def address(self) -> str:
+        return f"unix:{self.socket_path}" if self.socket_path else f"http://{self.host}:{self.port}/metrics"
+
+    def start(self) -> bool:
+        try:
+            if self.socket_path and hasattr(socket, 'AF_UNIX'):
+                if os.path.exists(self.socket_path):
+                    os.unlink(self.socket_path)
+                self.server = _UnixMetricsServer(self.socket_path, _MetricsHandler)
+            else:
+                self.socket_path = None
+                self.server = _TCPMetricsServer((self.host, self.port), _MetricsHandler)
+        except OSError:
+            self.server = None
+            return False
+        self.server.metrics = self.metrics
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics', daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.socket_path:
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+
+def main():
+    """Fetch and print the player's metrics"""
+    import argparse
+    import urllib.request
+
+    parser = argparse.ArgumentParser(description='GrannyTV player metrics')
+    parser.add_argument('--url', default=f'http://127.0.0.1:{DEFAULT_PORT}/metrics',
+                        help='Metrics endpoint')
+    args = parser.parse_args()
+
+    try:
+        with urllib.request.urlopen(args.url, timeout=3) as response:
+            print(response.read().decode('utf-8'), end='')
+    except OSError as e:
+        print(f"❌ Cannot reach {args.url}: {e}")
+
+
+if __name__ == "__main__":
+    main()
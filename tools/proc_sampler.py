@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Low-overhead mpv Process Sampler for GrannyTV
+Samples the player's mpv straight from /proc with persistent file handles
+
+The mpv PID comes from the player's pidfile (or mpv's own IPC `pid`
+property), so there is no process-table walk per sample. The /proc
+files are opened once and re-read with pread(), which keeps a 1 Hz
+sample cheap enough to leave running on a Pi 3.
+"""
+
+import errno
+import os
+import time
+from typing import Dict, Optional
+
+DEFAULT_PIDFILE = '/tmp/grannytv-mpv.pid'
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+READ_SIZE = 4096
+
+
+def write_pidfile(pid: int, pidfile: str = DEFAULT_PIDFILE):
+    """Publish mpv's PID for monitors (atomic)"""
+    try:
+        tmp_file = f"{pidfile}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(f"{pid}\n")
+        os.replace(tmp_file, pidfile)
+    except OSError:
+        pass
+
+
+def remove_pidfile(pidfile: str = DEFAULT_PIDFILE):
+    try:
+        os.unlink(pidfile)
+    except OSError:
+        pass
+
+
+def _is_mpv(pid: int) -> bool:
+    try:
+        with open(f'/proc/{pid}/comm', 'r') as f:
+            return f.read().strip() == 'mpv'
+    except OSError:
+        return False
+
+
+def find_mpv_pid(pidfile: str = DEFAULT_PIDFILE, ipc_socket: Optional[str] = None) -> Optional[int]:
+    """Locate the player's mpv without scanning the process table"""
+    try:
+        with open(pidfile, 'r') as f:
+            pid = int(f.read().strip())
+        if _is_mpv(pid):
+            return pid
+    except (OSError, ValueError):
+        pass
+
+    if ipc_socket:
+        from mpv_ipc import MPVIPCClient
+        client = MPVIPCClient(ipc_socket, timeout=1.0)
+        if client.connect(wait=0):
+            try:
+                pid = client.get_property('pid')
+            finally:
+                client.close()
+            if isinstance(pid, int) and _is_mpv(pid):
+                return pid
+    return None
+
+
+class MPVProcessSampler:
+    """Reads /proc/<pid>/{stat,status,io,smaps_rollup} through held file descriptors"""
+
+    FILES = ('stat', 'status', 'io', 'smaps_rollup')
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.fds = {}
+        for name in self.FILES:
+            try:
+                self.fds[name] = os.open(f'/proc/{pid}/{name}', os.O_RDONLY)
+            except OSError:
+                pass  # io needs same-user/ptrace rights, smaps_rollup needs Linux 4.14+
+        if 'stat' not in self.fds:
+            self.close()
+            raise ProcessLookupError(pid)
+
+        self.start_time = self._parse_stat(self._read('stat'))['starttime']
+        self.last_cpu_ticks = None
+        self.last_wall = None
+
+    @property
+    def alive(self) -> bool:
+        return bool(self.fds)
+
+    def close(self):
+        for fd in self.fds.values():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.fds = {}
+
+    def _read(self, name: str) -> Optional[str]:
+        fd = self.fds.get(name)
+        if fd is None:
+            return None
+        try:
+            return os.pread(fd, READ_SIZE, 0).decode('ascii', 'replace')
+        except OSError as e:
+            if e.errno in (errno.ESRCH, errno.ENOENT):
+                self.close()  # Process exited - handles now point at nothing
+                raise ProcessLookupError(self.pid)
+            return None
+
+    @staticmethod
+    def _parse_stat(text: str) -> Dict:
+        # comm may contain spaces/parens - fields start after the last ')'
+        fields = text[text.rindex(')') + 2:].split()
+        return {
+            'state': fields[0],
+            'majflt': int(fields[9]),
+            'cpu_ticks': int(fields[11]) + int(fields[12]),
+            'threads': int(fields[17]),
+            'starttime': int(fields[19]),
+        }
+
+    @staticmethod
+    def _parse_kb_fields(text: Optional[str], wanted: tuple) -> Dict[str, int]:
+        values = {}
+        if not text:
+            return values
+        for line in text.splitlines():
+            key, _, rest = line.partition(':')
+            if key in wanted:
+                values[key] = int(rest.split()[0])
+        return values
+
+    def sample(self) -> Optional[Dict]:
+        """One sample, or None once the process has gone (or the PID was reused)"""
+        if not self.fds:
+            return None
+        now = time.monotonic()
+        try:
+            stat = self._parse_stat(self._read('stat'))
+            if stat['starttime'] != self.start_time or stat['state'] in ('Z', 'X'):
+                self.close()
+                return None
+            status = self._parse_kb_fields(self._read('status'),
+                                           ('VmRSS', 'VmHWM', 'voluntary_ctxt_switches',
+                                            'nonvoluntary_ctxt_switches'))
+            io = self._parse_kb_fields(self._read('io'), ('read_bytes', 'rchar'))
+            smaps = self._parse_kb_fields(self._read('smaps_rollup'), ('Pss', 'Anonymous', 'Swap'))
+        except ProcessLookupError:
+            return None
+
+        cpu_percent = None
+        if self.last_cpu_ticks is not None and now > self.last_wall:
+            cpu_percent = ((stat['cpu_ticks'] - self.last_cpu_ticks) / CLOCK_TICKS
+                           / (now - self.last_wall) * 100)
+        self.last_cpu_ticks = stat['cpu_ticks']
+        self.last_wall = now
+
+        return {
+            'pid': self.pid,
+            'state': stat['state'],
+            'cpu_percent': cpu_percent,
+            'threads': stat['threads'],
+            'major_faults': stat['majflt'],
+            'rss_mb': status.get('VmRSS', 0) / 1024,
+            'peak_rss_mb': status.get('VmHWM', 0) / 1024,
+            'pss_mb': smaps['Pss'] / 1024 if 'Pss' in smaps else None,
+            'anon_mb': smaps['Anonymous'] / 1024 if 'Anonymous' in smaps else None,
+            'swap_mb': smaps['Swap'] / 1024 if 'Swap' in smaps else None,
+            'ctx_switches': (status.get('voluntary_ctxt_switches', 0)
+                             + status.get('nonvoluntary_ctxt_switches', 0)),
+            # rchar counts network reads too (read_bytes is block I/O only)
+            'read_bytes': io.get('rchar', io.get('read_bytes')),
+        }
+
+
+class MPVProcessTracker:
+    """Keeps a sampler attached to the current mpv, re-resolving only when it exits"""
+
+    def __init__(self, pidfile: str = DEFAULT_PIDFILE, ipc_socket: Optional[str] = None,
+                 retry_seconds: float = 5.0):
+        self.pidfile = pidfile
+        self.ipc_socket = ipc_socket
+        self.retry_seconds = retry_seconds
+        self.sampler = None
+        self.next_lookup = 0
+
+    def sample(self) -> Optional[Dict]:
+        if self.sampler:
+            result = self.sampler.sample()
+            if result:
+                return result
+            self.sampler = None  # mpv restarted - look it up again
+
+        now = time.monotonic()
+        if now < self.next_lookup:
+            return None
+        self.next_lookup = now + self.retry_seconds
+
+        pid = find_mpv_pid(self.pidfile, self.ipc_socket)
+        if pid is None:
+            return None
+        try:
+            self.sampler = MPVProcessSampler(pid)
+        except ProcessLookupError:
+            return None
+        return self.sampler.sample()
+
+    def close(self):
+        if self.sampler:
+            self.sampler.close()
+            self.sampler = None
+
+
+def main():
+    """Sample the player's mpv at 1 Hz"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV mpv process sampler')
+    parser.add_argument('--pidfile', default=DEFAULT_PIDFILE, help='mpv pidfile written by the player')
+    parser.add_argument('--socket', help='mpv IPC socket (fallback when there is no pidfile)')
+    parser.add_argument('--pid', type=int, help='Sample this PID directly')
+    parser.add_argument('--count', type=int, default=10, help='Number of samples (default: 10)')
+    args = parser.parse_args()
+
+    pid = args.pid or find_mpv_pid(args.pidfile, args.socket)
+    if not pid:
+        print("❌ mpv not found (is the player running?)")
+        return
+    sampler = MPVProcessSampler(pid)
+    print(f"🔍 Sampling mpv PID {pid}")
+
+    overhead = 0.0
+    for i in range(args.count):
+        started = time.perf_counter()
+        sample = sampler.sample()
+        overhead += time.perf_counter() - started
+        if not sample:
+            print("⚠️ mpv exited")
+            break
+        cpu = f"{sample['cpu_percent']:.1f}%" if sample['cpu_percent'] is not None else '--'
+        pss = f"{sample['pss_mb']:.1f}MB" if sample['pss_mb'] is not None else '--'
+        print(f"📊 CPU {cpu} | RSS {sample['rss_mb']:.1f}MB | PSS {pss} | "
+              f"threads {sample['threads']} | faults {sample['major_faults']}")
+        if i < args.count - 1:
+            time.sleep(1)
+    sampler.close()
+    print(f"⏱️ Sampling cost: {overhead / max(1, i + 1) * 1000:.2f} ms/sample")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,265 @@ Analyzes and optimizes stream database for maximum performance
 """
 
 import json
+import math
+import os
 import requests
+import shutil
+import subprocess
+import tempfile
+import threading
 import time
 import concurrent.futures
 import statistics
 # from urllib.parse import urlparse  # Not used currently
 from datetime import datetime
 
+from hls_playlist import (DECODE_CAPABILITIES, SEGMENT_TIMEOUT, USER_AGENT, LinkCapacityEstimator,
+                          detect_decode_profile, fetch_playlist, parse_master_playlist,
+                          parse_media_playlist, select_variant)
+
+# Decode validation defaults (tuned for a Pi 3 decoding in software)
+DECODE_FRAMES = 120             # Frames to decode per stream
+DECODE_TIMEOUT = 30             # Hard wall-clock cap per worker (seconds)
+DECODE_MEMORY_MB = 600          # Heap/anonymous-memory cap per mpv worker
+REALTIME_MARGIN = 1.2           # Must decode 20% faster than real time
+DECODE_RUNS = 2                 # A slow ratio must repeat before a stream is marked slow
+DECODE_WORKERS = 1              # One decoder at a time gets every core, as during playback
+DECODE_SAMPLE_SECONDS = 8       # Media downloaded before the decoder is timed
+DECODE_SAMPLE_MAX_BYTES = 16 * 1024 * 1024
+DECODE_INFO_MARKER = 'GRANNYTV_DECODE'
+
+
+def _limit_worker_memory(memory_mb):
+    """Return a preexec_fn that caps the child's data segment.
+
+    RLIMIT_DATA counts heap and private anonymous mappings - what a
+    runaway decoder actually allocates - but not the file-backed, GPU and
+    hwdec mappings that inflate a 64-bit mpv's virtual size.
+    """
+    def _apply():
+        try:
+            import resource
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass  # Not supported on this platform - rely on the timeout
+    return _apply
+
+
+def _parse_fps(value):
+    """Parse '30', '29.97' or '30000/1001' into a float"""
+    try:
+        if '/' in str(value):
+            num, den = str(value).split('/', 1)
+            return float(num) / float(den) if float(den) else None
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _probe_with_ffprobe(url, timeout):
+    """Codec/resolution/fps via ffprobe (no decode speed available)"""
+    result = subprocess.run([
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'stream=codec_name,width,height,avg_frame_rate',
+        '-of', 'json', url
+    ], capture_output=True, text=True, timeout=timeout)
+    streams = json.loads(result.stdout or '{}').get('streams', [])
+    if result.returncode != 0 or not streams:
+        return {'decodes': None, 'error': (result.stderr or 'no video stream').strip()[:200]}
+    video = streams[0]
+    return {
+        'decodes': True,
+        'codec': video.get('codec_name'),
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'fps': _parse_fps(video.get('avg_frame_rate')),
+        'speed_ratio': None,
+        'realtime': None,
+    }
+
+
+def fetch_decode_sample(url, path, seconds=DECODE_SAMPLE_SECONDS, timeout=DECODE_TIMEOUT,
+                        max_bytes=DECODE_SAMPLE_MAX_BYTES):
+    """Download the start of a stream to `path` so the decoder can be timed offline.
+
+    HLS streams contribute whole segments of the variant the player would
+    pick on a fast link; anything else is read until `seconds` have passed
+    (a live stream arrives at real time) or `max_bytes` were written.
+    Returns {'bytes', 'download_secs'}; network errors raise.
+    """
+    start = time.time()
+    written = 0
+
+    with open(path, 'wb') as out:
+        def copy(source_url, limit):
+            nonlocal written
+            response = requests.get(source_url, stream=True, timeout=SEGMENT_TIMEOUT,
+                                    headers={'User-Agent': USER_AGENT})
+            response.raise_for_status()
+            try:
+                for chunk in response.iter_content(64 * 1024):
+                    out.write(chunk)
+                    written += len(chunk)
+                    if written >= max_bytes or limit(time.time() - start):
+                        return False
+            finally:
+                response.close()
+            return True
+
+        if '.m3u8' in url.lower():
+            text, final_url = fetch_playlist(url)
+            variants = parse_master_playlist(text, final_url)
+            if variants:
+                variant = select_variant(variants, None, DECODE_CAPABILITIES[detect_decode_profile()])
+                text, final_url = fetch_playlist(variant['url'])
+            playlist = parse_media_playlist(text, final_url)
+            count = max(1, math.ceil(seconds / (playlist['target_duration'] or 6)))
+            segments = playlist['segments'][:count] if playlist['endlist'] else playlist['segments'][-count:]
+            if not segments:
+                raise ValueError('media playlist has no segments')
+            if playlist['init_segment']:
+                segments = [playlist['init_segment']] + segments
+            for segment in segments:
+                if not copy(segment, lambda elapsed: elapsed >= timeout):
+                    break
+        else:
+            copy(url, lambda elapsed: elapsed >= min(seconds, timeout))
+
+    return {'bytes': written, 'download_secs': round(time.time() - start, 2)}
+
+
+def _time_decode(path, frames, timeout, memory_mb, threads):
+    """Decode up to `frames` frames of a local sample as fast as possible.
+
+    Returns the stream details mpv reported, how many seconds of media
+    were decoded and the wall-clock time it took. There is no network
+    left to wait for, so the time is the decoder's (plus a local mpv exit).
+    """
+    cmd = [
+        'mpv', '--no-config', '--vo=null', '--ao=null', '--untimed', '--quiet',
+        f'--frames={frames}', f'--vd-lavc-threads={threads}',
+        f'--term-playing-msg={DECODE_INFO_MARKER}|${{video-format}}|${{width}}|${{height}}'
+        f'|${{container-fps}}|${{duration}}',
+        path
+    ]
+    popen_kwargs = {'stdout': subprocess.PIPE, 'stderr': subprocess.DEVNULL, 'text': True}
+    if os.name == 'posix':
+        popen_kwargs['preexec_fn'] = _limit_worker_memory(memory_mb)
+
+    start = time.time()
+    run = {}
+    playing_at = None
+    process = subprocess.Popen(cmd, **popen_kwargs)
+    # mpv can hang on a broken sample - the watchdog enforces the cap
+    watchdog = threading.Timer(timeout, process.kill)
+    watchdog.start()
+    try:
+        for line in process.stdout:
+            if line.startswith(DECODE_INFO_MARKER):
+                playing_at = time.time()
+                _, codec, width, height, fps, duration = line.strip().split('|')[:6]
+                run.update({
+                    'codec': codec or None,
+                    'width': int(width) if width.isdigit() else None,
+                    'height': int(height) if height.isdigit() else None,
+                    'fps': _parse_fps(fps),
+                    'sample_secs': _parse_fps(duration),
+                })
+        process.wait()
+    finally:
+        watchdog.cancel()
+
+    if time.time() - start >= timeout:
+        run['error'] = 'timeout'
+    elif not playing_at or process.returncode != 0:
+        run['error'] = f'mpv exit code {process.returncode}'
+    else:
+        run['decode_secs'] = max(time.time() - playing_at, 0.001)
+        if run['fps']:
+            # A short sample ends before `frames` - only count what it holds
+            media_secs = frames / run['fps']
+            if run['sample_secs']:
+                media_secs = min(media_secs, run['sample_secs'])
+            run['speed_ratio'] = round(media_secs / run['decode_secs'], 2)
+    return run
+
+
+def decode_validation_worker(url, frames=DECODE_FRAMES, timeout=DECODE_TIMEOUT,
+                             memory_mb=DECODE_MEMORY_MB, threads=0, runs=DECODE_RUNS):
+    """Check that a stream decodes in real time with headless mpv.
+
+    Runs in a separate process (see validate_decoding). The start of the
+    stream is downloaded first and decoded from disk, so a slow link never
+    counts against the decoder. A ratio under REALTIME_MARGIN is re-measured
+    up to `runs` times and only 'realtime' False when every run was slow.
+
+    'decodes' is True once frames were decoded and None when the check
+    was inconclusive (network errors, timeouts, mpv dying at the memory
+    cap) - only 'realtime' False says this hardware can't keep up.
+    """
+    start = time.time()
+
+    if not shutil.which('mpv'):
+        if shutil.which('ffprobe'):
+            try:
+                info = _probe_with_ffprobe(url, timeout)
+            except subprocess.TimeoutExpired:
+                info = {'decodes': None, 'error': 'timeout'}
+            except Exception as e:
+                info = {'decodes': None, 'error': str(e)}
+            info['duration'] = round(time.time() - start, 2)
+            return info
+        # Unknown rather than failed - a missing tool must not blacklist streams
+        return {'decodes': None, 'error': 'neither mpv nor ffprobe installed'}
+
+    info = {'decodes': None}
+    handle, sample = tempfile.mkstemp(prefix='grannytv-decode-', suffix='.ts')
+    os.close(handle)
+    try:
+        try:
+            info.update(fetch_decode_sample(url, sample, timeout=timeout))
+        except Exception as e:
+            info['error'] = f'download failed: {e}'
+
+        ratios = []
+        while 'error' not in info and len(ratios) < runs:
+            remaining = timeout - (time.time() - start)
+            if remaining <= 0:
+                info['error'] = 'timeout'
+                break
+            try:
+                run = _time_decode(sample, frames, remaining, memory_mb, threads)
+            except Exception as e:
+                run = {'error': str(e)}
+            if 'error' in run:
+                if not ratios:
+                    info['error'] = run['error']
+                break
+            info.update({key: run[key] for key in ('codec', 'width', 'height', 'fps')})
+            if 'speed_ratio' not in run:
+                break  # No frame rate - nothing to compare against
+            ratios.append(run['speed_ratio'])
+            if run['speed_ratio'] >= REALTIME_MARGIN:
+                break
+    finally:
+        os.unlink(sample)
+
+    info['duration'] = round(time.time() - start, 2)
+    if 'codec' in info:
+        info.pop('error', None)  # A later run failing doesn't undo decoded frames
+        info['decodes'] = True
+        info['speed_ratio'] = max(ratios) if ratios else None
+        if info['speed_ratio'] is not None and info['speed_ratio'] >= REALTIME_MARGIN:
+            info['realtime'] = True
+        else:
+            # One slow run on a busy Pi proves nothing - it has to repeat
+            info['realtime'] = False if len(ratios) >= runs else None
+        info['runs'] = len(ratios)
+    return info
+
+
 class StreamPerformanceAnalyzer:
     def __init__(self, streams_file='working_streams.json'):
         self.streams_file = streams_file
@@ -124,6 +376,76 @@ class StreamPerformanceAnalyzer:
         
         return results
     
+    def measure_link_capacity(self, results, max_streams=3, state_file='link_capacity.json'):
+        """Record segment-download throughput from the fastest HLS streams"""
+        estimator = LinkCapacityEstimator(state_file)
+        hls_results = sorted(
+            (r for url, r in results.items() if r['performance']['success'] and '.m3u8' in url.lower()),
+            key=lambda r: r['performance']['latency_ms']
+        )
+        
+        print(f"\n📶 Measuring link capacity from {min(max_streams, len(hls_results))} HLS streams...")
+        
+        for result in hls_results[:max_streams]:
+            url = result['stream_data']['url']
+            try:
+                text, final_url = fetch_playlist(url)
+                variants = parse_master_playlist(text, final_url)
+                if variants:
+                    kbps = estimator.probe_variants(variants, source='analyzer')
+                else:
+                    segments = parse_media_playlist(text, final_url)['segments']
+                    kbps = estimator.measure_segment(segments[-1], source='analyzer') if segments else None
+            except Exception:
+                kbps = None
+            
+            if kbps:
+                print(f"   ✅ {result['stream_data']['name']}: {kbps:.0f} kbps")
+            else:
+                print(f"   ❌ {result['stream_data']['name']}: segment download failed")
+        
+        print(f"   Sustainable estimate: {estimator.estimate_kbps()} kbps")
+        return estimator.estimate_kbps()
+
+    def validate_decoding(self, results, frames=DECODE_FRAMES, timeout=DECODE_TIMEOUT,
+                          memory_mb=DECODE_MEMORY_MB, workers=DECODE_WORKERS):
+        """Decode-check reachable streams in worker processes
+
+        The cores are split between the workers, so with the default single
+        worker every decoder runs as fast as it would during playback.
+        """
+        candidates = [(url, r) for url, r in results.items() if r['performance']['success']]
+        threads = max(1, (os.cpu_count() or 1) // workers)
+
+        print(f"\n🎞️  Decode-validating {len(candidates)} streams on {workers} workers "
+              f"({threads} decoder threads, {frames} frames, {timeout}s / {memory_mb}MB cap each)...")
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            future_to_url = {
+                executor.submit(decode_validation_worker, url, frames, timeout, memory_mb, threads): url
+                for url, _ in candidates
+            }
+
+            for future in concurrent.futures.as_completed(future_to_url):
+                url = future_to_url[future]
+                name = results[url]['stream_data']['name']
+                try:
+                    decode = future.result()
+                except Exception as e:
+                    decode = {'decodes': None, 'error': str(e)}
+                results[url]['decode'] = decode
+
+                if not decode['decodes']:
+                    print(f"   ⚠️  {name}: decode check inconclusive ({decode.get('error', 'unknown')})")
+                elif decode.get('realtime') is False:
+                    print(f"   🐢 {name}: {decode['codec']} {decode['width']}x{decode['height']} "
+                          f"@ {decode['fps']}fps - only {decode['speed_ratio']}x real time")
+                else:
+                    print(f"   ✅ {name}: {decode.get('codec')} {decode.get('width')}x{decode.get('height')} "
+                          f"@ {decode.get('fps')}fps ({decode.get('speed_ratio')}x)")
+
+        return results
+
     def generate_performance_report(self, results):
         """Generate comprehensive performance report"""
         successful_results = [r for r in results.values() if r['performance']['success']]
@@ -208,6 +530,17 @@ class StreamPerformanceAnalyzer:
                 stream_data['cdn_provider'] = result['performance'].get('cdn', 'unknown')
                 stream_data['optimized_at'] = datetime.now().isoformat()
                 
+                decode = result.get('decode')
+                if decode and decode['decodes']:
+                    # A stream that decoded but not in real time on this hardware
+                    # is flagged so the player skips it; inconclusive checks
+                    # (network, timeout, memory cap) leave the flag unset
+                    test_results = dict(stream_data.get('test_results', {}))
+                    test_results['decode'] = decode.get('realtime') is not False
+                    stream_data['test_results'] = test_results
+                if decode:
+                    stream_data['decode_info'] = decode
+                
                 optimized_streams[url] = stream_data
         
         # Save optimized database
@@ -219,7 +552,9 @@ class StreamPerformanceAnalyzer:
         
         return optimized_streams
     
-    def run_analysis(self):
+    def run_analysis(self, decode_check=False, decode_frames=DECODE_FRAMES,
+                     decode_timeout=DECODE_TIMEOUT, decode_memory_mb=DECODE_MEMORY_MB,
+                     decode_workers=DECODE_WORKERS):
         """Run complete stream analysis"""
         print("🎬 Starting GrannyTV Stream Performance Analysis")
         print("=" * 50)
@@ -234,6 +569,13 @@ class StreamPerformanceAnalyzer:
         # Analyze performance
         results = self.analyze_stream_batch(streams)
         
+        # Segment throughput feeds the player's HLS variant selection
+        self.measure_link_capacity(results)
+        
+        # Optional decode validation (CPU heavy - run on the target hardware)
+        if decode_check:
+            self.validate_decoding(results, decode_frames, decode_timeout, decode_memory_mb, decode_workers)
+        
         # Generate report
         report = self.generate_performance_report(results)
         
@@ -256,8 +598,28 @@ class StreamPerformanceAnalyzer:
         return report, optimized_db
 
 def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='GrannyTV Stream Performance Analyzer')
+    parser.add_argument('--decode-check', action='store_true',
+                       help='Decode-validate streams with headless mpv (run on the target hardware)')
+    parser.add_argument('--decode-frames', type=int, default=DECODE_FRAMES,
+                       help=f'Frames to decode per stream (default: {DECODE_FRAMES})')
+    parser.add_argument('--decode-timeout', type=int, default=DECODE_TIMEOUT,
+                       help=f'Seconds allowed per decode worker (default: {DECODE_TIMEOUT})')
+    parser.add_argument('--decode-memory-mb', type=int, default=DECODE_MEMORY_MB,
+                       help=f'Memory cap per decode worker in MB (default: {DECODE_MEMORY_MB})')
+    parser.add_argument('--decode-workers', type=int, default=DECODE_WORKERS,
+                       help=f'Streams decoded at once, sharing the cores (default: {DECODE_WORKERS})')
+    
+    args = parser.parse_args()
+    
     analyzer = StreamPerformanceAnalyzer()
-    analyzer.run_analysis()
+    analyzer.run_analysis(decode_check=args.decode_check,
+                          decode_frames=args.decode_frames,
+                          decode_timeout=args.decode_timeout,
+                          decode_memory_mb=args.decode_memory_mb,
+                          decode_workers=args.decode_workers)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
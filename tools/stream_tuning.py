@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Adaptive Stream Tuning Profiles for GrannyTV
+Learns per-stream (and per-host) mpv buffer sizes from observed stalls
+
+Jittery origins that keep stalling or reconnecting get a deeper buffer;
+stable ones are shrunk back toward the minimum so they stop wasting RAM.
+Host profiles are kept per protocol, since one host may serve live HLS
+and progressive VOD with very different buffers. Profiles are persisted
+so learning survives player restarts.
+"""
+
+import json
+import os
+import time
+import urllib.parse
+from typing import Dict, Optional
+
+from iptv_protocol_optimizer import canonical_url, classify_url
+
+# Buffer bounds (cache seconds drive readahead; MB drive demuxer-max-bytes)
+MIN_CACHE_SECS = 2
+MAX_CACHE_SECS = 20
+MIN_DEMUXER_MB = 10
+MAX_DEMUXER_MB = 60
+
+GROW_FACTOR = 1.5
+SHRINK_FACTOR = 0.8
+STALLS_PER_HOUR_TO_GROW = 2       # Grow when stalling or reconnecting at least this often
+STABLE_SECONDS_TO_SHRINK = 1800   # Shrink after 30 stall-free minutes
+GROW_RSS_LIMIT_MB = 160           # Never grow once mpv is this close to MemoryHigh
+
+
+def parse_megabytes(value) -> Optional[float]:
+    """Parse an mpv size like '25M' or '512K' into MB"""
+    if value is None:
+        return None
+    value = str(value).strip().upper()
+    multipliers = {'K': 1 / 1024, 'M': 1, 'G': 1024}
+    try:
+        if value[-1] in multipliers:
+            return float(value[:-1]) * multipliers[value[-1]]
+        return float(value) / (1024 * 1024)
+    except (ValueError, IndexError):
+        return None
+
+
+class StreamTuningStore:
+    def __init__(self, state_file='stream_tuning.json'):
+        self.state_file = state_file
+        self.profiles = {'streams': {}, 'hosts': {}}
+        self.load()
+
+    def load(self):
+        """Load persisted profiles"""
+        try:
+            if os.path.exists(self.state_file):
+                with open(self.state_file, 'r') as f:
+                    data = json.load(f)
+                self.profiles['streams'] = data.get('streams', {})
+                # Host profiles from before they were split per protocol are dropped
+                self.profiles['hosts'] = {key: profile for key, profile in data.get('hosts', {}).items()
+                                          if '|' in key}
+        except Exception:
+            pass
+
+    def save(self):
+        """Persist profiles atomically"""
+        try:
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(self.profiles, f, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except OSError:
+            pass  # Read-only filesystem - profiles stay in memory
+
+    @staticmethod
+    def host_for(url: str) -> str:
+        """Host profile key: the host and the protocol class, e.g. 'cdn.example.com|hls'"""
+        return f"{urllib.parse.urlparse(url).netloc.lower()}|{classify_url(canonical_url(url))}"
+
+    def get_profile(self, url: str) -> Optional[Dict]:
+        """Stream profile, else the host's profile for this protocol for streams not seen yet"""
+        return (self.profiles['streams'].get(url)
+                or self.profiles['hosts'].get(self.host_for(url)))
+
+    def get_overrides(self, url: str) -> Dict[str, str]:
+        """mpv option overrides to apply when loading this stream"""
+        profile = self.get_profile(url)
+        if not profile:
+            return {}
+        # With the cache on, mpv reads ahead by the larger of cache-secs and
+        # demuxer-readahead-secs, so the profile's own readahead is left alone
+        return {
+            'cache-secs': f"{profile['cache_secs']:g}",
+            'demuxer-max-bytes': f"{int(profile['demuxer_max_mb'])}M",
+        }
+
+    def _adjust(self, profile: Dict, play_seconds: float, stalls: int,
+                reconnects: int, peak_rss_mb: Optional[float]) -> str:
+        """Grow or shrink one profile from a finished session"""
+        profile['sessions'] = profile.get('sessions', 0) + 1
+        profile['play_seconds'] = profile.get('play_seconds', 0) + play_seconds
+        profile['stalls'] = profile.get('stalls', 0) + stalls
+        profile['reconnects'] = profile.get('reconnects', 0) + reconnects
+        if peak_rss_mb:
+            profile['peak_rss_mb'] = max(profile.get('peak_rss_mb', 0), peak_rss_mb)
+        profile['updated'] = time.time()
+
+        # A reconnect is a stall mpv could not ride out - it counts the same
+        disruptions_per_hour = (stalls + reconnects) / max(play_seconds / 3600, 1 / 60)
+        jittery = disruptions_per_hour >= STALLS_PER_HOUR_TO_GROW
+        memory_tight = peak_rss_mb is not None and peak_rss_mb >= GROW_RSS_LIMIT_MB
+
+        # Bounds limit how far we adjust - they never undo a profile's
+        # larger starting point (e.g. 60s for progressive VOD)
+        if jittery and not memory_tight:
+            for key, limit in (('cache_secs', MAX_CACHE_SECS), ('demuxer_max_mb', MAX_DEMUXER_MB)):
+                profile[key] = max(profile[key], min(limit, profile[key] * GROW_FACTOR))
+            return 'grow'
+        if stalls == 0 and reconnects == 0 and play_seconds >= STABLE_SECONDS_TO_SHRINK:
+            for key, limit in (('cache_secs', MIN_CACHE_SECS), ('demuxer_max_mb', MIN_DEMUXER_MB)):
+                profile[key] = min(profile[key], max(limit, profile[key] * SHRINK_FACTOR))
+            return 'shrink'
+        return 'keep'
+
+    def record_session(self, url: str, base_options: Dict, play_seconds: float,
+                       stalls: int = 0, reconnects: int = 0,
+                       peak_rss_mb: Optional[float] = None) -> str:
+        """Learn from one playback session; returns 'grow', 'shrink' or 'keep'"""
+        if play_seconds <= 0:
+            return 'keep'
+
+        def new_profile():
+            return {
+                'cache_secs': float(base_options.get('cache-secs', 3)),
+                'demuxer_max_mb': parse_megabytes(base_options.get('demuxer-max-bytes')) or 25,
+            }
+
+        stream_profile = self.profiles['streams'].setdefault(url, new_profile())
+        host_profile = self.profiles['hosts'].setdefault(self.host_for(url), new_profile())
+
+        action = self._adjust(stream_profile, play_seconds, stalls, reconnects, peak_rss_mb)
+        self._adjust(host_profile, play_seconds, stalls, reconnects, peak_rss_mb)
+        self.save()
+        return action
+
+    def clear(self):
+        """Forget all learned profiles"""
+        self.profiles = {'streams': {}, 'hosts': {}}
+        self.save()
+
+
+def main():
+    """Show learned tuning profiles"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV adaptive tuning profiles')
+    parser.add_argument('--state-file', default='stream_tuning.json',
+                        help='Tuning profile file (default: stream_tuning.json)')
+    parser.add_argument('--reset', action='store_true', help='Forget all learned profiles')
+    args = parser.parse_args()
+
+    store = StreamTuningStore(args.state_file)
+    if args.reset:
+        store.clear()
+        print("Tuning profiles cleared")
+        return
+
+    for kind in ('hosts', 'streams'):
+        print(f"{kind.title()}:")
+        for key, profile in sorted(store.profiles[kind].items()):
+            print(f"   {key[:70]}: cache {profile['cache_secs']:.1f}s, "
+                  f"demuxer {profile['demuxer_max_mb']:.0f}M, "
+                  f"{profile.get('stalls', 0)} stalls / {profile.get('play_seconds', 0) / 3600:.1f}h")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Fork-free System Metric Collectors for GrannyTV
+Reads thermal, cpufreq, CPU and network counters straight from sysfs/procfs
+
+Every file is opened once and re-read with pread(), and CPU/network
+rates come from deltas between samples, so a full sample costs
+microseconds and never blocks - unlike spawning vcgencmd or
+psutil.cpu_percent(interval=1).
+"""
+
+import glob
+import os
+import time
+from typing import Dict, List, Optional
+
+THERMAL_ROOT = '/sys/class/thermal'
+CPU_ROOT = '/sys/devices/system/cpu'
+READ_SIZE = 8192
+
+
+class HeldFile:
+    """A /proc or /sys file kept open and re-read from offset 0"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = None
+        try:
+            self.fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            pass
+
+    @property
+    def available(self) -> bool:
+        return self.fd is not None
+
+    def read(self) -> Optional[str]:
+        if self.fd is None:
+            return None
+        try:
+            return os.pread(self.fd, READ_SIZE, 0).decode('ascii', 'replace')
+        except OSError:
+            return None
+
+    def read_int(self) -> Optional[int]:
+        text = self.read()
+        try:
+            return int(text.strip()) if text else None
+        except ValueError:
+            return None
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class ThermalCollector:
+    """SoC temperature from the thermal zone (same sensor vcgencmd measure_temp reads)"""
+
+    def __init__(self, root: str = THERMAL_ROOT):
+        self.zone = None
+        zones = sorted(glob.glob(os.path.join(root, 'thermal_zone*')))
+        for zone in zones:
+            try:
+                with open(os.path.join(zone, 'type'), 'r') as f:
+                    zone_type = f.read().strip()
+            except OSError:
+                continue
+            if 'cpu' in zone_type or 'soc' in zone_type:
+                self.zone = HeldFile(os.path.join(zone, 'temp'))
+                break
+        if self.zone is None and zones:
+            self.zone = HeldFile(os.path.join(zones[0], 'temp'))
+
+    def sample(self) -> Dict:
+        millidegrees = self.zone.read_int() if self.zone else None
+        return {'temp_c': millidegrees / 1000 if millidegrees is not None else None}
+
+    def close(self):
+        if self.zone:
+            self.zone.close()
+
+
+class CpuFreqCollector:
+    """Current clock per core, plus the configured maximum (read once)"""
+
+    def __init__(self, root: str = CPU_ROOT):
+        self.current: List[HeldFile] = []
+        self.max_khz = None
+        for policy in sorted(glob.glob(os.path.join(root, 'cpu[0-9]*', 'cpufreq'))):
+            held = HeldFile(os.path.join(policy, 'scaling_cur_freq'))
+            if held.available:
+                self.current.append(held)
+            if self.max_khz is None:
+                max_file = HeldFile(os.path.join(policy, 'cpuinfo_max_freq'))
+                self.max_khz = max_file.read_int()
+                max_file.close()
+
+    def sample(self) -> Dict:
+        freqs = [f for f in (held.read_int() for held in self.current) if f]
+        return {
+            'cpu_freq_mhz': sum(freqs) / len(freqs) / 1000 if freqs else None,
+            'cpu_freq_max_mhz': self.max_khz / 1000 if self.max_khz else None,
+        }
+
+    def close(self):
+        for held in self.current:
+            held.close()
+
+
+class CpuStatCollector:
+    """CPU utilisation from /proc/stat deltas between samples (never sleeps)"""
+
+    def __init__(self, proc_root: str = '/proc'):
+        self.stat = HeldFile(os.path.join(proc_root, 'stat'))
+        self.last = self._read_totals()
+
+    def _read_totals(self) -> Optional[List[int]]:
+        text = self.stat.read()
+        if not text or not text.startswith('cpu '):
+            return None
+        # user nice system idle iowait irq softirq steal
+        return [int(v) for v in text.split('\n', 1)[0].split()[1:9]]
+
+    def sample(self) -> Dict:
+        totals = self._read_totals()
+        result = {'cpu_percent': None, 'iowait_percent': None}
+        if totals and self.last:
+            deltas = [now - before for now, before in zip(totals, self.last)]
+            elapsed = sum(deltas)
+            if elapsed > 0:
+                idle = deltas[3] + deltas[4]
+                result['cpu_percent'] = (elapsed - idle) / elapsed * 100
+                result['iowait_percent'] = deltas[4] / elapsed * 100
+        if totals:
+            self.last = totals
+        return result
+
+    def close(self):
+        self.stat.close()
+
+
+class NetDevCollector:
+    """Byte counters and receive/transmit rates from /proc/net/dev (loopback excluded)"""
+
+    def __init__(self, proc_root: str = '/proc'):
+        self.netdev = HeldFile(os.path.join(proc_root, 'net', 'dev'))
+        self.last = None
+        self.last_time = None
+        self._read_totals_and_remember()
+
+    def _read_totals(self) -> Optional[tuple]:
+        text = self.netdev.read()
+        if not text:
+            return None
+        recv = sent = 0
+        for line in text.splitlines()[2:]:
+            name, _, counters = line.partition(':')
+            if name.strip() == 'lo':
+                continue
+            fields = counters.split()
+            if len(fields) >= 9:
+                recv += int(fields[0])
+                sent += int(fields[8])
+        return recv, sent
+
+    def _read_totals_and_remember(self):
+        self.last = self._read_totals()
+        self.last_time = time.monotonic()
+
+    def sample(self) -> Dict:
+        totals = self._read_totals()
+        now = time.monotonic()
+        result = {'network_bytes_recv': None, 'network_bytes_sent': None,
+                  'network_recv_mbps': None, 'network_sent_mbps': None}
+        if not totals:
+            return result
+        result['network_bytes_recv'], result['network_bytes_sent'] = totals
+        if self.last and now > self.last_time:
+            elapsed = now - self.last_time
+            result['network_recv_mbps'] = (totals[0] - self.last[0]) * 8 / elapsed / 1e6
+            result['network_sent_mbps'] = (totals[1] - self.last[1]) * 8 / elapsed / 1e6
+        self.last, self.last_time = totals, now
+        return result
+
+    def close(self):
+        self.netdev.close()
+
+
+class MemInfoCollector:
+    """System memory from /proc/meminfo"""
+
+    def __init__(self, proc_root: str = '/proc'):
+        self.meminfo = HeldFile(os.path.join(proc_root, 'meminfo'))
+
+    def sample(self) -> Dict:
+        values = {}
+        for line in (self.meminfo.read() or '').splitlines():
+            key, _, rest = line.partition(':')
+            if key in ('MemTotal', 'MemAvailable'):
+                values[key] = int(rest.split()[0])
+        total = values.get('MemTotal')
+        available = values.get('MemAvailable')
+        if not total or available is None:
+            return {'memory_percent': None, 'memory_available_mb': None}
+        return {
+            'memory_percent': (total - available) / total * 100,
+            'memory_available_mb': available / 1024,
+        }
+
+    def close(self):
+        self.meminfo.close()
+
+
+class SystemCollector:
+    """All collectors behind one non-blocking sample() call"""
+
+    def __init__(self, proc_root: str = '/proc', thermal_root: str = THERMAL_ROOT,
+                 cpu_root: str = CPU_ROOT):
+        self.collectors = [
+            CpuStatCollector(proc_root),
+            CpuFreqCollector(cpu_root),
+            MemInfoCollector(proc_root),
+            NetDevCollector(proc_root),
+            ThermalCollector(thermal_root),
+        ]
+
+    def sample(self) -> Dict:
+        metrics = {}
+        for collector in self.collectors:
+            metrics.update(collector.sample())
+        return metrics
+
+    def close(self):
+        for collector in self.collectors:
+            collector.close()
+
+
+def main():
+    """Print system metrics once per second"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV sysfs metric collectors')
+    parser.add_argument('--count', type=int, default=5, help='Number of samples (default: 5)')
+    args = parser.parse_args()
+
+    collector = SystemCollector()
+    cost = 0.0
+    for i in range(args.count):
+        time.sleep(1)
+        started = time.perf_counter()
+        m = collector.sample()
+        cost += time.perf_counter() - started
+
+        def fmt(value, spec):
+            return format(value, spec) if value is not None else '--'
+        print(f"📊 CPU {fmt(m['cpu_percent'], '.1f')}% @ {fmt(m['cpu_freq_mhz'], '.0f')}MHz | "
+              f"RAM {fmt(m['memory_percent'], '.1f')}% | "
+              f"Net ↓{fmt(m['network_recv_mbps'], '.2f')} Mbps | "
+              f"Temp {fmt(m['temp_c'], '.1f')}°C")
+    collector.close()
+    print(f"⏱️ Sampling cost: {cost / max(1, args.count) * 1e6:.0f} µs/sample")
+
+
+if __name__ == "__main__":
+    main()
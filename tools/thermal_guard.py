@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Thermal & Throttling Guard for GrannyTV
+Spots CPU throttling before it turns into stuttering video
+
+A Pi 3 doing software decode (--hwdec=no) heats up until the firmware
+caps the clock, and then mpv starts dropping frames. This tracks the
+firmware throttle flags, the cpufreq cap and the temperature trend,
+lines them up with mpv's dropped frames and A/V desync, and tells the
+player when to back off (cheaper scaling, then a lower HLS variant).
+"""
+
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from sysfs_collectors import CPU_ROOT, THERMAL_ROOT, CpuFreqCollector, HeldFile, ThermalCollector
+
+GET_THROTTLED_PATHS = (
+    '/sys/devices/platform/soc/soc:firmware/get_throttled',
+    '/sys/devices/platform/soc/soc:firmware/raspberrypi-hwmon/get_throttled',
+)
+
+# get_throttled bits (same as `vcgencmd get_throttled`)
+UNDER_VOLTAGE = 0x1
+FREQ_CAPPED = 0x2
+THROTTLED = 0x4
+SOFT_TEMP_LIMIT = 0x8
+
+THROTTLE_TEMP_C = 80.0      # Firmware starts throttling the Pi 3 here
+WARN_MARGIN_C = 5.0         # "Imminent" when within this of the limit...
+TREND_HORIZON_SECONDS = 120 # ...or heading there within two minutes
+TREND_WINDOW_SECONDS = 300
+COOL_SECONDS_TO_RECOVER = 600
+DROPS_PER_SECOND_BAD = 2.0  # Visible stutter
+AVSYNC_BAD_SECONDS = 0.1
+
+STATE_OK = 'ok'
+STATE_IMMINENT = 'imminent'
+STATE_THROTTLED = 'throttled'
+
+
+class ThermalGuard:
+    def __init__(self, thermal_root: str = THERMAL_ROOT, cpu_root: str = CPU_ROOT,
+                 throttled_path: Optional[str] = None, throttle_temp_c: float = THROTTLE_TEMP_C):
+        self.thermal = ThermalCollector(thermal_root)
+        self.cpufreq = CpuFreqCollector(cpu_root)
+        self.throttled = None
+        for path in ((throttled_path,) if throttled_path else GET_THROTTLED_PATHS):
+            held = HeldFile(path)
+            if held.available:
+                self.throttled = held
+                break
+        self.throttle_temp_c = throttle_temp_c
+
+        self.temps = deque()            # (monotonic time, temp_c)
+        self.last_drop_count = None
+        self.last_check = None
+        self.last_hot = time.monotonic()
+        self.state = STATE_OK
+        # Playback quality per thermal state, for the correlation report
+        self.quality = {state: {'seconds': 0.0, 'drops': 0, 'avsync_sum': 0.0, 'samples': 0}
+                        for state in (STATE_OK, STATE_IMMINENT, STATE_THROTTLED)}
+
+    def read_throttle_flags(self) -> Optional[int]:
+        if not self.throttled:
+            return None
+        text = self.throttled.read()
+        try:
+            return int(text.strip(), 16) if text else None
+        except ValueError:
+            return None
+
+    def temperature_slope(self) -> Optional[float]:
+        """Least-squares trend in °C per second over the trend window"""
+        if len(self.temps) < 3:
+            return None
+        t0 = self.temps[0][0]
+        xs = [t - t0 for t, _ in self.temps]
+        ys = [temp for _, temp in self.temps]
+        mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+        denominator = sum((x - mean_x) ** 2 for x in xs)
+        if denominator == 0:
+            return None
+        return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator
+
+    def check(self, drop_count: Optional[int] = None, avsync: Optional[float] = None) -> Dict:
+        """Sample thermal state and attribute playback quality to it"""
+        now = time.monotonic()
+        temp = self.thermal.sample()['temp_c']
+        freq = self.cpufreq.sample()
+        flags = self.read_throttle_flags()
+
+        if temp is not None:
+            self.temps.append((now, temp))
+            while self.temps and now - self.temps[0][0] > TREND_WINDOW_SECONDS:
+                self.temps.popleft()
+        slope = self.temperature_slope()
+        projected = temp + slope * TREND_HORIZON_SECONDS if temp is not None and slope is not None else temp
+
+        capped = bool(flags & (FREQ_CAPPED | THROTTLED)) if flags is not None else False
+        if not capped and freq['cpu_freq_mhz'] and freq['cpu_freq_max_mhz'] and flags is None:
+            # No firmware flags (non-Pi kernels): infer a cap from a clock well below max while hot
+            capped = (temp or 0) >= self.throttle_temp_c and freq['cpu_freq_mhz'] < freq['cpu_freq_max_mhz'] * 0.9
+
+        if capped:
+            state = STATE_THROTTLED
+        elif ((temp is not None and temp >= self.throttle_temp_c - WARN_MARGIN_C)
+              or (projected is not None and projected >= self.throttle_temp_c)
+              or (flags is not None and flags & SOFT_TEMP_LIMIT)):
+            state = STATE_IMMINENT
+        else:
+            state = STATE_OK
+        if state != STATE_OK:
+            self.last_hot = now
+
+        # Drops and avsync since the last check are both charged to the
+        # state we were in for that interval
+        drops_per_second = None
+        elapsed = now - self.last_check if self.last_check else 0
+        bucket = self.quality[self.state]
+        if drop_count is not None:
+            if self.last_drop_count is not None and drop_count >= self.last_drop_count and elapsed > 0:
+                dropped = drop_count - self.last_drop_count
+                drops_per_second = dropped / elapsed
+                bucket['seconds'] += elapsed
+                bucket['drops'] += dropped
+            self.last_drop_count = drop_count
+        if avsync is not None and self.last_check is not None:
+            bucket['avsync_sum'] += abs(avsync)
+            bucket['samples'] += 1
+        self.last_check = now
+        self.state = state
+
+        return {
+            'state': state,
+            'temp_c': temp,
+            'slope_c_per_min': slope * 60 if slope is not None else None,
+            'projected_c': projected,
+            'cpu_freq_mhz': freq['cpu_freq_mhz'],
+            'throttle_flags': flags,
+            'under_voltage': bool(flags & UNDER_VOLTAGE) if flags is not None else None,
+            'drops_per_second': drops_per_second,
+            'avsync': avsync,
+            'stuttering': ((drops_per_second or 0) >= DROPS_PER_SECOND_BAD
+                           or abs(avsync or 0) >= AVSYNC_BAD_SECONDS),
+        }
+
+    def cooled_down(self) -> bool:
+        """True once we've been out of the hot states long enough to undo backoffs"""
+        return time.monotonic() - self.last_hot >= COOL_SECONDS_TO_RECOVER
+
+    def correlation(self) -> Dict[str, Dict]:
+        """Dropped frames/s and mean |avsync| per thermal state"""
+        report = {}
+        for state, bucket in self.quality.items():
+            report[state] = {
+                'seconds': round(bucket['seconds']),
+                'drops_per_second': bucket['drops'] / bucket['seconds'] if bucket['seconds'] else None,
+                'mean_avsync': bucket['avsync_sum'] / bucket['samples'] if bucket['samples'] else None,
+            }
+        return report
+
+    def reset_playback(self):
+        """New mpv instance - its frame counters start from zero"""
+        self.last_drop_count = None
+
+
+def main():
+    """Watch thermal state"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GrannyTV thermal/throttle guard')
+    parser.add_argument('--count', type=int, default=10, help='Number of checks (default: 10)')
+    parser.add_argument('--interval', type=float, default=5, help='Seconds between checks (default: 5)')
+    args = parser.parse_args()
+
+    guard = ThermalGuard()
+    print(f"🌡️ Firmware throttle flags: {'yes' if guard.throttled else 'not available'}")
+    for i in range(args.count):
+        result = guard.check()
+        temp = f"{result['temp_c']:.1f}°C" if result['temp_c'] is not None else '--'
+        slope = f"{result['slope_c_per_min']:+.2f}°C/min" if result['slope_c_per_min'] is not None else '--'
+        flags = f"0x{result['throttle_flags']:x}" if result['throttle_flags'] is not None else '--'
+        print(f"📊 {temp} ({slope}) | flags {flags} | -> {result['state']}")
+        if i < args.count - 1:
+            time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()